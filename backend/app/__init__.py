@@ -3,9 +3,11 @@
 import os
 from flask import Flask
 from flask_cors import CORS # <<< IMPORT CORS
-from config import config_by_name # Import config dictionary from backend/config.py
+from config import config_by_name, engine_options_for_role # Import config dictionary from backend/config.py
 # Import extension instances from app/extensions.py
 from .extensions import db, ma, migrate, celery
+from .db_pool import pool_metrics
+from .scheduling import configure_queues, configure_periodic_tasks
 import logging
 
 # Configure basic logging for the app
@@ -25,6 +27,9 @@ def create_app(config_name=None):
     app = Flask(__name__, instance_relative_config=True)
     app_config = config_by_name[config_name]
     app.config.from_object(app_config)
+    # Re-derived here: a worker's pool size depends on the concurrency it chose after config.py was imported
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_for_role(app.config.get('PROCESS_ROLE', 'web'),
+                                                                      app.config.get('SQLALCHEMY_DATABASE_URI'))
     # app.config.from_pyfile('config.py', silent=True) # Optional instance config
 
     logger.info(f"Creating Flask app with '{config_name}' configuration.")
@@ -45,6 +50,11 @@ def create_app(config_name=None):
         ma.init_app(app)
         migrate.init_app(app, db)
         logger.info("Database extensions initialized.")
+        if app.config.get('SQLALCHEMY_DATABASE_URI'):
+            with app.app_context():
+                pool_metrics.install(db.engine)
+            logger.info(f"DB pool configured for role '{app.config.get('PROCESS_ROLE')}': "
+                        f"{ {k: v for k, v in app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).items() if k != 'connect_args'} }")
     except Exception as e:
         logger.error(f"Error initializing database extensions: {e}", exc_info=True)
 
@@ -55,7 +65,8 @@ def create_app(config_name=None):
             result_backend=app.config['CELERY_RESULT_BACKEND'],
             task_ignore_result=True,
         )
-        celery.conf.task_default_queue = 'default'
+        configure_queues(celery, app.config) # interactive / bulk.N / default
+        configure_periodic_tasks(celery, app.config) # stale-lease reaper (run with `celery beat`)
         class ContextTask(celery.Task):
             abstract = True
             def __call__(self, *args, **kwargs):
@@ -91,12 +102,23 @@ def create_app(config_name=None):
         except Exception as e:
              logger.error(f"Unexpected error during blueprint registration: {e}", exc_info=True)
 
+    # --- Register CLI Commands (flask <command>) ---
+    from .commands import register_commands
+    register_commands(app)
+
     # --- Define Basic Routes (like Health Check) ---
     @app.route('/health')
     def health_check():
         """Simple health check endpoint."""
         return "OK", 200
 
+    @app.route('/health/db-pool')
+    def db_pool_health():
+        """Connection pool usage counters for this process (503 when no database is configured)."""
+        if not app.config.get('SQLALCHEMY_DATABASE_URI'):
+            return {"error": "No database configured."}, 503
+        return pool_metrics.snapshot(db.engine), 200
+
     # --- Import Models ---
     from . import models
     logger.debug("Models imported.")
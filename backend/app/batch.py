@@ -0,0 +1,422 @@
+# backend/app/batch.py
+#
+# Offline bulk screening: parses resumes with a local process pool, scores them with batched
+# encoder calls and writes the results straight to the DB or to CSV/Parquet. No Celery, no
+# Redis, no HTTP - meant for backfills, migrations and laptops.
+#
+#   python -m app.batch --jd-file ../data/job_descriptions/sample_jd.txt ../data/resumes --output scores.csv
+#   python -m app.batch --job-id 3 ../data/resumes              # import + score into job 3
+#   python -m app.batch --job-id 3                               # re-score job 3's existing resumes
+#   flask screen ...                                             # same options
+#
+# Progress is appended to a JSONL checkpoint after every committed batch; re-running with the
+# same --checkpoint skips everything already recorded there.
+
+import os
+import csv
+import json
+import time
+import uuid
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from .utils.parsers import extract_text_from_file, compute_file_hash, read_job_description
+from .text_cache import get_or_extract_text
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    pd = None
+    PANDAS_AVAILABLE = False
+
+DEFAULT_BATCH_SIZE = 64
+RESUME_EXTENSIONS = ('.pdf', '.docx', '.txt')
+OUTPUT_COLUMNS = ('key', 'filename', 'content_hash', 'resume_id', 'status', 'final_score', 'stage1_score', 'score_stage',
+                  'below_threshold', 'score_upper_bound',
+                  'semantic_score', 'skill_score', 'experience_score', 'lexical_score', 'error')
+
+
+# --- Inputs ---
+def collect_inputs(source):
+    """
+    Resume paths from a directory (files with a resume extension, sorted) or a manifest: a text
+    file with one path per line, or a CSV with a 'path' column. Relative manifest paths are
+    resolved against the manifest's directory.
+    """
+    if os.path.isdir(source):
+        return [os.path.join(source, name) for name in sorted(os.listdir(source))
+                if name.lower().endswith(RESUME_EXTENSIONS) and os.path.isfile(os.path.join(source, name))]
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8', newline='') as f:
+        if source.lower().endswith('.csv'):
+            paths = [row['path'] for row in csv.DictReader(f) if row.get('path')]
+        else:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [path if os.path.isabs(path) else os.path.join(base_dir, path) for path in paths]
+
+def load_checkpoint(path):
+    """Records already written by a previous run, keyed by input key (a torn last line is ignored)."""
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                done[record['key']] = record
+            except (ValueError, KeyError):
+                continue
+    return done
+
+_child_storage = None
+
+def _storage_for(settings):
+    """The storage driver for `settings`, built once per pool process."""
+    global _child_storage
+    if _child_storage is None:
+        from .storage import create_storage
+        _child_storage = create_storage(settings)
+    return _child_storage
+
+def _parse_one(item, storage=None):
+    """
+    Process-pool worker: (key, path, content_hash) -> (key, path, content_hash, text, error).
+    With `storage` settings (storage.storage_settings), `path` is a storage key and the text comes
+    from its extracted-text artifact when one exists (see text_cache.get_or_extract_text).
+    """
+    key, path, content_hash = item
+    try:
+        if storage is not None:
+            content_hash, artifact, _ = get_or_extract_text(_storage_for(storage), path, content_hash, storage)
+            text = artifact["text"] if artifact else None
+        else:
+            content_hash = compute_file_hash(path)
+            text = extract_text_from_file(path)
+        if not text:
+            return key, path, content_hash, None, "No extractable text in resume file"
+        return key, path, content_hash, text, None
+    except Exception as e:
+        return key, path, None, None, f"{type(e).__name__}: {e}"
+
+def _parsed_batches(items, workers, batch_size, storage=None):
+    """
+    Parses `items` in a spawn-based process pool (the parent holds torch/BLAS thread pools, which
+    must not be forked) and yields lists of parse results of up to `batch_size`, in input order.
+    At most a few batches are in flight, so memory stays bounded for any input size.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        pending = deque()
+        items = iter(items)
+        window = max(batch_size * 2, workers * 4)
+        for item in items:
+            pending.append(pool.submit(_parse_one, item, storage))
+            if len(pending) >= window:
+                break
+        batch = []
+        while pending:
+            batch.append(pending.popleft().result())
+            next_item = next(items, None)
+            if next_item is not None:
+                pending.append(pool.submit(_parse_one, next_item, storage))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+# --- Scoring ---
+def score_batch(parsed, jd_text, required_years, jd_features, idf_table=None, cut=None, score_threshold=None):
+    """
+    Scores one batch of parse results with a single encoder call over all their chunks.
+    Returns (record, path, embedding, term_counts) tuples; `idf_table` adds the corpus TF-IDF score.
+    With a cascade `cut` (cascade.StageOneCut) only resumes it admits are encoded and fully scored;
+    the others are COMPLETED with their stage-1 score (score_stage 1). With a `score_threshold`, resumes
+    that cannot reach it even with a perfect semantic score are not encoded either (below_threshold).
+    """
+    from .utils.nlp import (encode_documents, calculate_enhanced_relevance, calculate_stage1_relevance,
+                            score_components, score_upper_bound)
+    from .utils.document import Document
+    # One Document per resume: the chunks made for the batched encoder call are reused by scoring
+    documents = [Document(text) if text else None for _, _, _, text, _ in parsed]
+    stage1 = [calculate_stage1_relevance(document, jd_features, idf_table)["stage1_score"] if document else None
+              for document in documents]
+    full = [document is not None and (cut is None or cut.admit(score)) for document, score in zip(documents, stage1)]
+    # Cheap components first, so resumes that cannot reach the threshold are left out of the encoder call
+    components = [score_components(document, jd_features, required_years, idf_table) if promoted else None
+                  for document, promoted in zip(documents, full)]
+    encode = [promoted and (score_threshold is None or score_upper_bound(parts) >= score_threshold)
+              for promoted, parts in zip(full, components)]
+    encodings = encode_documents([document if needed else None for document, needed in zip(documents, encode)])
+    records = []
+    for (key, path, content_hash, text, error), document, stage1_score, promoted, parts, encoding in \
+            zip(parsed, documents, stage1, full, components, encodings):
+        record = {"key": key, "filename": os.path.basename(path), "content_hash": content_hash, "resume_id": None,
+                  "status": "FAILED", "final_score": None, "stage1_score": stage1_score, "score_stage": None,
+                  "below_threshold": None, "score_upper_bound": None, "semantic_score": None, "skill_score": None,
+                  "experience_score": None, "lexical_score": None, "error": error}
+        embedding, term_counts = None, None
+        if promoted:
+            score_data = calculate_enhanced_relevance(document, jd_text, required_years, jd_features=jd_features,
+                                                      resume_encoding=encoding, idf_table=idf_table,
+                                                      score_threshold=score_threshold, components=parts)
+            record.update(status="COMPLETED", final_score=score_data["final_score"], score_stage=2,
+                          below_threshold=score_data["below_threshold"], score_upper_bound=score_data["score_upper_bound"],
+                          semantic_score=score_data["semantic_score"], skill_score=score_data["skill_score"],
+                          experience_score=score_data["experience_score"], lexical_score=score_data["lexical_score"],
+                          error=score_data.get("error"))
+            embedding, term_counts = score_data.get("resume_embedding"), document.terms
+        elif text:
+            record.update(status="COMPLETED", final_score=stage1_score, score_stage=1)
+            term_counts = document.terms
+        records.append((record, path, embedding, term_counts))
+    return records
+
+
+# --- DB Writers ---
+def _import_into_job(job, records, storage):
+    """
+    Uploads newly scored files to the storage backend and bulk-inserts their Resume rows (one INSERT,
+    one commit). Files whose content hash the job already has are recorded as SKIPPED, not imported;
+    files another job already has are not uploaded again but share that job's document (locked until
+    the commit, see find_document).
+    """
+    from sqlalchemy import insert
+    from .extensions import db
+    from .models import Resume, StatusEnum
+    from .lexical import set_document_terms
+    from .utils.ann_index import embedding_to_bytes
+    from .documents import find_document, get_or_create_document, discard_duplicates
+    hashes = {record["content_hash"] for record, _, _, _ in records if record["content_hash"]}
+    existing = {h for (h,) in db.session.query(Resume.content_hash)
+                                        .filter(Resume.job_id == job.id, Resume.content_hash.in_(hashes))} if hashes else set()
+    rows, kept, duplicates = [], [], []
+    for record, path, embedding, term_counts in records:
+        if record["content_hash"] and record["content_hash"] in existing:
+            record.update(status="SKIPPED", error="Duplicate of a resume already in the job")
+            continue
+        if record["content_hash"]:
+            existing.add(record["content_hash"])
+        document = find_document(record["content_hash"], for_update=True)
+        if document is None:
+            name, ext = os.path.splitext(os.path.basename(path))
+            relative_path = f"{name}_{uuid.uuid4().hex[:8]}{ext.lower()}"
+            with open(path, 'rb') as f:
+                storage.put_stream(relative_path, f)
+            document, _ = get_or_create_document(relative_path, record["content_hash"], os.path.basename(path))
+            if document.storage_key != relative_path:
+                duplicates.append(relative_path)
+        failed = record["status"] != "COMPLETED"
+        rows.append({"filename": os.path.basename(path), "filepath": document.storage_key, "document_id": document.id, "job_id": job.id,
+                     "status": StatusEnum.FAILED if failed else StatusEnum.COMPLETED, "score": record["final_score"],
+                     "stage1_score": record["stage1_score"], "score_stage": record["score_stage"],
+                     "below_threshold": record["below_threshold"], "score_upper_bound": record["score_upper_bound"],
+                     "embedding": embedding_to_bytes(embedding), "content_hash": record["content_hash"],
+                     "term_counts": term_counts, "error_message": (record["error"] or None) if failed else None})
+        kept.append(record)
+    if rows:
+        ids = db.session.execute(insert(Resume).returning(Resume.id, sort_by_parameter_order=True), rows).scalars().all()
+        for record, resume_id in zip(kept, ids):
+            record["resume_id"] = resume_id
+    db.session.commit()
+    discard_duplicates(storage, duplicates)
+    set_document_terms({row["document_id"]: row["term_counts"] for row in rows})
+
+def _update_existing(records):
+    """Bulk UPDATE by primary key of re-scored resumes (one executemany, one commit)."""
+    from sqlalchemy import update
+    from .extensions import db
+    from .models import Resume, StatusEnum
+    from .lexical import set_document_terms
+    from .utils.ann_index import embedding_to_bytes
+    from .tasks import dedupe_key
+    ids = [record["resume_id"] for record, _, _, _ in records]
+    previous = db.session.query(Resume.id, Resume.term_counts, Resume.document_id).filter(Resume.id.in_(ids)).all() if ids else []
+    previous_terms = {row.id: row.term_counts for row in previous}
+    document_ids = {row.id: row.document_id for row in previous}
+    rows = []
+    for record, _, embedding, term_counts in records:
+        completed = record["status"] == "COMPLETED"
+        rows.append({"id": record["resume_id"], "status": StatusEnum.COMPLETED if completed else StatusEnum.FAILED,
+                     "score": record["final_score"], "embedding": embedding_to_bytes(embedding),
+                     "stage1_score": record["stage1_score"], "score_stage": record["score_stage"],
+                     "below_threshold": record["below_threshold"], "score_upper_bound": record["score_upper_bound"],
+                     "content_hash": record["content_hash"], "term_counts": term_counts or previous_terms.get(record["resume_id"]),
+                     "processed_key": dedupe_key(record["resume_id"], record["content_hash"]) if completed else None,
+                     "error_message": None if completed else record["error"], "claimed_by": None, "lease_expires_at": None})
+    if rows:
+        db.session.execute(update(Resume), rows)
+    db.session.commit()
+    set_document_terms({document_ids.get(row["id"]): row["term_counts"] for row in rows})
+
+
+# --- Output ---
+def write_output(records, output_path):
+    """Writes result records to CSV, or Parquet when the path ends in .parquet (needs pandas + pyarrow)."""
+    records = sorted(records, key=lambda r: (r.get("final_score") is None, -(r.get("final_score") or 0.0)))
+    if output_path.lower().endswith('.parquet'):
+        if not PANDAS_AVAILABLE:
+            raise ImportError("pandas (and pyarrow) are required for Parquet output. Install with: pip install pandas pyarrow")
+        pd.DataFrame(records, columns=OUTPUT_COLUMNS).to_parquet(output_path, index=False)
+        return
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=OUTPUT_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def run_screen(job_id=None, jd_file=None, source=None, output=None, checkpoint=None,
+               workers=None, batch_size=DEFAULT_BATCH_SIZE, required_years=None, cascade_top_n=None,
+               cascade_min_score=None, score_threshold=None, echo=print):
+    """
+    Scores every resume in `source` (directory or manifest) against a job or JD file.
+    Destinations:
+      - `output` set: CSV/Parquet file (the DB is not written).
+      - job_id + source: files are imported into the job as COMPLETED/FAILED resumes.
+      - job_id without source: the job's existing resumes are re-scored in place.
+    `cascade_top_n` / `cascade_min_score` (default: the job's settings) enable two-stage ranking
+    (see app/cascade.py): only resumes that make the stage-1 cut are encoded and fully scored.
+    `score_threshold` (default: the job's) skips encoding resumes that cannot reach it.
+    Must run inside a Flask app context when job_id is given. Returns the list of result records.
+    """
+    from .utils.cpu_tuning import worker_cpu_budget
+    from .utils.nlp import compute_jd_features, jd_features_are_current
+    from .cascade import StageOneCut, cascade_enabled
+    if not job_id and not jd_file:
+        raise ValueError("Either a job id or a JD file is required.")
+    if not job_id and not output:
+        raise ValueError("Scoring against a JD file needs an --output file (there is no job to write to).")
+    if not job_id and not source:
+        raise ValueError("A resume directory or manifest is required.")
+
+    job = None
+    if job_id:
+        from flask import current_app
+        from .extensions import db
+        from .models import Job, Resume
+        job = db.session.get(Job, job_id)
+        if job is None:
+            raise ValueError(f"Job with ID {job_id} not found.")
+        jd_text = job.description
+        required_years = required_years if required_years is not None else (job.required_years or 0)
+        jd_features = job.jd_features if jd_features_are_current(job.jd_features) else compute_jd_features(jd_text)
+        from .storage import get_storage, storage_settings
+        from .lexical import get_idf_table
+        storage = get_storage(current_app.config)
+        idf_table = get_idf_table() # Corpus IDF as of the start of the run
+        cascade_top_n = cascade_top_n if cascade_top_n is not None else job.cascade_top_n
+        cascade_min_score = cascade_min_score if cascade_min_score is not None else job.cascade_min_score
+        score_threshold = score_threshold if score_threshold is not None else job.score_threshold
+    else:
+        jd_text = read_job_description(jd_file)
+        if not jd_text:
+            raise ValueError(f"Could not read job description from {jd_file}.")
+        required_years = required_years or 0
+        jd_features = compute_jd_features(jd_text)
+        idf_table = None # No DB corpus: the lexical score is not computed
+
+    # (key, path, content_hash) work items; keys are stable across runs so the checkpoint can skip finished work
+    rescore = job is not None and not source
+    if rescore:
+        items = [(f"resume:{resume_id}", filepath, content_hash)
+                 for resume_id, filepath, content_hash in db.session.query(Resume.id, Resume.filepath, Resume.content_hash)
+                                                                    .filter(Resume.job_id == job.id).order_by(Resume.id)]
+    else:
+        items = [(os.path.abspath(path), path, None) for path in collect_inputs(source)]
+
+    cut = None
+    if cascade_enabled(cascade_top_n, cascade_min_score):
+        # Imported files compete with the resumes already in the job (a rescore replaces them all)
+        seeds = [] if rescore or job is None else \
+            [score for (score,) in db.session.query(Resume.stage1_score).filter(Resume.job_id == job.id,
+                                                                                  Resume.stage1_score.isnot(None))]
+        cut = StageOneCut(cascade_top_n, cascade_min_score, seed_scores=seeds)
+
+    done = load_checkpoint(checkpoint)
+    todo = [item for item in items if item[0] not in done]
+    workers = workers or worker_cpu_budget()
+    echo(f"{len(items)} resume(s), {len(items) - len(todo)} already in checkpoint, {len(todo)} to score "
+         f"with {workers} parser process(es), batches of {batch_size}.")
+
+    checkpoint_file = open(checkpoint, 'a', encoding='utf-8') if checkpoint else None
+    item_keys = {item[0] for item in items}
+    results = [record for key, record in done.items() if key in item_keys]
+    start = time.perf_counter(); scored = 0
+    try:
+        for parsed in _parsed_batches(todo, workers, batch_size,
+                                      storage=storage_settings(current_app.config) if rescore else None):
+            records = score_batch(parsed, jd_text, required_years, jd_features, idf_table=idf_table, cut=cut,
+                                  score_threshold=score_threshold)
+            if job is not None and not output:
+                if rescore:
+                    for record, _, _, _ in records:
+                        record["resume_id"] = int(record["key"].split(':', 1)[1])
+                    _update_existing(records)
+                else:
+                    _import_into_job(job, records, storage)
+            # Checkpoint only after the batch is durable in its destination
+            if checkpoint_file:
+                checkpoint_file.writelines(json.dumps(record) + "\n" for record, _, _, _ in records)
+                checkpoint_file.flush()
+            results.extend(record for record, _, _, _ in records)
+            scored += len(records)
+            elapsed = time.perf_counter() - start
+            echo(f"  {scored}/{len(todo)} scored ({scored / elapsed:.1f} resumes/s)")
+    finally:
+        if checkpoint_file:
+            checkpoint_file.close()
+
+    if cut is not None:
+        echo(f"Cascade: {cut.promoted} resume(s) fully scored, {cut.cut} kept their stage-1 score "
+             f"(top {cascade_top_n}, min {cascade_min_score}).")
+    if score_threshold is not None:
+        below = sum(1 for record in results if record.get("below_threshold"))
+        echo(f"Threshold {score_threshold}: {below} resume(s) could not reach it and were not encoded.")
+    if output:
+        write_output(results, output)
+        echo(f"Wrote {len(results)} result(s) to {output}")
+    return results
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Offline bulk resume screening (no Celery/Redis).")
+    parser.add_argument('source', nargs='?', help="Directory of resumes or a manifest (.txt / .csv with a 'path' column).")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--job-id', type=int, help="Score against this job (and write results to the DB unless --output).")
+    target.add_argument('--jd-file', help="Score against a job description text file (requires --output).")
+    parser.add_argument('--output', help="Write results to this .csv or .parquet file instead of the DB.")
+    parser.add_argument('--checkpoint', help="JSONL progress file; re-running with it skips finished resumes.")
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: WORKER_CPUS / all cores).")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Resumes per encoder batch / DB write.")
+    parser.add_argument('--required-years', type=int, default=None, help="Override the required years of experience.")
+    parser.add_argument('--cascade-top-n', type=int, default=None, help="Fully score only the top N by stage-1 score (default: the job's setting).")
+    parser.add_argument('--cascade-min-score', type=float, default=None, help="Also fully score any resume with a stage-1 score at/above this.")
+    parser.add_argument('--score-threshold', type=float, default=None, help="Skip encoding resumes that cannot reach this score (default: the job's).")
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING) # Per-resume scoring logs are INFO
+
+    options = dict(job_id=args.job_id, jd_file=args.jd_file, source=args.source, output=args.output,
+                   checkpoint=args.checkpoint, workers=args.workers, batch_size=args.batch_size,
+                   required_years=args.required_years, cascade_top_n=args.cascade_top_n,
+                   cascade_min_score=args.cascade_min_score, score_threshold=args.score_threshold)
+    try:
+        if args.job_id:
+            from . import create_app
+            app = create_app()
+            with app.app_context():
+                run_screen(**options)
+        else:
+            run_screen(**options)
+    except (ValueError, ImportError) as e:
+        raise SystemExit(f"error: {e}")
+
+
+if __name__ == '__main__':
+    main()
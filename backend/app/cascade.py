@@ -0,0 +1,91 @@
+# backend/app/cascade.py
+#
+# Two-stage ranking for large pools. Every resume gets the cheap stage-1 score (keyword skills +
+# corpus TF-IDF, see nlp.calculate_stage1_relevance); only those in the job's top cascade_top_n
+# by stage-1 score, or at/above cascade_min_score, go on to stage 2 (calculate_enhanced_relevance:
+# spaCy, experience parsing, the sentence encoder). The rest keep their stage-1 score.
+#
+# The top-N decision is made online, as each resume is processed, against the resumes scored so far.
+# A resume outside the top N of the pool seen so far can never enter the final top N (the set above
+# it only grows), so the stage-2 set always covers the final top N. Concurrent tasks can each see
+# fewer competitors than exist, which only promotes more resumes, never fewer.
+
+import heapq
+import logging
+from sqlalchemy import func, case
+from .extensions import db
+from .models import Resume, StatusEnum
+
+logger = logging.getLogger(__name__)
+
+
+def cascade_enabled(top_n, min_score):
+    return top_n is not None or min_score is not None
+
+def needs_full_scoring(job_id, resume_id, stage1_score, top_n, min_score):
+    """
+    Whether a resume goes to stage 2: always when the cascade is off; otherwise when its stage-1
+    score reaches `min_score`, or fewer than `top_n` other resumes of the job scored higher.
+    """
+    if not cascade_enabled(top_n, min_score):
+        return True
+    if min_score is not None and stage1_score >= min_score:
+        return True
+    if top_n is None:
+        return False
+    ahead = (db.session.query(func.count(Resume.id))
+             .filter(Resume.job_id == job_id, Resume.id != resume_id, Resume.stage1_score > stage1_score)
+             .scalar())
+    return ahead < top_n
+
+class StageOneCut:
+    """
+    In-memory needs_full_scoring for one offline run (app/batch.py): a min-heap of the `top_n` best
+    stage-1 scores seen so far, optionally seeded with the scores of resumes already in the job.
+    """
+
+    def __init__(self, top_n=None, min_score=None, seed_scores=()):
+        self.top_n = top_n
+        self.min_score = min_score
+        self._best = []
+        self.promoted = 0
+        self.cut = 0
+        for score in seed_scores:
+            self._push(score)
+
+    def _push(self, score):
+        if self.top_n is None:
+            return False
+        if len(self._best) < self.top_n:
+            heapq.heappush(self._best, score)
+            return True
+        if score >= self._best[0]:
+            heapq.heapreplace(self._best, score)
+            return True
+        return False
+
+    def admit(self, score):
+        """Records `score` and returns whether its resume goes to stage 2."""
+        in_top_n = self._push(score)
+        promoted = not cascade_enabled(self.top_n, self.min_score) or in_top_n or \
+            (self.min_score is not None and score >= self.min_score)
+        if promoted:
+            self.promoted += 1
+        else:
+            self.cut += 1
+        return promoted
+
+def cascade_summary(job_id):
+    """
+    How much work the cascade and the score threshold saved on a job's completed resumes: resumes kept
+    at stage 1, and fully scored ones whose semantic (encoder) step was skipped as below the threshold.
+    """
+    full, stage1_only, below = (db.session.query(func.count(case((Resume.score_stage == 2, Resume.id))),
+                                                 func.count(case((Resume.score_stage == 1, Resume.id))),
+                                                 func.count(case((Resume.below_threshold.is_(True), Resume.id))))
+                                .filter(Resume.job_id == job_id, Resume.status == StatusEnum.COMPLETED)
+                                .one())
+    scored = full + stage1_only
+    return {"scored": scored, "stage2": full, "stage1_only": stage1_only, "below_threshold": below,
+            "stage2_skipped_ratio": round(stage1_only / scored, 4) if scored else 0.0,
+            "encoder_skipped_ratio": round((stage1_only + below) / scored, 4) if scored else 0.0}
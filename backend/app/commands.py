@@ -0,0 +1,152 @@
+# backend/app/commands.py
+
+import os
+import glob
+import click
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESUMES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'resumes'))
+
+
+def register_commands(app):
+    """Registers the project's `flask <command>` CLI commands on the app."""
+
+    @app.cli.command('reap-stale')
+    @click.option('--batch-size', type=int, default=None, help="Rows per sweep statement (default: REAPER_BATCH_SIZE).")
+    @click.option('--max-batches', type=int, default=None, help="Statements per run (default: REAPER_MAX_BATCHES).")
+    @click.option('--dry-run', is_flag=True, help="Only count resumes whose lease has expired.")
+    def reap_stale(batch_size, max_batches, dry_run):
+        """Requeues resumes stuck PENDING/PROCESSING past their lease (same sweep as the beat task)."""
+        from .reaper import reap_stale_resumes
+        counts = reap_stale_resumes(batch_size=batch_size, max_batches=max_batches, dry_run=dry_run)
+        if dry_run:
+            click.echo(f"{counts['stale']} resume(s) past their lease.")
+        else:
+            click.echo(f"Requeued {counts['requeued']} ({counts['dispatched']} dispatched, {counts['overdue']} overdue), "
+                       f"{counts['waiting']} still queued, failed {counts['failed']}.")
+
+    @app.cli.command('snapshot-ann-index')
+    def snapshot_ann_index():
+        """Catches the ANN index snapshot up with the DB and writes it (same as the beat task)."""
+        from .search import build_resume_index_snapshot
+        click.echo(f"ANN index snapshot written: {build_resume_index_snapshot()} resume(s).")
+
+    @app.cli.command('screen')
+    @click.argument('source', required=False)
+    @click.option('--job-id', type=int, default=None, help="Score against this job (results go to the DB unless --output).")
+    @click.option('--jd-file', default=None, help="Score against a job description text file (requires --output).")
+    @click.option('--output', default=None, help="Write results to this .csv or .parquet file instead of the DB.")
+    @click.option('--checkpoint', default=None, help="JSONL progress file; re-running with it skips finished resumes.")
+    @click.option('--workers', type=int, default=None, help="Parser processes (default: WORKER_CPUS / all cores).")
+    @click.option('--batch-size', type=int, default=64, show_default=True, help="Resumes per encoder batch / DB write.")
+    @click.option('--required-years', type=int, default=None, help="Override the required years of experience.")
+    @click.option('--cascade-top-n', type=int, default=None, help="Fully score only the top N by stage-1 score (default: the job's setting).")
+    @click.option('--cascade-min-score', type=float, default=None, help="Also fully score any resume with a stage-1 score at/above this.")
+    @click.option('--score-threshold', type=float, default=None, help="Skip encoding resumes that cannot reach this score (default: the job's).")
+    def screen(source, job_id, jd_file, output, checkpoint, workers, batch_size, required_years, cascade_top_n, cascade_min_score,
+               score_threshold):
+        """Offline bulk scoring of a resume directory/manifest (no Celery or Redis). See app/batch.py."""
+        from .batch import run_screen
+        if bool(job_id) == bool(jd_file):
+            raise click.UsageError("Pass exactly one of --job-id or --jd-file.")
+        try:
+            run_screen(job_id=job_id, jd_file=jd_file, source=source, output=output, checkpoint=checkpoint,
+                       workers=workers, batch_size=batch_size, required_years=required_years,
+                       cascade_top_n=cascade_top_n, cascade_min_score=cascade_min_score, score_threshold=score_threshold,
+                       echo=click.echo)
+        except (ValueError, ImportError) as e:
+            raise click.ClickException(str(e))
+
+    @app.cli.command('warm-text-cache')
+    @click.option('--job-id', type=int, default=None, help="Only this job's resumes (default: all).")
+    @click.option('--rebuild', is_flag=True, help="Re-extract and overwrite existing artifacts (e.g. after a parser change).")
+    @click.option('--workers', type=int, default=None, help="Parser processes (default: WORKER_CPUS / CPU count).")
+    def warm_text_cache(job_id, rebuild, workers):
+        """Builds extracted-text artifacts for stored resumes in parallel (one per distinct file content)."""
+        from sqlalchemy import update, bindparam
+        from .extensions import db
+        from .models import Resume
+        from .storage import storage_settings
+        from .text_cache import warm_text_artifacts
+        from .utils.cpu_tuning import worker_cpu_budget
+
+        settings = storage_settings(app.config)
+        if not settings.get('TEXT_ARTIFACTS_ENABLED'):
+            raise click.ClickException("TEXT_ARTIFACTS_ENABLED is off; nothing to warm.")
+        query = db.session.query(Resume.filepath, Resume.content_hash).order_by(Resume.id)
+        if job_id:
+            query = query.filter(Resume.job_id == job_id)
+        items, seen = [], set()
+        for filepath, content_hash in query:
+            if content_hash and content_hash in seen:
+                continue # Same bytes as a file already queued: one artifact serves both
+            seen.add(content_hash)
+            items.append((filepath, content_hash))
+        workers = workers or worker_cpu_budget()
+        click.echo(f"{len(items)} distinct resume file(s); {'rebuilding' if rebuild else 'warming'} with {workers} process(es)...")
+
+        unhashed = {filepath for filepath, content_hash in items if not content_hash}
+        hashed = [] # Rows uploaded before content hashes existed get theirs recorded
+        def on_result(result):
+            filepath, content_hash, outcome, error = result
+            if error:
+                click.echo(f"  {filepath}: {error}", err=True)
+            if content_hash and filepath in unhashed:
+                hashed.append({"fp": filepath, "hash": content_hash})
+
+        counts = warm_text_artifacts(items, settings, workers=workers, rebuild=rebuild, on_result=on_result)
+        if hashed:
+            db.session.execute(update(Resume.__table__)
+                               .where(Resume.__table__.c.filepath == bindparam('fp'), Resume.__table__.c.content_hash.is_(None))
+                               .values(content_hash=bindparam('hash')), hashed)
+            db.session.commit()
+        click.echo(f"Done: {counts['built']} built, {counts['cached']} already cached, {counts['empty']} without text, "
+                   f"{counts['error']} error(s); {len(hashed)} content hash(es) backfilled.")
+
+    @app.cli.command('rebuild-lexical-index')
+    @click.option('--backfill', is_flag=True, help="First compute term counts for completed resumes that have none "
+                                                   "(from their extracted-text artifacts).")
+    @click.option('--batch-size', type=int, default=500, show_default=True, help="Resumes per read/update batch.")
+    def rebuild_lexical_index(backfill, batch_size):
+        """Recomputes the corpus TF-IDF vocabulary (lexical_terms) from the stored document term counts."""
+        from .lexical import rebuild_lexical_terms
+        from .storage import get_storage
+        counts = rebuild_lexical_terms(storage=get_storage() if backfill else None, backfill=backfill,
+                                       batch_size=batch_size, echo=click.echo)
+        click.echo(f"Done: {counts['terms']} term(s) over {counts['documents']} document(s); "
+                   f"{counts['backfilled']} resume(s) backfilled.")
+
+    @app.cli.command('tune-worker')
+    @click.option('--resumes-dir', default=DEFAULT_RESUMES_DIR, show_default=True,
+                  help="Directory of sample resumes used as the encoding workload.")
+    @click.option('--cpus', type=int, default=None, help="CPU budget to split (default: WORKER_CPUS / auto-detect).")
+    @click.option('--repeats', type=int, default=2, show_default=True)
+    def tune_worker(resumes_dir, cpus, repeats):
+        """Benchmarks processes x torch-threads splits of the CPU budget and recommends worker settings."""
+        from .utils.cpu_tuning import autotune, worker_cpu_budget
+        from .utils.parsers import extract_text_from_file
+        from .utils.nlp import chunk_text_for_encoding, ENCODE_BATCH_SIZE
+
+        texts = []
+        for path in sorted(glob.glob(os.path.join(resumes_dir, '*'))):
+            text = extract_text_from_file(path)
+            if text:
+                texts.extend(chunk_text_for_encoding(text))
+        if not texts:
+            raise click.ClickException(f"No text could be extracted from resumes in {resumes_dir}.")
+        cpus = cpus or worker_cpu_budget()
+        click.echo(f"Benchmarking {len(texts)} chunk(s) on a budget of {cpus} CPU(s)...")
+        results, best = autotune(texts, cpus=cpus, batch_size=ENCODE_BATCH_SIZE, repeats=repeats)
+        click.echo(f"{'processes':>10}{'threads':>9}{'texts/s':>10}")
+        for result in results:
+            marker = '  <- best' if result is best else ''
+            click.echo(f"{result['processes']:>10}{result['threads']:>9}{result['texts_per_sec']:>10.1f}{marker}")
+        if not best or best["texts_per_sec"] <= 0:
+            raise click.ClickException("Encoder unavailable; nothing to recommend.")
+        if best["processes"] == 1:
+            click.echo(f"\nRecommended: WORKER_CPUS={cpus} with '-P gevent' (one process, {best['threads']} torch threads).")
+        else:
+            click.echo(f"\nRecommended: WORKER_CPUS={cpus} WORKER_THREADS_PER_PROCESS={best['threads']} with '-P prefork' "
+                       f"({best['processes']} children).")
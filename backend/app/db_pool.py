@@ -0,0 +1,94 @@
+# backend/app/db_pool.py
+
+import time
+import threading
+import logging
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Counters fed by SQLAlchemy pool events; read via /health/db-pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.started_at = time.time()
+
+    def install(self, engine):
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self, engine=None):
+        with self._lock:
+            data = {"connects": self.connects, "checkouts": self.checkouts, "checkins": self.checkins,
+                    "invalidations": self.invalidations, "checked_out": self.checked_out,
+                    "max_checked_out": self.max_checked_out, "uptime_seconds": round(time.time() - self.started_at, 1)}
+        pool = engine.pool if engine is not None else None
+        if pool is not None:
+            data["pool_class"] = type(pool).__name__
+            data["pool_status"] = pool.status()
+            for attr in ('size', 'overflow', 'checkedin'):
+                if hasattr(pool, attr):
+                    data[f"pool_{attr}"] = getattr(pool, attr)()
+        return data
+
+
+pool_metrics = PoolMetrics()
+
+
+def patch_psycopg2_for_gevent():
+    """
+    Makes psycopg2 cooperative under gevent (same approach as psycogreen): queries yield to the hub
+    instead of blocking every greenlet in the worker. Returns True if the wait callback was installed.
+    """
+    try:
+        import psycopg2
+        from psycopg2 import extensions
+        from gevent.socket import wait_read, wait_write
+    except ImportError:
+        logger.warning("psycopg2/gevent not available; skipping gevent psycopg2 patch.")
+        return False
+
+    def gevent_wait_callback(conn, timeout=None):
+        while True:
+            state = conn.poll()
+            if state == extensions.POLL_OK:
+                break
+            elif state == extensions.POLL_READ:
+                wait_read(conn.fileno(), timeout=timeout)
+            elif state == extensions.POLL_WRITE:
+                wait_write(conn.fileno(), timeout=timeout)
+            else:
+                raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+    extensions.set_wait_callback(gevent_wait_callback)
+    logger.info("psycopg2 patched for gevent (cooperative wait callback installed).")
+    return True
@@ -0,0 +1,112 @@
+# backend/app/documents.py
+#
+# Candidate documents: one row per distinct resume file (by content hash), shared by every job
+# application (Resume row) that uses it. An upload of bytes the system already has reuses the
+# stored copy instead of keeping a second one, and the worker caches the job-independent work on
+# the document (parsed resume features, the encoder output), so storage, parsing and encoding
+# scale with unique documents; each application only adds its own per-job score.
+
+import logging
+import numpy as np
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from .extensions import db
+from .lexical import remove_documents
+from .models import CandidateDocument, Resume
+from .utils.ann_index import embedding_to_bytes, embedding_from_bytes
+from .utils.nlp import encoder_signature
+
+logger = logging.getLogger(__name__)
+
+
+def find_document(content_hash, for_update=False):
+    """
+    The document holding these bytes, or None (also for files without a content hash). With
+    for_update, the row stays locked until the caller commits, so release_document cannot delete it
+    while an application that reuses it is being added.
+    """
+    if not content_hash:
+        return None
+    query = CandidateDocument.query.filter_by(content_hash=content_hash)
+    return (query.with_for_update() if for_update else query).first()
+
+def get_or_create_document(storage_key, content_hash, filename):
+    """
+    The document for a file just stored under `storage_key`. When a document with the same content
+    hash exists, it is locked (see find_document) and returned; the new copy is then a duplicate the
+    caller deletes with discard_duplicates once its transaction has committed (deleting it earlier
+    would lose the only copy if that document is released before the commit).
+    Runs in a savepoint (a concurrent upload of the same bytes wins the unique hash) and flushes,
+    but does not commit. Returns (document, created).
+    """
+    existing = find_document(content_hash, for_update=True)
+    if existing is not None:
+        return existing, False
+    document = CandidateDocument(content_hash=content_hash, storage_key=storage_key, filename=filename)
+    try:
+        with db.session.begin_nested():
+            db.session.add(document)
+    except IntegrityError:
+        existing = find_document(content_hash, for_update=True)
+        if existing is None:
+            raise
+        return existing, False
+    return document, True
+
+def discard_duplicates(storage, keys):
+    """Deletes uploaded copies that turned out to duplicate a stored document. Call after the commit."""
+    for key in keys:
+        try:
+            storage.delete(key)
+        except Exception as e:
+            logger.warning(f"Could not delete duplicate upload '{key}': {e}")
+
+def release_document(storage, document_id, filepath):
+    """
+    Called after an application was deleted: removes its document once no application references it
+    (with its terms from the corpus document frequencies), and each stored file (the document's, and the row's own path when it was a separate copy, e.g. a
+    duplicate uploaded before documents existed) that nothing references any more. The document row
+    is locked before the check, so an upload reusing it either commits first (and keeps it) or finds
+    it gone and keeps its own copy. Commits. Returns the storage keys that were deleted.
+    """
+    keys = {filepath}
+    document = db.session.query(CandidateDocument).filter_by(id=document_id).with_for_update().first() if document_id else None
+    if document is not None and db.session.query(Resume.id).filter(Resume.document_id == document_id).first() is None:
+        keys.add(document.storage_key)
+        db.session.delete(document)
+        remove_documents([document.term_counts] if document.term_counts else [])
+    db.session.commit()
+    deleted = []
+    for key in sorted(keys):
+        in_use = db.session.query(Resume.id).filter(Resume.filepath == key).first() is not None or \
+            db.session.query(CandidateDocument.id).filter(CandidateDocument.storage_key == key).first() is not None
+        if not in_use:
+            storage.delete(key)
+            deleted.append(key)
+    return deleted
+
+
+def save_document_features(document_id, features):
+    """Caches compute_resume_features output on the document. Commits."""
+    db.session.execute(update(CandidateDocument).where(CandidateDocument.id == document_id).values(features=features)
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+
+def save_document_encoding(document_id, encoding):
+    """Caches an encode_document (chunk_embeddings, document_embedding) pair on the document. Commits."""
+    chunk_embeddings, embedding = encoding
+    if chunk_embeddings is None:
+        return
+    db.session.execute(update(CandidateDocument).where(CandidateDocument.id == document_id)
+                       .values(chunk_embeddings=embedding_to_bytes(chunk_embeddings), embedding=embedding_to_bytes(embedding),
+                               encoder=encoder_signature())
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+
+def document_encoding(chunk_blob, embedding_blob, encoder):
+    """The cached (chunk_embeddings, document_embedding) pair, or None when missing or from another encoder."""
+    embedding = embedding_from_bytes(embedding_blob)
+    if embedding is None or not chunk_blob or encoder != encoder_signature():
+        return None
+    return np.frombuffer(chunk_blob, dtype=np.float32).reshape(-1, len(embedding)), embedding
+
@@ -0,0 +1,198 @@
+# backend/app/lexical.py
+#
+# Corpus-level TF-IDF. Each scored candidate document stores its lexical term counts
+# (CandidateDocument.term_counts, a sparse vector) and adds 1 to the document frequency of each of its
+# terms in `lexical_terms`, so the vocabulary and IDF are fitted incrementally over every distinct
+# resume file in the system: a file sent to several jobs counts once, like any other. Applications
+# keep a copy (Resume.term_counts), so scoring a job's whole pool against its JD is one sparse
+# matrix-vector product over its own rows (utils/lexical.py); nothing is refitted per call.
+
+import time
+import threading
+import logging
+from collections import Counter
+from flask import current_app
+from sqlalchemy import update, delete, func
+from .extensions import db
+from .models import CandidateDocument, Resume, LexicalTerm, StatusEnum
+from .utils.lexical import IdfTable, lexical_scores
+
+logger = logging.getLogger(__name__)
+
+UPSERT_CHUNK = 1000
+
+# One IDF table per process, re-read from the DB at most every LEXICAL_IDF_TTL_SECONDS
+_idf_table = None
+_idf_loaded_at = 0.0
+_idf_lock = threading.Lock()
+
+
+def _upsert_increments(increments):
+    """doc_freq += n for {term: n}, inserting unseen terms (one statement per chunk where the dialect has ON CONFLICT)."""
+    dialect = db.session.get_bind().dialect.name
+    items = sorted(increments.items()) # Fixed lock order across concurrent writers
+    for start in range(0, len(items), UPSERT_CHUNK):
+        rows = [{"term": term, "doc_freq": n} for term, n in items[start:start + UPSERT_CHUNK]]
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(LexicalTerm).values(rows)
+            db.session.execute(stmt.on_conflict_do_update(index_elements=[LexicalTerm.term],
+                                                          set_={"doc_freq": LexicalTerm.doc_freq + stmt.excluded.doc_freq}))
+            continue
+        for row in rows:
+            updated = db.session.execute(update(LexicalTerm).where(LexicalTerm.term == row["term"])
+                                         .values(doc_freq=LexicalTerm.doc_freq + row["doc_freq"])
+                                         .execution_options(synchronize_session=False))
+            if updated.rowcount == 0:
+                db.session.add(LexicalTerm(**row))
+
+def _apply_decrements(decrements):
+    """doc_freq -= n for {term: n}; terms no document uses any more are dropped from the vocabulary."""
+    by_amount = {}
+    for term, n in decrements.items():
+        by_amount.setdefault(n, []).append(term)
+    for n, terms in by_amount.items():
+        for start in range(0, len(terms), UPSERT_CHUNK):
+            chunk = terms[start:start + UPSERT_CHUNK]
+            db.session.execute(update(LexicalTerm).where(LexicalTerm.term.in_(chunk))
+                               .values(doc_freq=LexicalTerm.doc_freq - n).execution_options(synchronize_session=False))
+            db.session.execute(delete(LexicalTerm).where(LexicalTerm.term.in_(chunk), LexicalTerm.doc_freq <= 0)
+                               .execution_options(synchronize_session=False))
+
+def update_document_frequencies(changes):
+    """
+    Document-frequency bookkeeping for documents whose term_counts changed, given (new_terms, old_terms)
+    pairs (None for a new or a deleted document): +1 for each term a document gained, -1 for each it lost.
+    Commits.
+    """
+    increments, decrements = Counter(), Counter()
+    for new_terms, old_terms in changes:
+        new_set, old_set = set(new_terms or ()), set(old_terms or ())
+        increments.update(new_set - old_set)
+        decrements.update(old_set - new_set)
+    if not increments and not decrements:
+        return
+    if increments:
+        _upsert_increments(increments)
+    if decrements:
+        _apply_decrements(decrements)
+    db.session.commit()
+
+def set_document_terms(terms_by_document):
+    """
+    Stores term counts on candidate documents ({document_id: term_counts}) and folds what changed into
+    the document frequencies, so each document counts once however many applications (re)score it.
+    The document rows are locked while they are compared, so concurrent scorings of one file add it once.
+    Commits.
+    """
+    terms_by_document = {document_id: terms for document_id, terms in terms_by_document.items() if document_id and terms}
+    if not terms_by_document:
+        return
+    current = dict(db.session.query(CandidateDocument.id, CandidateDocument.term_counts)
+                   .filter(CandidateDocument.id.in_(terms_by_document)).order_by(CandidateDocument.id).with_for_update())
+    changed = [(document_id, terms) for document_id, terms in sorted(terms_by_document.items())
+               if document_id in current and current[document_id] != terms]
+    if changed:
+        db.session.execute(update(CandidateDocument), [{"id": document_id, "term_counts": terms} for document_id, terms in changed])
+    update_document_frequencies((terms, current[document_id]) for document_id, terms in changed)
+    db.session.commit()
+
+def record_document_terms(document_id, terms):
+    """set_document_terms for one document (the worker, after its result is written)."""
+    set_document_terms({document_id: terms})
+
+def remove_documents(term_counts_list):
+    """update_document_frequencies for deleted documents, given their term_counts."""
+    update_document_frequencies((None, term_counts) for term_counts in term_counts_list)
+
+
+def load_idf_table():
+    """Reads the whole vocabulary; N is the number of documents that contributed term counts."""
+    doc_freqs = dict(db.session.query(LexicalTerm.term, LexicalTerm.doc_freq))
+    n_docs = db.session.query(func.count(CandidateDocument.id)).filter(CandidateDocument.term_counts.isnot(None)).scalar() or 0
+    return IdfTable(doc_freqs, n_docs)
+
+def get_idf_table(force=False):
+    """This process's IDF table, reloaded once it is older than LEXICAL_IDF_TTL_SECONDS."""
+    global _idf_table, _idf_loaded_at
+    ttl = current_app.config.get('LEXICAL_IDF_TTL_SECONDS', 300)
+    with _idf_lock:
+        if force or _idf_table is None or time.monotonic() - _idf_loaded_at > ttl:
+            _idf_table = load_idf_table()
+            _idf_loaded_at = time.monotonic()
+            logger.debug(f"Loaded IDF table: {len(_idf_table)} term(s) over {_idf_table.n_docs} document(s).")
+        return _idf_table
+
+
+def score_job_pool(job_id, query_terms, idf_table=None, limit=None):
+    """
+    Corpus TF-IDF similarity of every resume of a job (that has term counts) to `query_terms`,
+    computed as one sparse matrix-vector product. Returns [(resume_id, score)], best first.
+    """
+    rows = db.session.query(Resume.id, Resume.term_counts).filter(Resume.job_id == job_id,
+                                                                   Resume.term_counts.isnot(None)).all()
+    if not rows:
+        return []
+    scores = lexical_scores([row.term_counts for row in rows], query_terms, idf_table or get_idf_table())
+    ranked = sorted(zip((row.id for row in rows), scores.tolist()), key=lambda pair: -pair[1])
+    return ranked[:limit] if limit else ranked
+
+
+def rebuild_lexical_terms(storage=None, backfill=False, batch_size=500, echo=None):
+    """
+    Recomputes `lexical_terms` from scratch out of every stored CandidateDocument.term_counts (repairs
+    drift, e.g. after a crash between a result write and its frequency update). With `backfill`, COMPLETED
+    resumes without term counts (imported by `flask screen`, or scored before they existed) first
+    get them from their extracted-text artifact; resumes without an artifact are left out. Documents
+    without term counts take them from one of their applications.
+    Returns {"backfilled", "documents", "terms"}.
+    """
+    from .text_cache import load_text_artifact
+    from .utils.document import Document
+    backfilled = 0
+    if backfill:
+        missing = (db.session.query(Resume.id, Resume.content_hash)
+                   .filter(Resume.status == StatusEnum.COMPLETED, Resume.term_counts.is_(None),
+                           Resume.content_hash.isnot(None)).order_by(Resume.id).all())
+        for start in range(0, len(missing), batch_size):
+            rows, artifacts = [], {} # Identical files in a batch share one artifact read
+            for resume_id, content_hash in missing[start:start + batch_size]:
+                if content_hash not in artifacts:
+                    artifact = load_text_artifact(storage, content_hash) if storage is not None else None
+                    artifacts[content_hash] = Document(artifact["text"]).terms if artifact else None
+                if artifacts[content_hash]:
+                    rows.append({"id": resume_id, "term_counts": artifacts[content_hash]})
+            if rows:
+                db.session.execute(update(Resume), rows)
+                db.session.commit()
+                backfilled += len(rows)
+            if echo:
+                echo(f"  backfill: {min(start + batch_size, len(missing))}/{len(missing)} checked, {backfilled} filled")
+
+    unfilled = (db.session.query(Resume.document_id, Resume.term_counts)
+                .join(CandidateDocument, CandidateDocument.id == Resume.document_id)
+                .filter(CandidateDocument.term_counts.is_(None), Resume.term_counts.isnot(None)).order_by(Resume.id).all())
+    by_document = {}
+    for document_id, term_counts in unfilled:
+        by_document.setdefault(document_id, term_counts)
+    rows = [{"id": document_id, "term_counts": term_counts} for document_id, term_counts in by_document.items()]
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(update(CandidateDocument), rows[start:start + batch_size])
+    db.session.commit()
+
+    doc_freqs, documents = Counter(), 0
+    query = (db.session.query(CandidateDocument.term_counts).filter(CandidateDocument.term_counts.isnot(None))
+             .execution_options(yield_per=batch_size))
+    for (term_counts,) in query:
+        doc_freqs.update(term_counts.keys())
+        documents += 1
+    db.session.execute(delete(LexicalTerm))
+    rows = [{"term": term, "doc_freq": n} for term, n in doc_freqs.items()]
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        db.session.execute(LexicalTerm.__table__.insert(), rows[start:start + UPSERT_CHUNK])
+    db.session.commit()
+    get_idf_table(force=True)
+    return {"backfilled": backfilled, "documents": documents, "terms": len(rows)}
@@ -22,27 +22,92 @@ class Job(db.Model):
     # --- ADDED LINE ---
     required_years = db.Column(db.Integer, nullable=True) # Store required years (can be null if not specified)
     # ------------------
+    # Cached JD-side scoring features (skills, embedding); recomputed by the worker when NULL or stale
+    jd_features = db.Column(db.JSON, nullable=True)
+    # Two-stage ranking (see app/cascade.py): only resumes whose cheap stage-1 score ranks in the top
+    # cascade_top_n of the job, or reaches cascade_min_score, get the full (spaCy + encoder) scoring.
+    # Both NULL = cascade off, every resume is fully scored.
+    cascade_top_n = db.Column(db.Integer, nullable=True)
+    cascade_min_score = db.Column(db.Float, nullable=True)
+    # Early exit: a resume whose best reachable score is below this skips the semantic (encoder) step
+    score_threshold = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     resumes = db.relationship('Resume', backref=db.backref('job', lazy=True), lazy='dynamic', cascade="all, delete-orphan")
 
     def __repr__(self):
         return f'<Job id={self.id} title="{self.title[:30]}...">'
 
+class CandidateDocument(db.Model):
+    """
+    One distinct resume file (by content hash), shared by every job application (Resume row) that uses it.
+    Holds the stored file and the job-independent work done on it (see app/documents.py), so storage,
+    parsing and encoding happen once per unique document rather than once per application.
+    """
+    __tablename__ = 'documents'
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=True, unique=True) # sha256 of the file (NULL for legacy files)
+    storage_key = db.Column(db.String(512), nullable=False, unique=True) # Key of the one stored copy
+    filename = db.Column(db.String(255), nullable=False) # Original name of the first upload
+    # Cached resume-side scoring features (skills, years, terms); recomputed by the worker when NULL or stale
+    features = db.Column(db.JSON(none_as_null=True), nullable=True)
+    # Cached encoder output (float32 bytes): per-chunk embeddings and their normalized mean, valid for `encoder`
+    chunk_embeddings = db.Column(db.LargeBinary, nullable=True)
+    embedding = db.Column(db.LargeBinary, nullable=True)
+    encoder = db.Column(db.String(255), nullable=True) # nlp.encoder_signature() the embeddings were computed with
+    # Lexical term counts {term: count}: what the corpus document frequencies count, once per document (see app/lexical.py)
+    term_counts = db.Column(db.JSON(none_as_null=True), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    applications = db.relationship('Resume', backref=db.backref('document', lazy=True), lazy='dynamic')
+
+    def __repr__(self):
+        return f'<CandidateDocument id={self.id} filename="{self.filename}">'
+
 class Resume(db.Model):
+    """One application: a candidate document submitted to a job, with its per-job status and scores."""
     __tablename__ = 'resumes'
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
-    filepath = db.Column(db.String(512), nullable=False)
+    filepath = db.Column(db.String(512), nullable=False) # The document's storage_key (kept on the row for the worker/reaper)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), nullable=True, index=True)
     status = db.Column(db.Enum(StatusEnum), default=StatusEnum.PENDING, nullable=False, index=True)
     score = db.Column(db.Float, nullable=True, index=True) # Final weighted score
+    stage1_score = db.Column(db.Float, nullable=True) # Cheap skill + TF-IDF score every resume gets (cascade ranking)
+    score_stage = db.Column(db.SmallInteger, nullable=True) # 2 = fully scored, 1 = `score` is the stage-1 score
+    # Set when the job's score_threshold was out of reach: `score` then counts the semantic score as 0
+    below_threshold = db.Column(db.Boolean, nullable=True)
+    score_upper_bound = db.Column(db.Float, nullable=True) # Best final score the resume could still have reached
     # Optional: Add fields to store component scores if desired for API/frontend
     # semantic_score = db.Column(db.Float, nullable=True)
     # skill_score = db.Column(db.Float, nullable=True)
     # experience_score = db.Column(db.Float, nullable=True)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     job_id = db.Column(db.Integer, db.ForeignKey('jobs.id', ondelete='CASCADE'), nullable=False, index=True)
-    # Optional: Store processing errors
-    # error_message = db.Column(db.String(500), nullable=True)
+    # Normalized sentence embedding (float32 bytes) kept for cross-job candidate search (see app/search.py)
+    embedding = db.Column(db.LargeBinary, nullable=True)
+    # --- Idempotent processing ---
+    content_hash = db.Column(db.String(64), nullable=True, index=True) # sha256 of the uploaded file
+    claimed_by = db.Column(db.String(155), nullable=True)    # Celery task id that owns the PROCESSING run
+    processed_key = db.Column(db.String(80), nullable=True)  # "<resume_id>:<content_hash>" of the completed run
+    # --- Leases (see app/reaper.py) ---
+    lease_expires_at = db.Column(db.DateTime, nullable=True) # Deadline of the current PENDING/PROCESSING lease
+    requeue_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    pending_renewals = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Expired PENDING leases renewed since the last dispatch
+    # The document's lexical term counts, copied onto the row so a job's pool is scored from its own rows (app/lexical.py)
+    term_counts = db.Column(db.JSON(none_as_null=True), nullable=True)
+    # Reason for the last permanent failure (or exhausted retries); cleared on success
+    error_message = db.Column(db.String(500), nullable=True)
+
+    __table_args__ = (db.Index('ix_resumes_status_lease_expires_at', 'status', 'lease_expires_at'),
+                      db.Index('ix_resumes_job_id_stage1_score', 'job_id', 'stage1_score'))
+
+    def __repr__(self):
+        return f'<Resume id={self.id} filename="{self.filename}" status={self.status.name}>'
+
+class LexicalTerm(db.Model):
+    """Corpus vocabulary: in how many candidate documents (with term_counts) each term occurs. Feeds the TF-IDF IDF."""
+    __tablename__ = 'lexical_terms'
+    term = db.Column(db.String(64), primary_key=True)
+    doc_freq = db.Column(db.Integer, nullable=False, default=0)
 
     def __repr__(self):
-        return f'<Resume id={self.id} filename="{self.filename}" status={self.status.name}>'
\ No newline at end of file
+        return f'<LexicalTerm term="{self.term}" doc_freq={self.doc_freq}>'
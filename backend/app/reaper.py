@@ -0,0 +1,168 @@
+# backend/app/reaper.py
+
+import logging
+from datetime import datetime, timedelta
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import update, select
+from .extensions import db
+from .models import Resume, StatusEnum
+from .scheduling import queue_for_upload, bulk_queue_for_job, INTERACTIVE_QUEUE
+
+logger = logging.getLogger(__name__)
+
+LEASED_STATUSES = (StatusEnum.PENDING, StatusEnum.PROCESSING)
+
+
+def pending_lease_expiry(config, now=None):
+    """Deadline for a PENDING resume to be claimed before the reaper re-dispatches it."""
+    return (now or datetime.utcnow()) + timedelta(seconds=config.get('RESUME_PENDING_LEASE_SECONDS', 900))
+
+def processing_lease_expiry(config, now=None):
+    """Deadline for a PROCESSING resume to be finished before the reaper assumes its worker died."""
+    return (now or datetime.utcnow()) + timedelta(seconds=config.get('RESUME_PROCESSING_LEASE_SECONDS', 900))
+
+
+def _stale_ids(now, limit, status, poisoned=None):
+    """
+    Up to `limit` expired leases in `status`, oldest first, via the (status, lease_expires_at) index
+    (`poisoned` True/False: only rows at/under REAPER_MAX_REQUEUES). FOR UPDATE SKIP LOCKED
+    (PostgreSQL; ignored elsewhere) lets concurrent sweepers split the backlog instead of blocking
+    on - or double-processing - the same rows.
+    """
+    conditions = [Resume.status == status, Resume.lease_expires_at < now]
+    if poisoned is not None:
+        max_requeues = current_app.config.get('REAPER_MAX_REQUEUES', 3)
+        conditions.append(Resume.requeue_count >= max_requeues if poisoned else Resume.requeue_count < max_requeues)
+    return (select(Resume.id)
+            .where(*conditions)
+            .order_by(Resume.lease_expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery())
+
+def _sweep_batch(now, limit):
+    """
+    One bounded pass over expired leases:
+      - PROCESSING (the worker died or timed out mid-run): resumes that keep killing workers are
+        failed, the rest are released back to PENDING and counted towards REAPER_MAX_REQUEUES.
+      - PENDING (never claimed): only waiting, or its task was lost. Never failed or counted towards
+        REAPER_MAX_REQUEUES; the lease is renewed and pending_renewals goes up (see reap_stale_resumes).
+    """
+    # The outer WHERE repeats the staleness check, so a row finished or re-claimed since the
+    # subquery ran (or on dialects without SKIP LOCKED) is left alone
+    def still_stale(status):
+        return (Resume.status == status, Resume.lease_expires_at < now)
+    failed = db.session.execute(
+        update(Resume)
+        .where(Resume.id.in_(_stale_ids(now, limit, StatusEnum.PROCESSING, poisoned=True)), *still_stale(StatusEnum.PROCESSING))
+        .values(status=StatusEnum.FAILED, score=None, claimed_by=None, lease_expires_at=None,
+                error_message="Processing was abandoned repeatedly (worker lost or timed out); not requeued again.")
+        .returning(Resume.id)
+        .execution_options(synchronize_session=False)).scalars().all()
+    requeued = db.session.execute(
+        update(Resume)
+        .where(Resume.id.in_(_stale_ids(now, limit, StatusEnum.PROCESSING, poisoned=False)), *still_stale(StatusEnum.PROCESSING))
+        .values(status=StatusEnum.PENDING, score=None, claimed_by=None,
+                lease_expires_at=pending_lease_expiry(current_app.config, now),
+                requeue_count=Resume.requeue_count + 1, pending_renewals=0)
+        .returning(Resume.id, Resume.job_id)
+        .execution_options(synchronize_session=False)).all()
+    waiting = db.session.execute(
+        update(Resume)
+        .where(Resume.id.in_(_stale_ids(now, limit, StatusEnum.PENDING)), *still_stale(StatusEnum.PENDING))
+        .values(lease_expires_at=pending_lease_expiry(current_app.config, now), pending_renewals=Resume.pending_renewals + 1)
+        .returning(Resume.id, Resume.job_id, Resume.pending_renewals)
+        .execution_options(synchronize_session=False)).all()
+    db.session.commit()
+    return failed, requeued, waiting
+
+def _queue_backlog(queue_name, cache):
+    """Messages waiting in a broker queue (passive declare), or None if the broker cannot tell."""
+    if queue_name not in cache:
+        from .extensions import celery
+        try:
+            with celery.connection_for_read() as connection:
+                cache[queue_name] = connection.default_channel.queue_declare(queue=queue_name, passive=True).message_count
+        except Exception as e:
+            logger.warning(f"Reaper: could not read the backlog of queue '{queue_name}': {e}")
+            cache[queue_name] = None
+    return cache[queue_name]
+
+def _still_queued(job_id, backlogs):
+    """Whether a PENDING resume of the job may still be waiting in the broker: its upload went to the
+    interactive queue or the job's bulk shard, and either still has messages."""
+    queues = (INTERACTIVE_QUEUE, bulk_queue_for_job(job_id, current_app.config))
+    return any(_queue_backlog(queue_name, backlogs) for queue_name in queues)
+
+def _reset_renewals(resume_ids):
+    """Restarts the pending_renewals count of PENDING resumes whose task was just re-sent."""
+    if resume_ids:
+        db.session.execute(update(Resume).where(Resume.id.in_(resume_ids), Resume.status == StatusEnum.PENDING)
+                           .values(pending_renewals=0).execution_options(synchronize_session=False))
+        db.session.commit()
+
+def _dispatch(requeued):
+    """Re-sends tasks for released resumes, per job, on the queue an upload of that size would use."""
+    from .tasks import process_resume # Local import: tasks.py imports this module
+    by_job = defaultdict(list)
+    for resume_id, job_id in requeued:
+        by_job[job_id].append(resume_id)
+    dispatched = 0
+    for job_id, resume_ids in by_job.items():
+        queue_name = queue_for_upload(job_id, len(resume_ids), current_app.config)
+        for resume_id in resume_ids:
+            try:
+                process_resume.apply_async(args=(resume_id, job_id), queue=queue_name)
+                dispatched += 1
+            except Exception as e:
+                # The row is PENDING with a fresh lease, so the next sweep retries the dispatch
+                logger.error(f"Reaper: failed to requeue Resume ID {resume_id}: {e}")
+    return dispatched
+
+def reap_stale_resumes(batch_size=None, max_batches=None, dry_run=False):
+    """
+    Finds PENDING/PROCESSING resumes whose lease expired (task lost before it ran, or worker
+    OOM-killed mid-run) and requeues them in bounded batches. PROCESSING resumes already requeued
+    REAPER_MAX_REQUEUES times are marked FAILED instead. An expired PENDING resume is never failed:
+    while its queues still hold messages it is probably waiting in a backlog and just gets a new
+    lease, but after REAPER_MAX_PENDING_RENEWALS renewals its task is re-sent anyway ("overdue"), in
+    case the broker lost it under steady load (a duplicate task is a no-op once the row is claimed).
+    Safe to run from several processes.
+    Returns counts: {"stale", "requeued", "dispatched", "failed", "waiting", "overdue"}; a dry run only
+    counts "stale".
+    """
+    config = current_app.config
+    batch_size = batch_size or config.get('REAPER_BATCH_SIZE', 500)
+    max_batches = max_batches or config.get('REAPER_MAX_BATCHES', 20)
+    now = datetime.utcnow()
+    max_renewals = config.get('REAPER_MAX_PENDING_RENEWALS', 4)
+    counts = {"stale": 0, "requeued": 0, "dispatched": 0, "failed": 0, "waiting": 0, "overdue": 0}
+
+    if dry_run:
+        counts["stale"] = db.session.query(Resume.id).filter(Resume.status.in_(LEASED_STATUSES),
+                                                             Resume.lease_expires_at < now).count()
+        return counts
+
+    backlogs = {} # Queue depths, read once per sweep
+    for _ in range(max_batches):
+        failed, requeued, waiting = _sweep_batch(now, batch_size)
+        overdue = [row for row in waiting if row.pending_renewals >= max_renewals]
+        lost = [row for row in waiting if row.pending_renewals < max_renewals and not _still_queued(row.job_id, backlogs)]
+        counts["failed"] += len(failed)
+        counts["requeued"] += len(requeued) + len(lost) + len(overdue)
+        counts["waiting"] += len(waiting) - len(lost) - len(overdue)
+        counts["overdue"] += len(overdue)
+        counts["dispatched"] += _dispatch([(row.id, row.job_id) for row in list(requeued) + lost + overdue])
+        _reset_renewals([row.id for row in lost + overdue])
+        if len(failed) < batch_size and len(requeued) < batch_size and len(waiting) < batch_size:
+            break
+    counts["stale"] = counts["requeued"] + counts["failed"] + counts["waiting"]
+    if counts["stale"]:
+        logger.warning(f"Reaper: {counts['requeued']} stale resume(s) requeued ({counts['dispatched']} dispatched), "
+                       f"{counts['waiting']} still queued (lease renewed), {counts['overdue']} re-sent after "
+                       f"{max_renewals} renewals, "
+                       f"{counts['failed']} failed after {config.get('REAPER_MAX_REQUEUES', 3)} requeues.")
+    else:
+        logger.info("Reaper: no stale resumes.")
+    return counts
@@ -0,0 +1,190 @@
+# backend/app/result_writer.py
+
+import os
+import time
+import queue
+import atexit
+import threading
+import logging
+from concurrent.futures import Future
+from sqlalchemy import update, select, values, column, bindparam, cast
+from .extensions import db
+from .models import Resume, StatusEnum
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+# Pools that run many tasks in one process; prefork/solo processes have one task in flight, so nothing to batch
+BATCHING_POOLS = ('gevent', 'eventlet', 'threads')
+
+
+class ResultWriter:
+    """
+    Optional write-behind buffer for finished resumes (RESULT_WRITER_ENABLED).
+
+    Tasks submit their final column values and block on the returned Future. A background thread
+    collects submissions until `max_batch` results are pending or `max_wait_ms` has passed, then
+    writes them all with ONE statement and ONE commit:
+      - PostgreSQL: UPDATE resumes SET ... FROM (VALUES ...) AS v
+                    WHERE resumes.id = v.id AND resumes.claimed_by = v.owner RETURNING id
+      - other dialects: a single executemany of the same UPDATE.
+    Futures resolve only after the commit, so a task (acks_late) returns - and is acked - only
+    once its result is durable. A failed flush fails every Future in it, and the tasks retry.
+    Only used under the gevent/eventlet/threads pools (see get_result_writer).
+    """
+
+    def __init__(self, app, max_batch=50, max_wait_ms=200):
+        self.app = app
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms) / 1000.0)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.flushes = 0
+        self.rows_written = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='result-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, resume_id, claimed_by, status, fields):
+        """
+        Queues the final write for one resume. `fields` are Resume column values; the row is only
+        updated while it is still PROCESSING and claimed by `claimed_by` (the task id).
+        The Future resolves to True if the row was updated.
+        """
+        future = Future()
+        self._ensure_started()
+        self._queue.put((resume_id, status, dict(fields), future, claimed_by))
+        return future
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            self._write(self._collect(first))
+
+    def flush(self):
+        """Synchronously writes everything still queued (used on shutdown)."""
+        pending = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                pending.append(item)
+        for start in range(0, len(pending), self.max_batch):
+            self._write(pending[start:start + self.max_batch])
+
+    def shutdown(self, timeout=10.0):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self.flush()
+
+    def _write(self, batch):
+        # Rows in one statement must share a column set: group by (status, sorted field names)
+        groups = {}
+        for item in batch:
+            groups.setdefault((item[1], tuple(sorted(item[2]))), []).append(item)
+        with self._flush_lock, self.app.app_context():
+            try:
+                applied = set()
+                for (status, names), items in groups.items():
+                    applied |= self._write_group(status, names, items)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Result writer flush of {len(batch)} result(s) failed: {e}", exc_info=True)
+                for item in batch:
+                    item[3].set_exception(e)
+                return
+        self.flushes += 1
+        self.rows_written += len(batch)
+        logger.debug(f"Result writer flush #{self.flushes}: {len(batch)} result(s) in {len(groups)} statement(s).")
+        for resume_id, _, _, future, _ in batch:
+            future.set_result(resume_id in applied)
+
+    def _write_group(self, status, names, items):
+        table = Resume.__table__
+        if db.session.get_bind().dialect.name == 'postgresql':
+            rows = values(column('id', table.c.id.type), column('owner', table.c.claimed_by.type),
+                          *(column(name, table.c[name].type) for name in names),
+                          name='v').data([(item[0], item[4], *(item[2][name] for name in names)) for item in items])
+            stmt = (update(Resume)
+                    .where(Resume.id == rows.c.id, Resume.status == StatusEnum.PROCESSING,
+                           Resume.claimed_by == rows.c.owner)
+                    # Explicit casts: an all-NULL VALUES column would otherwise be typed as text
+                    .values(status=status, **{name: cast(rows.c[name], table.c[name].type) for name in names})
+                    .returning(Resume.id)
+                    .execution_options(synchronize_session=False))
+            return {row.id for row in db.session.execute(stmt)}
+        stmt = (table.update()
+                .where(table.c.id == bindparam('_id'), table.c.status == StatusEnum.PROCESSING,
+                       table.c.claimed_by == bindparam('_owner'))
+                .values(status=status, **{name: bindparam(f'_{name}') for name in names}))
+        db.session.execute(stmt, [{'_id': item[0], '_owner': item[4], **{f'_{name}': item[2][name] for name in names}} for item in items])
+        # executemany gives no per-row feedback: read back which rows their owner now holds in `status`
+        owners = {item[0]: item[4] for item in items}
+        held = db.session.execute(select(table.c.id, table.c.claimed_by)
+                                  .where(table.c.id.in_(list(owners)), table.c.status == status)).all()
+        return {row.id for row in held if row.claimed_by == owners[row.id]}
+
+
+_writer = None
+_writer_lock = threading.Lock()
+_pool_warned = False
+
+def get_result_writer(app):
+    """
+    Process-wide ResultWriter, or None when RESULT_WRITER_ENABLED is off or the worker pool
+    (WORKER_POOL, set by celery_worker.py) runs one task per process: under prefork/solo a batch
+    would only ever hold one row, so tasks write directly instead.
+    """
+    global _writer, _pool_warned
+    if not app.config.get('RESULT_WRITER_ENABLED'):
+        return None
+    pool = os.environ.get('WORKER_POOL')
+    if pool and pool not in BATCHING_POOLS:
+        if not _pool_warned:
+            _pool_warned = True
+            logger.warning(f"RESULT_WRITER_ENABLED is ignored under the '{pool}' pool (one task per process, nothing to "
+                           f"batch); results are written directly. Use -P gevent/eventlet/threads to batch them.")
+        return None
+    with _writer_lock:
+        if _writer is None:
+            _writer = ResultWriter(app, max_batch=app.config.get('RESULT_WRITER_MAX_BATCH', 50),
+                                   max_wait_ms=app.config.get('RESULT_WRITER_MAX_WAIT_MS', 200))
+            atexit.register(_writer.shutdown)
+            logger.info(f"Batched result writer enabled (max_batch={_writer.max_batch}, max_wait={_writer.max_wait * 1000:.0f}ms).")
+    return _writer
+
+def shutdown_result_writer(**kwargs):
+    """Flushes pending results; connected to Celery's worker_shutdown signal."""
+    if _writer is not None:
+        logger.info("Flushing batched result writer before shutdown...")
+        _writer.shutdown()
@@ -1,10 +1,17 @@
 # backend/app/routes/jobs.py
 
 from flask import Blueprint, request, jsonify, current_app # Import current_app for logger
+import numpy as np
 # Import using relative path (..) to go up one level from 'routes' to 'app'
-from ..models import Job
-from ..schemas import job_schema, jobs_schema
+from ..models import Job, Resume
+from ..schemas import job_schema, jobs_schema, resume_schema
 from ..extensions import db
+from ..search import find_candidates, remove_resumes_from_index
+from ..lexical import score_job_pool
+from ..cascade import cascade_enabled, cascade_summary
+from ..documents import release_document
+from ..storage import get_storage
+from ..utils.nlp import compute_jd_features, jd_features_are_current
 from marshmallow import ValidationError
 
 # Create a Blueprint object for job routes, named 'jobs'
@@ -103,7 +110,10 @@ def update_job(job_id):
         # Load data from the request JSON into the existing 'job' model object
         # Use partial=True to allow updating only the fields present in the request JSON
         # This modifies the 'job' object in place (SQLAlchemy tracks changes)
+        previous_description = job.description
         updated_job = job_schema.load(json_data, instance=job, partial=True)
+        if updated_job.description != previous_description:
+            updated_job.jd_features = None # Invalidate cached JD scoring features
     except ValidationError as err:
         logger.warning(f"Update job request failed for ID {job_id}: Validation errors: {err.messages}")
         return jsonify({"error": "Validation failed", "messages": err.messages}), 422
@@ -128,6 +138,10 @@ def delete_job(job_id):
     # Find the job by ID or raise 404
     job = Job.query.get_or_404(job_id, description=f"Job with ID {job_id} not found.")
     try:
+        # Remember the resume IDs (and documents) so their embeddings can be tombstoned in the ANN index
+        # and their documents released afterwards
+        rows = db.session.query(Resume.id, Resume.document_id, Resume.filepath).filter(Resume.job_id == job_id).all()
+        resume_ids = [row.id for row in rows]
         # Remove the job object from the database session
         db.session.delete(job)
         # Commit the transaction to finalize deletion
@@ -135,10 +149,94 @@ def delete_job(job_id):
         # should handle the automatic deletion of associated Resume records.
         db.session.commit()
         logger.info(f"Job deleted successfully for ID: {job_id}")
+        try:
+            remove_resumes_from_index(resume_ids)
+        except Exception as index_err:
+            logger.error(f"Failed to tombstone resumes of deleted job {job_id} in ANN index: {index_err}", exc_info=True)
+        # Documents (and stored files) that no other job's application uses go with the job
+        storage = get_storage()
+        for document_id, filepath in {(row.document_id, row.filepath) for row in rows}:
+            try:
+                release_document(storage, document_id, filepath)
+            except Exception as storage_err:
+                db.session.rollback()
+                logger.error(f"Failed to release document {document_id} ('{filepath}') of deleted job {job_id}: {storage_err}", exc_info=True)
         # Return a success message (200 OK is common) or 204 No Content
         return jsonify({"message": f"Job with ID {job_id} and associated resumes deleted successfully."}), 200
     except Exception as e:
         # Rollback transaction on database error
         db.session.rollback()
         logger.error(f"Database error deleting job {job_id}: {e}", exc_info=True)
-        return jsonify({"error": "Internal server error: Could not delete job"}), 500
\ No newline at end of file
+        return jsonify({"error": "Internal server error: Could not delete job"}), 500
+
+
+# GET /api/jobs/<job_id>/candidates - Top-K matching resumes from the whole pool (all jobs)
+@bp.route('/<int:job_id>/candidates', methods=['GET'])
+def get_job_candidates(job_id):
+    """Surfaces the closest existing resumes to this job's description via the ANN index, without re-scoring."""
+    job = Job.query.get_or_404(job_id, description=f"Job with ID {job_id} not found.")
+    k = request.args.get('k', default=10, type=int)
+    k = max(1, min(k or 10, 100))
+    include_own = request.args.get('include_own', default='false').lower() in ('1', 'true', 'yes')
+    try:
+        # The JD embedding cached on the job; encoded (and cached, as the worker would) only when stale
+        jd_features = job.jd_features
+        if not jd_features_are_current(jd_features):
+            jd_features = compute_jd_features(job.description)
+            job.jd_features = jd_features
+            db.session.commit()
+        jd_embedding = np.asarray(jd_features["embedding"], dtype=np.float32) if jd_features.get("embedding") is not None else None
+        if jd_embedding is None:
+            logger.warning(f"Candidate search for job {job_id} unavailable: sentence encoder not loaded.")
+            return jsonify({"error": "Semantic search is unavailable (sentence encoder not loaded)."}), 503
+        matches = find_candidates(jd_embedding, k=k, exclude_job_id=None if include_own else job_id)
+        results = []
+        for resume, similarity in matches:
+            candidate = resume_schema.dump(resume)
+            candidate["job_id"] = resume.job_id
+            candidate["similarity"] = round(similarity, 4)
+            results.append(candidate)
+        logger.info(f"Candidate search for job {job_id}: returned {len(results)} of top-{k} matches.")
+        return jsonify(results), 200
+    except Exception as e:
+        logger.error(f"Error searching candidates for job {job_id}: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error: Could not search candidates"}), 500
+
+
+# GET /api/jobs/<job_id>/lexical-ranking - The job's resumes ranked by corpus TF-IDF similarity to its JD
+@bp.route('/<int:job_id>/lexical-ranking', methods=['GET'])
+def get_job_lexical_ranking(job_id):
+    """Cheap keyword pre-ranking of the whole pool (one sparse matrix-vector product, no encoder or spaCy)."""
+    job = Job.query.get_or_404(job_id, description=f"Job with ID {job_id} not found.")
+    k = request.args.get('k', default=50, type=int)
+    k = max(1, min(k or 50, 1000))
+    try:
+        jd_features = job.jd_features if jd_features_are_current(job.jd_features) else compute_jd_features(job.description)
+        ranked = score_job_pool(job_id, jd_features.get("terms"), limit=k)
+        resumes = {resume.id: resume for resume in Resume.query.filter(Resume.id.in_([resume_id for resume_id, _ in ranked]))}
+        results = []
+        for resume_id, lexical_score in ranked:
+            ranked_resume = resume_schema.dump(resumes[resume_id])
+            ranked_resume["lexical_score"] = round(lexical_score, 4)
+            results.append(ranked_resume)
+        logger.info(f"Lexical ranking for job {job_id}: returned {len(results)} resume(s).")
+        return jsonify(results), 200
+    except Exception as e:
+        logger.error(f"Error ranking resumes lexically for job {job_id}: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error: Could not rank resumes"}), 500
+
+
+# GET /api/jobs/<job_id>/cascade-stats - How much full-scoring work the cascade and score threshold saved
+@bp.route('/<int:job_id>/cascade-stats', methods=['GET'])
+def get_job_cascade_stats(job_id):
+    """Counts of fully scored, stage-1-only and below-threshold resumes for the job, with its settings."""
+    job = Job.query.get_or_404(job_id, description=f"Job with ID {job_id} not found.")
+    try:
+        stats = cascade_summary(job_id)
+        stats.update(cascade_enabled=cascade_enabled(job.cascade_top_n, job.cascade_min_score),
+                     cascade_top_n=job.cascade_top_n, cascade_min_score=job.cascade_min_score,
+                     score_threshold=job.score_threshold)
+        return jsonify(stats), 200
+    except Exception as e:
+        logger.error(f"Error computing cascade stats for job {job_id}: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error: Could not compute cascade stats"}), 500
@@ -1,15 +1,22 @@
 # backend/app/routes/resumes.py
 
-from flask import Blueprint, request, jsonify, current_app, send_from_directory
+from flask import Blueprint, request, jsonify, current_app, send_from_directory, redirect, Response, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 import uuid # For generating unique filenames
+import mimetypes
 
 # Import necessary items from other app modules
 from ..models import Resume, Job, StatusEnum
 from ..schemas import resume_schema, resumes_schema
 from ..extensions import db, celery # Import celery instance
-from ..tasks import process_resume # Import the Celery task definition
+from ..tasks import process_resume, score_resume_for_jobs # Import the Celery task definitions
+from ..search import remove_resumes_from_index
+from ..scheduling import queue_for_upload
+from ..utils.uploads import UploadTooLargeError
+from ..storage import get_storage, LocalStorage
+from ..reaper import pending_lease_expiry
+from ..documents import get_or_create_document, discard_duplicates, release_document
 
 # Create a Blueprint object for resume routes
 bp = Blueprint('resumes', __name__)
@@ -25,8 +32,8 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
-def get_safe_upload_path(job_id, filename):
-    """Generates a safe, unique relative path for the uploaded file and the absolute path for saving."""
+def get_safe_upload_key(filename):
+    """Generates a safe, unique storage key (relative path) for an uploaded file."""
     # Secure the original filename (remove risky characters like '..', '/')
     base_filename = secure_filename(filename)
     if not base_filename: # Handle cases where filename becomes empty after securing
@@ -46,27 +53,9 @@ def get_safe_upload_path(job_id, filename):
     ext = ext.lower() # Ensure extension is lowercase
 
     # Construct unique filename: original_name_prefix.ext
-    unique_filename = f"{name}_{unique_prefix}{ext}"
-
-   
     # Example: 'Software_Engineer_Resume_a1b2c3d4.pdf'
-    relative_path = unique_filename
-
-    # Get the absolute path to the configured UPLOAD_FOLDER for saving the file
-    upload_folder_abs = os.path.abspath(current_app.config['UPLOAD_FOLDER'])
-    save_path_abs = os.path.join(upload_folder_abs, relative_path)
-
-    # Ensure the base upload directory exists (create_app should handle this, but safety check)
-    if not os.path.exists(upload_folder_abs):
-        try:
-            os.makedirs(upload_folder_abs)
-            logger.info(f"Created missing upload folder: {upload_folder_abs}")
-        except OSError as e:
-             logger.error(f"Fatal: Failed to create upload folder {upload_folder_abs}: {e}", exc_info=True)
-             # If folder cannot be created, we cannot save files
-             raise IOError(f"Upload folder cannot be created: {upload_folder_abs}") from e
-
-    return relative_path, save_path_abs # Return relative path for DB, absolute path for saving
+    # The same key is used by every storage backend (path under UPLOAD_FOLDER, or object key under S3_PREFIX)
+    return f"{name}_{unique_prefix}{ext}"
 
 # --- API Routes ---
 
@@ -91,47 +80,68 @@ def upload_resumes(job_id):
         return jsonify({"error": "No selected files"}), 400
 
     uploaded_resume_objects = [] 
+    duplicate_keys = [] # Copies of bytes an existing document already holds, deleted after the commit
     errors = {} # Dictionary to hold errors for specific files
 
     for file in files:
         # Check if file object exists and filename has an allowed extension
         if file and allowed_file(file.filename):
             original_filename = file.filename # Store original filename for DB/display
+            stored_key = None
             try:
-                # Generate safe paths (relative for DB, absolute for saving)
-                relative_path, save_path_abs = get_safe_upload_path(job_id, original_filename)
-
-                # Save the uploaded file stream to the absolute disk path
-                file.save(save_path_abs)
-                logger.info(f"Saved uploaded file '{original_filename}' to '{save_path_abs}' (relative: '{relative_path}')")
-
-                # Create a new Resume database record
-                new_resume = Resume(
-                    filename=original_filename, # Store original filename
-                    filepath=relative_path,     # Store RELATIVE path in DB
-                    job_id=job.id,              # Link to the parent job
-                    status=StatusEnum.PENDING   # Initial status
-                )
-                db.session.add(new_resume)
-                # Flush session to assign an ID to new_resume before queuing the task
-                # The task needs the ID to look up the resume record later
-                db.session.flush()
-
-                # Trigger the Celery background task asynchronously
-                # Pass primitive, serializable IDs to the task
-                task = process_resume.delay(new_resume.id, job.id)
-                logger.info(f"Queued resume processing task {task.id} for new Resume ID {new_resume.id} (Job: {job_id}, File: {original_filename})")
-
+                # Generate a safe, unique storage key (stored in the DB as the relative path)
+                relative_path = get_safe_upload_key(original_filename)
+
+                # Stream the upload to the storage backend in chunks (atomic on every backend),
+                # hashing and enforcing the per-file limit on the way
+                storage = get_storage()
+                file_size, content_hash = storage.put_stream(relative_path, file.stream,
+                                                             max_bytes=current_app.config.get('MAX_RESUME_FILE_BYTES'),
+                                                             declared_length=file.content_length)
+                stored_key = relative_path
+                logger.info(f"Stored uploaded file '{original_filename}' ({file_size} bytes) as '{relative_path}' ({storage.name} storage)")
+
+                # Each file's rows go in their own savepoint, so a failure undoes only this file's
+                # document and resume, not the ones earlier files already flushed
+                with db.session.begin_nested():
+                    # Bytes already stored for another application reuse that document (and its parsed features)
+                    document, _ = get_or_create_document(relative_path, content_hash, original_filename)
+
+                    # Create a new Resume database record (one application of the document to this job)
+                    new_resume = Resume(
+                        filename=original_filename, # Store original filename
+                        filepath=document.storage_key, # Store RELATIVE path in DB
+                        document_id=document.id,    # The shared candidate document
+                        job_id=job.id,              # Link to the parent job
+                        status=StatusEnum.PENDING,  # Initial status
+                        content_hash=content_hash,  # Dedupe key for the worker
+                        lease_expires_at=pending_lease_expiry(current_app.config) # Reaped if never claimed
+                    )
+                    db.session.add(new_resume)
+                    # Flush session to assign an ID to new_resume; the task is queued only after commit
+                    # (below) so the worker never looks the record up before it is visible
+                    db.session.flush()
+
+                if document.storage_key != relative_path:
+                    duplicate_keys.append(relative_path)
                 # Add the successfully processed Resume object to our list for the response
                 uploaded_resume_objects.append(new_resume)
 
+            except UploadTooLargeError as e:
+                logger.warning(f"Rejected '{original_filename}' for job {job_id}: {e}")
+                errors[original_filename] = str(e)
+
             except Exception as e:
                 # Log any error during file saving or task queuing
                 logger.error(f"Error processing uploaded file '{original_filename}' for job {job_id}: {e}", exc_info=True)
-                # Rollback potential partial flush for this specific file's resume object
-                # Ensures the failed resume record isn't committed later if others succeed
-                db.session.rollback()
-                errors[original_filename] = f"Failed to save or queue file for processing: {str(e)[:100]}" # Store brief error
+                # The savepoint already rolled back this file's rows (earlier files' rows stay in the
+                # session); its stored copy is now unreferenced
+                if stored_key is not None:
+                    try:
+                        storage.delete(stored_key)
+                    except Exception as cleanup_err:
+                        logger.warning(f"Could not delete '{stored_key}' of failed upload '{original_filename}': {cleanup_err}")
+                errors[original_filename] = f"Failed to save file for processing: {str(e)[:100]}" # Store brief error
 
         elif file and file.filename: # File was present but not allowed type or had empty name after securing
              logger.warning(f"Skipped file '{file.filename}' for job {job_id}: File type not allowed or invalid.")
@@ -149,6 +159,15 @@ def upload_resumes(job_id):
             # Commit all successfully added Resume DB records from the loop at once
             db.session.commit()
             logger.info(f"Successfully committed {len(uploaded_resume_objects)} new resume records for job {job_id}.")
+            discard_duplicates(get_storage(), duplicate_keys)
+
+            # Trigger the Celery background tasks asynchronously, now that the rows are committed
+            # Small batches go to the interactive queue, large ones to the job's bulk shard
+            queue_name = queue_for_upload(job.id, len(uploaded_resume_objects), current_app.config)
+            for new_resume in uploaded_resume_objects:
+                # Pass primitive, serializable IDs to the task
+                task = process_resume.apply_async(args=(new_resume.id, job.id), queue=queue_name)
+                logger.info(f"Queued resume processing task {task.id} on '{queue_name}' for new Resume ID {new_resume.id} (Job: {job_id}, File: {new_resume.filename})")
 
             # Prepare response data for successfully uploaded resumes using Marshmallow schema
             success_response_data = resumes_schema.dump(uploaded_resume_objects)
@@ -179,6 +198,64 @@ def upload_resumes(job_id):
         return jsonify({"error": "An unexpected error occurred during upload processing."}), 500
 
 
+# POST /api/resumes/<resume_id>/score-jobs - Score an already stored resume against other jobs
+@bp.route('/resumes/<int:resume_id>/score-jobs', methods=['POST'])
+def score_resume_for_other_jobs(resume_id):
+    """
+    Adds a stored resume to several more jobs without re-uploading it. Body: {"job_ids": [...]}.
+    One new resume row (application) per job shares the original's document, and a single task
+    scores it for all of them (see tasks.score_resume_for_jobs).
+    Jobs that already hold this file are reported under "skipped_job_ids".
+    """
+    source = Resume.query.get_or_404(resume_id, description=f"Resume with ID {resume_id} not found.")
+    data = request.get_json(silent=True) or {}
+    job_ids = data.get('job_ids')
+    if not isinstance(job_ids, list) or not job_ids or \
+            not all(isinstance(job_id, int) and not isinstance(job_id, bool) for job_id in job_ids):
+        return jsonify({"error": "'job_ids' must be a non-empty list of job IDs."}), 400
+    job_ids = list(dict.fromkeys(job_ids)) # Drop repeats, keep order
+    max_jobs = current_app.config.get('SCORE_JOBS_MAX', 100)
+    if len(job_ids) > max_jobs:
+        return jsonify({"error": f"At most {max_jobs} jobs per request."}), 400
+
+    found = {job_id for (job_id,) in db.session.query(Job.id).filter(Job.id.in_(job_ids))}
+    missing = [job_id for job_id in job_ids if job_id not in found]
+    if missing:
+        return jsonify({"error": "Jobs not found.", "missing_job_ids": missing}), 404
+
+    # A job already holding this file (same document or stored object, or same bytes) is not scored twice
+    same_file = Resume.filepath == source.filepath
+    if source.document_id:
+        same_file = db.or_(same_file, Resume.document_id == source.document_id)
+    if source.content_hash:
+        same_file = db.or_(same_file, Resume.content_hash == source.content_hash)
+    holding = {job_id for (job_id,) in db.session.query(Resume.job_id).filter(Resume.job_id.in_(job_ids), same_file).distinct()}
+    target_ids = [job_id for job_id in job_ids if job_id not in holding]
+    skipped = [job_id for job_id in job_ids if job_id in holding]
+    if not target_ids:
+        return jsonify({"task_id": None, "resumes": [], "skipped_job_ids": skipped}), 200
+
+    try:
+        new_resumes = [Resume(filename=source.filename, filepath=source.filepath, document_id=source.document_id, job_id=job_id,
+                              status=StatusEnum.PENDING, content_hash=source.content_hash,
+                              lease_expires_at=pending_lease_expiry(current_app.config))
+                       for job_id in target_ids]
+        db.session.add_all(new_resumes)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to add resume {resume_id} to jobs {target_ids}: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error: Could not add the resume to these jobs."}), 500
+
+    # One task for all the rows; if it is lost, the reaper requeues each row on its own (they share the file)
+    new_ids = [new_resume.id for new_resume in new_resumes]
+    queue_name = queue_for_upload(source.job_id, len(new_ids), current_app.config)
+    task = score_resume_for_jobs.apply_async(args=(new_ids,), queue=queue_name)
+    logger.info(f"Queued multi-job scoring task {task.id} on '{queue_name}' for resume {resume_id} as Resume IDs {new_ids} "
+                f"(Jobs: {target_ids}; skipped {skipped})")
+    return jsonify({"task_id": task.id, "resumes": resumes_schema.dump(new_resumes), "skipped_job_ids": skipped}), 202
+
+
 # GET /api/jobs/<job_id>/resumes - Get resumes for a specific job, ranked
 @bp.route('/jobs/<int:job_id>/resumes', methods=['GET'])
 def get_job_resumes(job_id):
@@ -191,6 +268,7 @@ def get_job_resumes(job_id):
         # Order by score descending (handling NULLs - non-null scores first), then by upload date
         resumes_query = job.resumes.order_by(
             db.desc(Resume.score.isnot(None)), # Put resumes with a score first
+            db.desc(db.func.coalesce(Resume.score_stage, 2)), # Fully scored before cascade stage-1-only scores
             db.desc(Resume.score),             # Then order by score descending
             Resume.uploaded_at.asc()           # Finally by upload time ascending
         )
@@ -238,29 +316,46 @@ def download_resume(resume_id):
     # if not current_user.has_permission_for_resume(resume_id):
     #    return jsonify({"error": "Forbidden"}), 403
 
+    # Find the resume record or return 404
+    resume = Resume.query.get_or_404(resume_id, description=f"Resume with ID {resume_id} not found.")
     try:
-        # Find the resume record or return 404
-        resume = Resume.query.get_or_404(resume_id, description=f"Resume with ID {resume_id} not found.")
-
-        # Get the absolute path to the UPLOAD_FOLDER from config
-        directory_abs = os.path.abspath(current_app.config['UPLOAD_FOLDER'])
-        # resume.filepath should contain the unique filename relative to the upload folder
-        file_path_relative = resume.filepath
-
-        logger.info(f"Attempting to send file: Directory='{directory_abs}', Relative Path='{file_path_relative}', Suggested Download Name='{resume.filename}'")
-
-        # Use Flask's send_from_directory for security (prevents path traversal attacks)
-        # It safely joins the directory and filename
-        return send_from_directory(
-            directory=directory_abs,         # The absolute directory containing the file
-            path=file_path_relative,         # The relative path/filename within that directory
-            as_attachment=True,              # Send as attachment, prompting download dialog
-            download_name=resume.filename    # Suggest the original filename to the user's browser
-        )
+        storage = get_storage()
+        logger.info(f"Sending resume file '{resume.filepath}' from {storage.name} storage (download name '{resume.filename}')")
+
+        if isinstance(storage, LocalStorage):
+            # send_from_directory prevents path traversal and handles Range/conditional requests
+            return send_from_directory(
+                directory=storage.root,          # The absolute directory containing the file
+                path=resume.filepath,            # The relative path/filename within that directory
+                as_attachment=True,              # Send as attachment, prompting download dialog
+                download_name=resume.filename,   # Suggest the original filename to the user's browser
+                conditional=True
+            )
+
+        # Object storage: hand the client a short-lived presigned URL, so the bytes never pass through the app...
+        if current_app.config.get('STORAGE_REDIRECT_DOWNLOADS', True):
+            url = storage.presigned_url(resume.filepath, download_name=resume.filename,
+                                        expires=current_app.config.get('STORAGE_PRESIGN_EXPIRES', 300))
+            if url:
+                return redirect(url, code=302)
+
+        # ...or proxy it chunk by chunk (single byte ranges supported), never holding the whole file
+        size = storage.size(resume.filepath)
+        byte_range = request.range.range_for_length(size) if request.range else None
+        start, stop = byte_range if byte_range else (0, size)
+        response = Response(stream_with_context(storage.iter_range(resume.filepath, start, stop)),
+                            status=206 if byte_range else 200,
+                            mimetype=mimetypes.guess_type(resume.filename)[0] or 'application/octet-stream')
+        response.headers['Content-Length'] = str(stop - start)
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.headers['Content-Disposition'] = f'attachment; filename="{secure_filename(resume.filename) or "resume"}"'
+        if byte_range:
+            response.headers['Content-Range'] = f"bytes {start}-{stop - 1}/{size}"
+        return response
     except FileNotFoundError:
-        # This occurs if the file is missing from disk (e.g., deleted manually)
+        # This occurs if the file is missing from storage (e.g., deleted manually)
         # but the database record still exists.
-        logger.error(f"Resume file not found on server disk for Resume ID {resume_id}. Expected relative path '{resume.filepath}' within '{directory_abs}'")
+        logger.error(f"Resume file not found in storage for Resume ID {resume_id}. Expected key '{resume.filepath}'")
         return jsonify({"error": "File not found on server disk."}), 404
     except Exception as e:
         # Catch other potential errors (e.g., permissions, network issues)
@@ -273,14 +368,22 @@ def delete_resume(resume_id):
     try:
         resume = Resume.query.get_or_404(resume_id, description=f"Resume with ID {resume_id} not found.")
 
-        # Optional: Also delete the resume file from disk
-        file_path_abs = os.path.join(os.path.abspath(current_app.config['UPLOAD_FOLDER']), resume.filepath)
-        if os.path.exists(file_path_abs):
-            os.remove(file_path_abs)
-
+        document_id, filepath = resume.document_id, resume.filepath
         db.session.delete(resume)
         db.session.commit()
         logger.info(f"Deleted resume ID: {resume_id}")
+        try:
+            # The document (its stored file and its terms in the corpus IDF) goes with its last application
+            deleted_keys = release_document(get_storage(), document_id, filepath)
+            if deleted_keys:
+                logger.info(f"Deleted stored file(s) {deleted_keys} of resume {resume_id}: no other application uses them.")
+        except Exception as storage_err:
+            db.session.rollback()
+            logger.error(f"Failed to release document {document_id} ('{filepath}') of resume {resume_id}: {storage_err}", exc_info=True)
+        try:
+            remove_resumes_from_index([resume_id]) # Tombstone its embedding in the ANN index
+        except Exception as index_err:
+            logger.error(f"Failed to tombstone resume {resume_id} in ANN index: {index_err}", exc_info=True)
 
         return jsonify({'message': f'Resume {resume_id} deleted successfully'}), 200
 
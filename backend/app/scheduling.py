@@ -0,0 +1,77 @@
+# backend/app/scheduling.py
+
+import logging
+from kombu import Queue
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = 'default'
+INTERACTIVE_QUEUE = 'interactive'
+BULK_QUEUE_PREFIX = 'bulk'
+
+
+def bulk_queue_names(shards):
+    return [f"{BULK_QUEUE_PREFIX}.{shard}" for shard in range(max(1, shards))]
+
+def expand_worker_queues(spec, shards):
+    """
+    Queue names for a worker's WORKER_QUEUES setting (comma-separated). The name 'bulk' stands for
+    every bulk shard, so bulk workers follow BULK_QUEUE_SHARDS instead of a hardcoded -Q list.
+    """
+    names = []
+    for name in (part.strip() for part in spec.split(',')):
+        if name == BULK_QUEUE_PREFIX:
+            names.extend(bulk_queue_names(shards))
+        elif name:
+            names.append(name)
+    return names
+
+def configure_queues(celery, config):
+    """
+    Declares the scheduling queues:
+      - 'interactive': small uploads (<= INTERACTIVE_MAX_BATCH files), served by their own workers
+        so a recruiter's handful of resumes is never stuck behind a bulk import.
+      - 'bulk.0' .. 'bulk.N-1': large uploads, sharded by job id. A bulk worker consumes all shards
+        and kombu cycles through them round-robin, so concurrent imports for jobs on different
+        shards interleave instead of one job's backlog draining first. Fairness is per shard, not
+        per job: jobs whose ids are congruent modulo BULK_QUEUE_SHARDS share one FIFO queue, and
+        a small import there still waits behind a large one. Keep the shard count well above the
+        number of bulk imports expected at once, so that collisions are rare (consecutive job ids
+        always land on different shards).
+      - 'default': anything dispatched without an explicit queue.
+    Worker allocation per queue is done at deploy time (WORKER_QUEUES + WORKER_CPUS per worker service).
+    """
+    shards = config.get('BULK_QUEUE_SHARDS', 16)
+    celery.conf.task_queues = [Queue(DEFAULT_QUEUE), Queue(INTERACTIVE_QUEUE)] + [Queue(name) for name in bulk_queue_names(shards)]
+    celery.conf.task_default_queue = DEFAULT_QUEUE
+    # With acks_late, prefetching more than one task per slot would let a worker hoard a bulk backlog
+    celery.conf.worker_prefetch_multiplier = 1
+    logger.info(f"Celery queues: {DEFAULT_QUEUE}, {INTERACTIVE_QUEUE}, {shards} bulk shard(s).")
+
+def configure_periodic_tasks(celery, config):
+    """
+    Celery beat schedule: the stale-lease reaper every REAPER_INTERVAL_SECONDS and the ANN index
+    snapshot every ANN_SNAPSHOT_SECONDS (0 disables either).
+    """
+    schedule = {}
+    interval = config.get('REAPER_INTERVAL_SECONDS', 300)
+    if interval and interval > 0:
+        schedule['reap-stale-resumes'] = {'task': 'app.tasks.reap_stale_resumes', 'schedule': float(interval),
+                                          'options': {'queue': DEFAULT_QUEUE, 'expires': float(interval)}}
+    snapshot_interval = config.get('ANN_SNAPSHOT_SECONDS', 600)
+    if snapshot_interval and snapshot_interval > 0:
+        schedule['snapshot-ann-index'] = {'task': 'app.tasks.snapshot_ann_index', 'schedule': float(snapshot_interval),
+                                          'options': {'queue': DEFAULT_QUEUE, 'expires': float(snapshot_interval)}}
+    if schedule:
+        celery.conf.beat_schedule = schedule
+
+def queue_for_upload(job_id, batch_size, config):
+    """Routes an upload batch: interactive if small, otherwise the job's bulk shard."""
+    if batch_size <= config.get('INTERACTIVE_MAX_BATCH', 10):
+        return INTERACTIVE_QUEUE
+    return bulk_queue_for_job(job_id, config)
+
+def bulk_queue_for_job(job_id, config):
+    """The bulk shard a job's large uploads go to (shared with every job id congruent modulo the shard count)."""
+    shards = max(1, config.get('BULK_QUEUE_SHARDS', 16))
+    return f"{BULK_QUEUE_PREFIX}.{job_id % shards}"
@@ -19,14 +19,17 @@ class EnumField(fields.Field):
 
 class ResumeSchema(ma.SQLAlchemyAutoSchema):
     status = EnumField(attribute="status")
+    document_id = fields.Integer(dump_only=True) # Candidate document shared by this resume's applications to other jobs
     class Meta:
         model = Resume
         load_instance = True
         # Remove job_id from explicit fields list (let AutoSchema handle it)
-        fields = ("id", "filename", "status", "score", "uploaded_at",
+        fields = ("id", "filename", "document_id", "status", "score", "stage1_score", "score_stage", "below_threshold",
+                  "score_upper_bound", "uploaded_at", "error_message",
                   # "semantic_score", "skill_score", "experience_score" # Uncomment if added to model
                   )
-        dump_only = ("id", "uploaded_at", "score", "status",
+        dump_only = ("id", "uploaded_at", "score", "stage1_score", "score_stage", "below_threshold", "score_upper_bound",
+                     "status", "error_message",
                      # "semantic_score", "skill_score", "experience_score" # Uncomment if added to model
                      )
 
@@ -36,7 +39,8 @@ class JobSchema(ma.SQLAlchemyAutoSchema):
         load_instance = True
         # --- MODIFIED LINE ---
         # Add required_years to the fields handled by the schema
-        fields = ("id", "title", "description", "required_years", "created_at")
+        fields = ("id", "title", "description", "required_years", "cascade_top_n", "cascade_min_score", "score_threshold",
+                  "created_at")
         # ---------------------
         dump_only = ("id", "created_at") # Read-only fields
 
@@ -46,6 +50,21 @@ class JobSchema(ma.SQLAlchemyAutoSchema):
         if value is not None and value < 0:
             raise ValidationError("Required years cannot be negative.")
 
+    @validates("cascade_top_n")
+    def validate_cascade_top_n(self, value, **kwargs):
+        if value is not None and value < 1:
+            raise ValidationError("cascade_top_n must be at least 1 (or null to disable the cascade).")
+
+    @validates("cascade_min_score")
+    def validate_cascade_min_score(self, value, **kwargs):
+        if value is not None and not 0.0 <= value <= 1.0:
+            raise ValidationError("cascade_min_score must be between 0 and 1 (or null).")
+
+    @validates("score_threshold")
+    def validate_score_threshold(self, value, **kwargs):
+        if value is not None and not 0.0 <= value <= 1.0:
+            raise ValidationError("score_threshold must be between 0 and 1 (or null).")
+
 
 # Instantiate schemas
 job_schema = JobSchema()
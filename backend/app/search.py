@@ -0,0 +1,148 @@
+# backend/app/search.py
+
+import os
+import time
+import threading
+import logging
+from flask import current_app
+from sqlalchemy import or_
+from .extensions import db
+from .models import Resume, StatusEnum
+from .utils.ann_index import ResumeAnnIndex, embedding_from_bytes
+
+logger = logging.getLogger(__name__)
+
+# One index per serving (web) process, shared by requests/greenlets, built lazily on the first search.
+# The DB `resumes.embedding` column is the source of truth: workers only persist embeddings there and
+# never hold the index. The on-disk snapshot is a warm start written by one builder only
+# (build_resume_index_snapshot); serving processes load it and re-sync against the DB every
+# ANN_SYNC_SECONDS, so new and deleted resumes show up within a bounded time.
+_index = None
+_index_mtime = None
+_index_synced_at = 0.0
+_index_lock = threading.RLock()
+
+
+def _index_path():
+    return current_app.config.get('ANN_INDEX_PATH')
+
+def _snapshot_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def _sync_with_db(index):
+    """Adds completed resumes missing from the index and tombstones ids no longer in the DB."""
+    rows = db.session.query(Resume.id).filter(Resume.status == StatusEnum.COMPLETED,
+                                              Resume.embedding.isnot(None)).all()
+    db_ids = {row.id for row in rows}
+    indexed_ids = index.ids() if index is not None else set()
+    for stale_id in indexed_ids - db_ids:
+        index.remove(stale_id)
+    missing_ids = list(db_ids - indexed_ids)
+    for start in range(0, len(missing_ids), 1000):
+        chunk = missing_ids[start:start + 1000]
+        for resume_id, blob in db.session.query(Resume.id, Resume.embedding).filter(Resume.id.in_(chunk)):
+            vector = embedding_from_bytes(blob)
+            if vector is None:
+                continue
+            if index is None:
+                index = ResumeAnnIndex(vector.shape[0], nprobe=current_app.config.get('ANN_NPROBE', 8))
+            index.add(resume_id, vector)
+    if missing_ids or indexed_ids - db_ids:
+        logger.info(f"ANN index synced with DB: +{len(missing_ids)} added, -{len(indexed_ids - db_ids)} tombstoned.")
+    return index
+
+def get_resume_index():
+    """
+    Returns this process's index, (re)loading it when a newer snapshot was written by another process,
+    and catching up with the DB when the last sync is older than ANN_SYNC_SECONDS.
+    """
+    global _index, _index_mtime, _index_synced_at
+    path = _index_path()
+    with _index_lock:
+        mtime = _snapshot_mtime(path) if path else None
+        if _index is not None and (mtime is None or mtime == _index_mtime):
+            if time.monotonic() - _index_synced_at > current_app.config.get('ANN_SYNC_SECONDS', 60):
+                _index = _sync_with_db(_index)
+                _index_synced_at = time.monotonic()
+            return _index
+        index = None
+        if mtime is not None:
+            try:
+                index = ResumeAnnIndex.load(path)
+            except Exception as e:
+                logger.error(f"Failed to load ANN index snapshot {path}, rebuilding from DB: {e}", exc_info=True)
+        _index = _sync_with_db(index)
+        _index_mtime = mtime
+        _index_synced_at = time.monotonic()
+        return _index
+
+def build_resume_index_snapshot():
+    """
+    The single snapshot writer (the beat-scheduled `app.tasks.snapshot_ann_index`, or `flask
+    snapshot-ann-index`): loads the current snapshot, catches it up with the DB and writes it back.
+    The index is not kept in this process's memory afterwards. Returns the number of live entries.
+    """
+    path = _index_path()
+    if not path:
+        return 0
+    index = None
+    if _snapshot_mtime(path) is not None:
+        try:
+            index = ResumeAnnIndex.load(path)
+        except Exception as e:
+            logger.error(f"Failed to load ANN index snapshot {path}, rebuilding from DB: {e}", exc_info=True)
+    index = _sync_with_db(index)
+    if index is None:
+        return 0
+    index.save(path)
+    return len(index)
+
+def remove_resumes_from_index(resume_ids):
+    """Tombstones deleted resumes in this process's index (other processes drop them on their next sync)."""
+    with _index_lock:
+        if _index is None:
+            return
+        for resume_id in resume_ids:
+            _index.remove(resume_id)
+
+def find_candidates(query_embedding, k=10, exclude_job_id=None):
+    """
+    Top-k (Resume, similarity) pairs from the whole pool, one per candidate document (its best-matching
+    application; the index holds one entry per application), optionally skipping every document that
+    already applied to one job.
+    """
+    index = get_resume_index()
+    if index is None or query_embedding is None:
+        return []
+    exclude_ids = set()
+    if exclude_job_id is not None:
+        job_documents = db.session.query(Resume.document_id).filter(Resume.job_id == exclude_job_id,
+                                                                    Resume.document_id.isnot(None))
+        exclude_ids = {row.id for row in db.session.query(Resume.id).filter(
+            or_(Resume.job_id == exclude_job_id, Resume.document_id.in_(job_documents)))}
+    # Over-fetch, since several hits can be applications of the same document; widen until k distinct
+    # documents are found or the index runs out
+    fetch, best = k * 4, {}
+    while True:
+        hits = index.search(query_embedding, k=fetch, exclude_ids=exclude_ids)
+        document_ids = dict(db.session.query(Resume.id, Resume.document_id)
+                            .filter(Resume.id.in_([resume_id for resume_id, _ in hits]))) if hits else {}
+        best = {}
+        for resume_id, score in hits:
+            if resume_id not in document_ids:
+                continue
+            # Applications from before documents existed count as their own document
+            key = document_ids[resume_id] or f"resume-{resume_id}"
+            best.setdefault(key, (resume_id, score))
+            if len(best) == k:
+                break
+        if len(best) == k or len(hits) < fetch:
+            break
+        fetch *= 4
+    if not best:
+        return []
+    resumes_by_id = {r.id: r for r in Resume.query.filter(Resume.id.in_([resume_id for resume_id, _ in best.values()]))}
+    return [(resumes_by_id[resume_id], score) for resume_id, score in best.values() if resume_id in resumes_by_id]
@@ -0,0 +1,238 @@
+# backend/app/storage.py
+
+import os
+import re
+import hashlib
+import tempfile
+import threading
+import logging
+from contextlib import contextmanager
+from urllib.parse import quote
+from werkzeug.security import safe_join
+from .utils.uploads import stream_to_file, UploadTooLargeError, UPLOAD_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Optional: only needed for STORAGE_BACKEND=s3 (AWS S3, MinIO or any S3-compatible store)
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError, EndpointConnectionError, ConnectionClosedError, ConnectTimeoutError, ReadTimeoutError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    boto3 = None
+    BOTO3_AVAILABLE = False
+
+STORAGE_BACKENDS = ('local', 's3')
+# Config keys storage drivers and text artifacts are built from (plain values, so settings can be sent to subprocesses)
+STORAGE_SETTING_KEYS = ('STORAGE_BACKEND', 'UPLOAD_FOLDER', 'S3_BUCKET', 'S3_PREFIX', 'S3_ENDPOINT_URL', 'S3_REGION',
+                        'TEXT_ARTIFACTS_ENABLED', 'TEXT_ARTIFACT_CODEC', 'TEXT_ARTIFACT_MAX_CHARS')
+
+
+def attachment_disposition(download_name):
+    """
+    Content-Disposition for downloading a file as `download_name` (RFC 6266): an ASCII `filename`
+    fallback with quotes, backslashes, separators and control characters replaced, plus the exact
+    name as a percent-encoded UTF-8 `filename*`, so no user-supplied name can break the header or
+    add parameters to it.
+    """
+    fallback = re.sub(r'[^\x20-\x7e]|["\\;]', '_', download_name)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(download_name, safe='')}"
+
+
+class LocalStorage:
+    """Resume files under a local (or shared-volume) directory; keys are paths relative to it."""
+    name = 'local'
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        path = safe_join(self.root, key)
+        if path is None:
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+
+    def put_stream(self, key, stream, max_bytes=None, declared_length=None):
+        """Writes a stream under `key` (temp file + atomic rename). Returns (size, sha256)."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return stream_to_file(stream, path, max_bytes=max_bytes, declared_length=declared_length)
+
+    def open(self, key):
+        return open(self._path(key), 'rb')
+
+    def size(self, key):
+        return os.path.getsize(self._path(key))
+
+    def iter_range(self, key, start=0, end=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        """Yields the bytes [start, end) of an object in chunks (end=None: to the end)."""
+        with self.open(key) as f:
+            f.seek(start)
+            remaining = None if end is None else max(0, end - start)
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def presigned_url(self, key, download_name=None, expires=300):
+        return None # Served by the app itself (send_from_directory)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    @contextmanager
+    def local_path(self, key):
+        """A filesystem path for parsers; for local storage that is the file itself."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Resume file not found in local storage: {path}")
+        yield path
+
+
+class _HashingReader:
+    """Read-through wrapper that hashes/counts bytes and enforces a size limit (for S3 uploads)."""
+
+    def __init__(self, stream, max_bytes=None):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size if size and size > 0 else UPLOAD_CHUNK_SIZE)
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise UploadTooLargeError(self.max_bytes, self.size)
+        self.digest.update(chunk)
+        return chunk
+
+
+class S3Storage:
+    """
+    Resume files in an S3-compatible bucket. Keys are prefixed with S3_PREFIX; S3_ENDPOINT_URL
+    points the client at MinIO (or another S3 stand-in) for local runs and tests.
+    Missing objects raise FileNotFoundError and network failures ConnectionError, so callers
+    (e.g. the task retry policy) can treat both backends the same way.
+    """
+    name = 's3'
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None):
+        if not BOTO3_AVAILABLE:
+            raise ImportError("boto3 not installed. Install with: pip install boto3")
+        if not bucket:
+            raise ValueError("S3_BUCKET must be set when STORAGE_BACKEND=s3.")
+        self.bucket = bucket
+        self.prefix = prefix or ''
+        self.client = boto3.client('s3', endpoint_url=endpoint_url or None, region_name=region or None,
+                                   config=BotoConfig(signature_version='s3v4', retries={'max_attempts': 3, 'mode': 'standard'},
+                                                     s3={'addressing_style': 'path' if endpoint_url else 'auto'}))
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    @contextmanager
+    def _errors(self, key):
+        try:
+            yield
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                raise FileNotFoundError(f"Resume object not found: s3://{self.bucket}/{self._key(key)}") from e
+            raise
+        except (EndpointConnectionError, ConnectionClosedError, ConnectTimeoutError, ReadTimeoutError) as e:
+            raise ConnectionError(f"S3 unreachable for s3://{self.bucket}/{self._key(key)}: {e}") from e
+
+    def put_stream(self, key, stream, max_bytes=None, declared_length=None):
+        """Streams an upload (managed multipart for large files). Returns (size, sha256)."""
+        if max_bytes and declared_length and declared_length > max_bytes:
+            raise UploadTooLargeError(max_bytes, declared_length)
+        reader = _HashingReader(stream, max_bytes)
+        with self._errors(key):
+            self.client.upload_fileobj(reader, self.bucket, self._key(key))
+        return reader.size, reader.digest.hexdigest()
+
+    def open(self, key):
+        """Streaming body (read()/iter_chunks()/close()); nothing is buffered up front."""
+        with self._errors(key):
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+
+    def size(self, key):
+        with self._errors(key):
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))['ContentLength']
+
+    def iter_range(self, key, start=0, end=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        """Yields the bytes [start, end) using an HTTP Range GET."""
+        byte_range = f"bytes={start}-{'' if end is None else end - 1}"
+        with self._errors(key):
+            body = self.client.get_object(Bucket=self.bucket, Key=self._key(key), Range=byte_range)['Body']
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def presigned_url(self, key, download_name=None, expires=300):
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if download_name:
+            params['ResponseContentDisposition'] = attachment_disposition(download_name)
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=int(expires))
+
+    def delete(self, key):
+        with self._errors(key):
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return True
+
+    @contextmanager
+    def local_path(self, key):
+        """Downloads the object to a temp file (same extension, parsers dispatch on it) for the block."""
+        fd, tmp_path = tempfile.mkstemp(prefix='resume-', suffix=os.path.splitext(key)[1])
+        try:
+            with os.fdopen(fd, 'wb') as f, self._errors(key):
+                self.client.download_fileobj(self.bucket, self._key(key), f)
+            yield tmp_path
+        finally:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def storage_settings(config):
+    """Plain-dict storage settings from a Flask config (picklable, for worker subprocesses)."""
+    return {key: config.get(key) for key in STORAGE_SETTING_KEYS}
+
+def create_storage(settings):
+    backend = (settings.get('STORAGE_BACKEND') or 'local').lower()
+    if backend == 's3':
+        return S3Storage(settings.get('S3_BUCKET'), prefix=settings.get('S3_PREFIX') or '',
+                         endpoint_url=settings.get('S3_ENDPOINT_URL'), region=settings.get('S3_REGION'))
+    if backend != 'local':
+        raise ValueError(f"Unknown STORAGE_BACKEND '{backend}'. Valid options: {STORAGE_BACKENDS}")
+    return LocalStorage(settings.get('UPLOAD_FOLDER') or 'uploads/resumes')
+
+
+_storage = None
+_storage_key = None
+_storage_lock = threading.Lock()
+
+def get_storage(config=None):
+    """Process-wide storage driver for the current app's config (rebuilt if the settings change)."""
+    global _storage, _storage_key
+    if config is None:
+        from flask import current_app
+        config = current_app.config
+    settings = storage_settings(config)
+    key = tuple(sorted(settings.items()))
+    with _storage_lock:
+        if _storage is None or _storage_key != key:
+            _storage = create_storage(settings)
+            _storage_key = key
+            logger.info(f"Resume storage backend: {_storage.name}")
+    return _storage
@@ -1,156 +1,471 @@
 # backend/app/tasks.py
 
-import os 
+import os
+import random
+from functools import cached_property
+from flask import current_app
+from sqlalchemy import update, select, or_, and_, bindparam
+from sqlalchemy.exc import OperationalError, InterfaceError, DisconnectionError
+from kombu.exceptions import OperationalError as BrokerOperationalError
 from .extensions import celery, db
-from .models import Resume, Job, StatusEnum
-from .utils.parsers import extract_text_from_file
+from .models import Resume, Job, CandidateDocument, StatusEnum
 # Import the ENHANCED scoring function from nlp utils
-from .utils.nlp import calculate_enhanced_relevance
-import time
+from .utils.nlp import (calculate_enhanced_relevance, calculate_relevance_for_jobs, calculate_stage1_relevance, compute_jd_features,
+                        jd_features_are_current, compute_resume_features, resume_features_are_current, score_components,
+                        score_upper_bound, encode_document)
+from .utils.ann_index import embedding_to_bytes
+from .search import build_resume_index_snapshot
+from .result_writer import get_result_writer
+from .reaper import processing_lease_expiry, reap_stale_resumes
+from .storage import get_storage
+from .text_cache import get_or_extract_text
+from .lexical import get_idf_table, record_document_terms, set_document_terms
+from .cascade import needs_full_scoring
+from .documents import save_document_features, save_document_encoding, document_encoding
+from .utils.document import Document
 import logging
 
+try:
+    from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+    REDIS_ERRORS = (RedisConnectionError, RedisTimeoutError)
+except ImportError:
+    REDIS_ERRORS = ()
+
 
 # Use Celery's logger or standard Python logging for tasks
 logger = logging.getLogger(__name__) # Get logger for this module
 
+# Statuses any task may claim a resume from. COMPLETED is never claimable, and PROCESSING only by
+# the task that already owns it (see _claim_resume), so a duplicate delivery can never run the
+# pipeline twice concurrently or overwrite a finished result.
+CLAIMABLE_STATUSES = (StatusEnum.PENDING, StatusEnum.FAILED)
+
+
+class PermanentProcessingError(Exception):
+    """Input problem that no retry can fix (e.g. an image-only PDF with no extractable text)."""
+
+
+# Only infrastructure hiccups are worth retrying. Anything else (missing file, unparseable input,
+# a bug in scoring) fails the resume immediately with its reason stored in error_message.
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, DisconnectionError, BrokerOperationalError,
+                    ConnectionError, TimeoutError) + REDIS_ERRORS
+ERROR_MESSAGE_MAX_LENGTH = 500
+
+
+def is_transient_error(exc):
+    return isinstance(exc, TRANSIENT_ERRORS) and not isinstance(exc, PermanentProcessingError)
+
+def retry_countdown(retries, base, cap):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**retries)) seconds."""
+    return random.uniform(0, min(cap, base * (2 ** retries)))
+
+def _error_reason(exc):
+    return f"{type(exc).__name__}: {exc}"[:ERROR_MESSAGE_MAX_LENGTH]
+
+class ResumeText:
+    """
+    A claimed resume's extracted text, fetched only on first use: the content-hash artifact from an earlier run if
+    there is one, otherwise the file from the storage backend (local path, or a temp copy of the S3 object), parsed.
+    A resume whose document already has its features and encoding cached is scored without it.
+    """
+
+    def __init__(self, storage, filepath, content_hash, log_prefix):
+        self.storage = storage
+        self.filepath = filepath
+        self.content_hash = content_hash
+        self.log_prefix = log_prefix
+        self.loaded = False
+
+    @cached_property
+    def document(self):
+        logger.info(f"{self.log_prefix}: Attempting to parse '{self.filepath}' from {self.storage.name} storage")
+        # A missing file raises FileNotFoundError (permanent); an unreachable object store ConnectionError (retried)
+        self.content_hash, artifact, cache_hit = get_or_extract_text(self.storage, self.filepath, self.content_hash, current_app.config)
+        resume_text = artifact["text"] if artifact else None
+        if not resume_text:
+            logger.error(f"{self.log_prefix}: Failed to extract text (empty result) from file {self.filepath}.")
+            raise PermanentProcessingError("No extractable text in resume file (image-only, encrypted or corrupted).")
+        if cache_hit:
+            logger.info(f"{self.log_prefix}: Using cached extracted text ({artifact.get('engine')}).")
+        logger.info(f"{self.log_prefix}: Text extracted successfully (length: {len(resume_text)} chars).")
+        self.loaded = True
+        return Document(resume_text)
+
+def _resume_features(claimed, resume_text):
+    """The resume-side features: cached on the claimed row's document, else computed from the text and cached."""
+    if resume_features_are_current(claimed.document_features):
+        return claimed.document_features
+    resume_features = compute_resume_features(resume_text.document)
+    if claimed.document_id:
+        save_document_features(claimed.document_id, resume_features)
+    return resume_features
+
+def _resume_encoding(claimed, resume_text):
+    """The encoder output: cached on the claimed row's document, else one encoder call over the text, then cached."""
+    encoding = document_encoding(claimed.document_chunk_embeddings, claimed.document_embedding, claimed.document_encoder)
+    if encoding is None:
+        encoding = encode_document(resume_text.document)
+        if claimed.document_id:
+            save_document_encoding(claimed.document_id, encoding)
+    return encoding
 
-@celery.task(bind=True, name='app.tasks.process_resume', max_retries=3, default_retry_delay=60,
+def dedupe_key(resume_id, content_hash):
+    """Identity of one finished run: the same resume record with the same file bytes."""
+    return f"{resume_id}:{content_hash}" if content_hash else None
+
+def _claim_resumes(resume_ids, task_id):
+    """
+    Round trip 1: compare-and-set transition to PROCESSING owned by `task_id`, returning everything
+    the pipeline needs (file path, content hash, previous term counts + job description/required years/cached JD
+    features/cascade settings/score threshold, and the document's cached features/encoding, via correlated
+    subqueries on the job's and the document's primary keys) in the same statement.
+    Allowed transitions: PENDING/FAILED -> PROCESSING, and PROCESSING -> PROCESSING for the same
+    task id (a redelivery after the worker died mid-run, or a Celery retry of this task).
+    Returns the claimed rows; resumes that do not exist or are not in a claimable state are left out.
+    """
+    job_column = lambda column: select(column).where(Job.id == Resume.job_id).scalar_subquery()
+    document_column = lambda column: select(column).where(CandidateDocument.id == Resume.document_id).scalar_subquery()
+    claim = (update(Resume)
+             .where(Resume.id.in_(resume_ids),
+                    or_(Resume.status.in_(CLAIMABLE_STATUSES),
+                        and_(Resume.status == StatusEnum.PROCESSING, Resume.claimed_by == task_id)))
+             .values(status=StatusEnum.PROCESSING, score=None, claimed_by=task_id,
+                     lease_expires_at=processing_lease_expiry(current_app.config))
+             .returning(Resume.id, Resume.filepath, Resume.job_id, Resume.content_hash, Resume.document_id,
+                        job_column(Job.description).label('description'),
+                        job_column(Job.required_years).label('required_years'),
+                        job_column(Job.jd_features).label('jd_features'),
+                        job_column(Job.cascade_top_n).label('cascade_top_n'),
+                        job_column(Job.cascade_min_score).label('cascade_min_score'),
+                        job_column(Job.score_threshold).label('score_threshold'),
+                        document_column(CandidateDocument.features).label('document_features'),
+                        document_column(CandidateDocument.chunk_embeddings).label('document_chunk_embeddings'),
+                        document_column(CandidateDocument.embedding).label('document_embedding'),
+                        document_column(CandidateDocument.encoder).label('document_encoder'))
+             .execution_options(synchronize_session=False))
+    rows = db.session.execute(claim).all()
+    db.session.commit()
+    return rows
+
+def _claim_resume(resume_id, task_id):
+    """_claim_resumes for one resume: its claimed row, or None if it does not exist or is not claimable."""
+    rows = _claim_resumes([resume_id], task_id)
+    return rows[0] if rows else None
+
+def _write_result(resume_id, task_id, status, fields):
+    """
+    Writes a finished resume's columns in one UPDATE (only while it is still PROCESSING and owned
+    by `task_id`, so a stale run can never overwrite the claim of a newer one).
+    With RESULT_WRITER_ENABLED the write is batched with other tasks' results; this call still
+    blocks until the batch is committed, so acks_late only acks durable results.
+    Returns True if the row was updated.
+    """
+    writer = get_result_writer(current_app._get_current_object())
+    if writer is not None:
+        return writer.submit(resume_id, task_id, status, fields).result(timeout=current_app.config.get('RESULT_WRITER_TIMEOUT', 60))
+    result = db.session.execute(update(Resume)
+                                .where(Resume.id == resume_id, Resume.status == StatusEnum.PROCESSING,
+                                       Resume.claimed_by == task_id)
+                                .values(status=status, **fields)
+                                .execution_options(synchronize_session=False))
+    db.session.commit()
+    return result.rowcount != 0
+
+def _write_results(task_id, status, rows):
+    """
+    _write_result for many resumes claimed by the same task: `rows` are (resume_id, fields) pairs with the same
+    field names, written in ONE executemany UPDATE and one commit (or as one ResultWriter batch when enabled).
+    Returns the ids of the rows that were updated.
+    """
+    if not rows:
+        return []
+    writer = get_result_writer(current_app._get_current_object())
+    if writer is not None:
+        timeout = current_app.config.get('RESULT_WRITER_TIMEOUT', 60)
+        futures = [(resume_id, writer.submit(resume_id, task_id, status, fields)) for resume_id, fields in rows]
+        return [resume_id for resume_id, future in futures if future.result(timeout=timeout)]
+    table = Resume.__table__
+    names = list(rows[0][1])
+    db.session.execute(update(table)
+                       .where(table.c.id == bindparam('b_id'), table.c.status == StatusEnum.PROCESSING,
+                              table.c.claimed_by == task_id)
+                       .values(status=status, **{name: bindparam(f'b_{name}') for name in names}),
+                       [{'b_id': resume_id, **{f'b_{name}': fields[name] for name in names}} for resume_id, fields in rows])
+    db.session.commit()
+    # executemany has no per-row rowcount: read back which rows this task now holds in `status`
+    resume_ids = [resume_id for resume_id, _ in rows]
+    return [row.id for row in db.session.query(Resume.id).filter(Resume.id.in_(resume_ids), Resume.status == status,
+                                                                  Resume.claimed_by == task_id)]
+
+def _mark_failed(resume_id, task_id, error_message=None):
+    """Single-statement PROCESSING -> FAILED transition (owner only) used by every error path."""
+    db.session.execute(update(Resume)
+                       .where(Resume.id == resume_id, Resume.status == StatusEnum.PROCESSING,
+                              Resume.claimed_by == task_id)
+                       .values(status=StatusEnum.FAILED, score=None, error_message=error_message, lease_expires_at=None)
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+
+
+@celery.task(bind=True, name='app.tasks.process_resume', max_retries=5,
              acks_late=True, task_reject_on_worker_lost=True)
 def process_resume(self, resume_id, job_id):
     task_id = self.request.id or 'unknown'
+    backoff = lambda: retry_countdown(self.request.retries, current_app.config.get('TASK_RETRY_BACKOFF_BASE', 10),
+                                      current_app.config.get('TASK_RETRY_BACKOFF_MAX', 600))
     logger.info(f"[Task ID: {task_id}] Starting processing for Resume ID: {resume_id}, Job ID: {job_id}")
 
-    retries = 0
-    MAX_DB_FETCH_RETRIES = 3 # Try 3 times
-    RETRY_DB_FETCH_DELAY = 1 # Wait 1 second between tries
-
-    resume = None
-    while retries < MAX_DB_FETCH_RETRIES and resume is None:
-        resume = Resume.query.get(resume_id)
-        if resume is None:
-            retries += 1
-            if retries < MAX_DB_FETCH_RETRIES:
-                 logger.warning(f"[Task ID: {task_id}] Resume ID {resume_id} not found on attempt {retries}. Waiting {RETRY_DB_FETCH_DELAY}s before retry...")
-                 time.sleep(RETRY_DB_FETCH_DELAY) # Add import time at the top
-        else:
-            break # Found it!
+    # --- 1. Claim the resume (compare-and-set UPDATE ... RETURNING, with its job's fields) ---
+    try:
+        claimed = _claim_resume(resume_id, task_id)
+    except Exception as claim_err:
+        db.session.rollback()
+        logger.error(f"[Task ID: {task_id}] Resume ID {resume_id}: DB error while claiming resume: {claim_err}", exc_info=True)
+        if not is_transient_error(claim_err) or self.request.retries >= self.max_retries:
+            return {'status': 'FAILED', 'error': _error_reason(claim_err)}
+        raise self.retry(exc=claim_err, countdown=backoff())
 
-    if resume is None: # Check after retries
-        logger.error(f"[Task ID: {task_id}] Resume ID {resume_id} not found in database after {MAX_DB_FETCH_RETRIES} attempts. Aborting task.")
-        return {'status': 'FAILED', 'error': 'Resume database record not found'}
+    if claimed is None:
+        # Either the row is gone or another delivery already owns/finished it. The extra lookup
+        # only happens on this (rare) path, never on the normal one.
+        current = db.session.query(Resume.status, Resume.content_hash, Resume.processed_key).filter(Resume.id == resume_id).first()
+        if current is None:
+            logger.error(f"[Task ID: {task_id}] Resume ID {resume_id} not found in database. Aborting task.")
+            return {'status': 'FAILED', 'error': 'Resume database record not found'}
+        current_status = current.status
+        if current_status == StatusEnum.COMPLETED and current.processed_key == dedupe_key(resume_id, current.content_hash):
+            logger.info(f"[Task ID: {task_id}] Resume ID {resume_id} already COMPLETED for this file content; redelivered task is a no-op.")
+            return {'status': 'DUPLICATE', 'current_status': current_status.name}
+        logger.warning(f"[Task ID: {task_id}] Resume ID {resume_id} is already {current_status.name}; skipping duplicate task.")
+        return {'status': 'SKIPPED', 'current_status': current_status.name}
 
-    # Fetch objects from DB
-    resume = Resume.query.get(resume_id)
-    if not resume:
-        logger.error(f"[Task ID: {task_id}] Resume ID {resume_id} not found in database. Aborting task.")
-        return {'status': 'FAILED', 'error': 'Resume database record not found'}
-
-    job = Job.query.get(job_id)
-    if not job:
-        logger.error(f"[Task ID: {task_id}] Job ID {job_id} not found for Resume ID {resume_id}. Aborting task and marking resume as FAILED.")
-        try:
-            resume.status = StatusEnum.FAILED
-            resume.score = None
-            # resume.error_message = "Associated Job not found"[:499]
-            db.session.commit()
-        except Exception as db_err:
-             logger.error(f"[Task ID: {task_id}] DB error updating resume status for missing job: {db_err}", exc_info=True)
-             db.session.rollback()
-        return {'status': 'FAILED', 'error': 'Associated Job record not found'}
+    if claimed.job_id != job_id:
+        logger.warning(f"[Task ID: {task_id}] Resume ID {resume_id} belongs to Job ID {claimed.job_id}, not {job_id}; using {claimed.job_id}.")
+    job_id = claimed.job_id
+    logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Status set to PROCESSING.")
 
     # --- Start Processing Logic ---
     try:
-        # 1. Update Status to PROCESSING
-        resume.status = StatusEnum.PROCESSING
-        resume.score = None
-        # resume.error_message = None
-        db.session.commit()
-        logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Status set to PROCESSING.")
+        # 2. Resume features: cached on the resume's document when any application of the same file was parsed
+        # before; otherwise the extracted text is loaded (text artifact cache, else storage + parser) and parsed once
+        resume_text = ResumeText(get_storage(), claimed.filepath, claimed.content_hash, f"[Task ID: {task_id}] Resume ID {resume_id}")
+        resume_features = _resume_features(claimed, resume_text)
+        if not resume_text.loaded:
+            logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Using the cached features of document {claimed.document_id}.")
 
-        # 2. Get Full File Path and Extract Text
-        upload_folder_path = celery.conf.get('UPLOAD_FOLDER')
-        if not upload_folder_path:
-            logger.warning(f"[Task ID: {task_id}] UPLOAD_FOLDER not found in Celery config, using default 'uploads/resumes'")
-            upload_folder_path = 'uploads/resumes'
+        # 3. Calculate ENHANCED Relevance Score (JD features come from the job's cache when fresh)
+        jd_features = claimed.jd_features
+        refresh_jd_cache = not jd_features_are_current(jd_features)
+        if refresh_jd_cache:
+            logger.info(f"[Task ID: {task_id}] Job ID {job_id}: JD features not cached, computing once for the job.")
+            jd_features = compute_jd_features(claimed.description)
 
-        upload_folder_abs = os.path.abspath(upload_folder_path)
-        full_file_path = os.path.join(upload_folder_abs, resume.filepath)
+        # Stage 1 (every resume): keyword skills + corpus TF-IDF, no spaCy parse or encoder call
+        idf_table = get_idf_table()
+        stage1_score = calculate_stage1_relevance(None, jd_features, idf_table, resume_features=resume_features)["stage1_score"]
+        full_scoring = needs_full_scoring(job_id, resume_id, stage1_score, claimed.cascade_top_n, claimed.cascade_min_score)
 
-        logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Attempting to parse file at {full_file_path}")
+        fields = {"stage1_score": stage1_score, "term_counts": resume_features["terms"], "error_message": None, "lease_expires_at": None}
+        score_data = {}
+        if full_scoring:
+            # Stage 2: the full weighted relevance
+            required_years = claimed.required_years if claimed.required_years is not None else 0
+            logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Calculating enhanced relevance against Job ID {job_id} (Req Exp from DB: {required_years})...")
+            # With a job score threshold the encoder is skipped when the threshold is out of reach; otherwise
+            # the document's cached encoding is used, or the one encoder call is made and cached on it
+            components = score_components(None, jd_features, required_years, idf_table, resume_features=resume_features)
+            encoding = None
+            if jd_features.get("embedding") is not None and \
+                    (claimed.score_threshold is None or score_upper_bound(components) >= claimed.score_threshold):
+                encoding = _resume_encoding(claimed, resume_text)
+            score_data = calculate_enhanced_relevance(resume_text.document if resume_text.loaded else None, claimed.description,
+                                                      required_years, jd_features=jd_features, resume_encoding=encoding,
+                                                      idf_table=idf_table, score_threshold=claimed.score_threshold,
+                                                      components=components)
+            fields.update(score=score_data.get("final_score"), score_stage=2,
+                          below_threshold=score_data["below_threshold"], score_upper_bound=score_data["score_upper_bound"])
+            if not score_data["below_threshold"]:
+                fields["embedding"] = embedding_to_bytes(score_data.get("resume_embedding"))
+        else:
+            logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Stage-1 score {stage1_score:.4f} is outside Job ID {job_id}'s "
+                        f"cascade cut (top {claimed.cascade_top_n}, min {claimed.cascade_min_score}); skipping full scoring.")
+            fields.update(score=stage1_score, score_stage=1, below_threshold=None, score_upper_bound=None)
 
-        if not os.path.exists(full_file_path):
-             raise FileNotFoundError(f"Resume file not found on worker at path: {full_file_path} (based on DB filepath '{resume.filepath}' and upload folder '{upload_folder_abs}')")
+        # 4. Write final results in one statement (the job's JD feature cache is written first on a miss)
+        content_hash = resume_text.content_hash
+        fields.update(content_hash=content_hash, processed_key=dedupe_key(resume_id, content_hash))
+        final_score = fields["score"]
+        if refresh_jd_cache:
+            db.session.execute(update(Job).where(Job.id == job_id).values(jd_features=jd_features)
+                               .execution_options(synchronize_session=False))
+            db.session.commit()
+        written = _write_result(resume_id, task_id, StatusEnum.COMPLETED, fields)
+        if not written:
+            logger.warning(f"[Task ID: {task_id}] Resume ID {resume_id}: Claim was taken over before the result was written; discarding this run.")
+            return {'status': 'SKIPPED', 'error': 'Claim lost before result write'}
+        logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Processing COMPLETED (stage {fields['score_stage']}). Final Score: {final_score:.4f}")
 
-        resume_text = extract_text_from_file(full_file_path)
+        # 5. Fold its document's terms into the corpus vocabulary, once per document (non-fatal:
+        # `flask rebuild-lexical-index` repairs drift)
+        try:
+            record_document_terms(claimed.document_id, resume_features["terms"])
+        except Exception as lexical_err:
+            db.session.rollback()
+            logger.error(f"[Task ID: {task_id}] Resume ID {resume_id}: Failed to update lexical document frequencies: {lexical_err}", exc_info=True)
+        # Its embedding (written above) reaches the serving processes' ANN index on their next DB sync
+        return {'status': 'COMPLETED', 'score': final_score, 'stage': fields['score_stage']}
 
-        if not resume_text:
-            logger.error(f"[Task ID: {task_id}] Resume ID {resume_id}: Failed to extract text (empty result) from file {resume.filepath}.")
-            raise ValueError("Failed to extract text from resume file (parser returned empty).")
+    # --- Exception Handling Block ---
+    except Exception as e:
+        db.session.rollback() # Rollback any partial DB changes from try block
+        transient = is_transient_error(e)
+        retries_left = transient and self.request.retries < self.max_retries
 
-        logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Text extracted successfully (length: {len(resume_text)} chars).")
+        if retries_left:
+            # Leave the resume PROCESSING under this task id; the retry re-claims it (same task id)
+            countdown = backoff()
+            logger.warning(f"[Task ID: {task_id}] Resume ID {resume_id}: Transient error ({_error_reason(e)}); "
+                           f"retry {self.request.retries + 1}/{self.max_retries} in {countdown:.1f}s.")
+            raise self.retry(exc=e, countdown=countdown)
 
-        # 3. Calculate ENHANCED Relevance Score
-        required_years = job.required_years if job.required_years is not None else 0
-        logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Calculating enhanced relevance against Job ID {job_id} (Req Exp from DB: {required_years})...")
-        score_data = calculate_enhanced_relevance(resume_text, job.description, required_years)
+        if transient:
+            logger.error(f"[Task ID: {task_id}] Resume ID {resume_id}: Max retries ({self.max_retries}) exceeded. Last error: {_error_reason(e)}", exc_info=True)
+            reason = f"Max retries exceeded. {_error_reason(e)}"[:ERROR_MESSAGE_MAX_LENGTH]
+        else:
+            logger.error(f"[Task ID: {task_id}] Resume ID {resume_id}: Permanent failure, not retrying. Error: {_error_reason(e)}",
+                         exc_info=not isinstance(e, (PermanentProcessingError, FileNotFoundError)))
+            reason = _error_reason(e)
 
-        # 4. Update Database with final results
-        resume.score = score_data.get("final_score")
-        # Optional: Store component scores
-        # resume.semantic_score = score_data.get("semantic_score")
-        # resume.skill_score = score_data.get("skill_score")
-        # resume.experience_score = score_data.get("experience_score")
-        resume.status = StatusEnum.COMPLETED
+        # Attempt to update resume status to FAILED in the database (one UPDATE, no re-query)
+        try:
+            _mark_failed(resume_id, task_id, reason)
+            logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Status updated to FAILED in database.")
+        except Exception as db_err:
+            logger.error(f"[Task ID: {task_id}] Database error while updating resume status to FAILED: {db_err}", exc_info=True)
+            db.session.rollback() # Rollback the status update attempt itself
+        return {'status': 'FAILED', 'error': reason}
 
-        db.session.commit()
-        logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Processing COMPLETED. Final Score: {resume.score:.4f}")
-        return {'status': 'COMPLETED', 'score': resume.score}
 
-    # --- Exception Handling Block ---
-    except Exception as e:
-        # Log the original error that occurred during processing
-        logger.error(f"[Task ID: {task_id}] Resume ID {resume_id}: Processing FAILED within task try block. Error: {type(e).__name__}: {e}", exc_info=True)
-        db.session.rollback() # Rollback any partial DB changes from try block
+@celery.task(bind=True, name='app.tasks.score_resume_for_jobs', max_retries=5,
+             acks_late=True, task_reject_on_worker_lost=True)
+def score_resume_for_jobs(self, resume_ids):
+    """
+    Scores one stored resume file against several jobs: `resume_ids` are the resume rows (one per job, all
+    pointing at the same file) created by POST /api/resumes/<id>/score-jobs. The file is parsed once, the
+    resume side of the score (skills, experience, terms, the encoder call) runs once, and the semantic scores
+    for all jobs come from one matrix multiply (nlp.calculate_relevance_for_jobs). Results are written in one
+    statement. Every job gets the full score: these jobs were asked for explicitly, so the cascade cut does not
+    apply (each job's score threshold still does).
+    """
+    task_id = self.request.id or 'unknown'
+    backoff = lambda: retry_countdown(self.request.retries, current_app.config.get('TASK_RETRY_BACKOFF_BASE', 10),
+                                      current_app.config.get('TASK_RETRY_BACKOFF_MAX', 600))
+    logger.info(f"[Task ID: {task_id}] Scoring one resume file as Resume IDs {resume_ids}")
 
-        # Attempt to update resume status to FAILED in the database
-        try:
-            resume_in_error = Resume.query.get(resume_id)
-            if resume_in_error:
-                resume_in_error.status = StatusEnum.FAILED
-                resume_in_error.score = None
-                # resume_in_error.error_message = str(e)[:499] # Store error if field exists
+    # --- 1. Claim every row in one statement ---
+    try:
+        claimed = _claim_resumes(resume_ids, task_id)
+    except Exception as claim_err:
+        db.session.rollback()
+        logger.error(f"[Task ID: {task_id}] Resume IDs {resume_ids}: DB error while claiming resumes: {claim_err}", exc_info=True)
+        if not is_transient_error(claim_err) or self.request.retries >= self.max_retries:
+            return {'status': 'FAILED', 'error': _error_reason(claim_err)}
+        raise self.retry(exc=claim_err, countdown=backoff())
+    if not claimed:
+        logger.warning(f"[Task ID: {task_id}] None of Resume IDs {resume_ids} is claimable; skipping duplicate task.")
+        return {'status': 'SKIPPED', 'scored': 0}
+    if len(claimed) < len(resume_ids):
+        skipped = sorted(set(resume_ids) - {row.id for row in claimed})
+        logger.warning(f"[Task ID: {task_id}] Resume IDs {skipped} are gone or already owned/finished; scoring the other {len(claimed)}.")
+
+    try:
+        # 2. Resume features, once for the shared document (a row of a different file would be a caller bug)
+        first = claimed[0]
+        if any(row.filepath != first.filepath for row in claimed):
+            raise PermanentProcessingError("Resume rows of one multi-job task must share a file.")
+        resume_text = ResumeText(get_storage(), first.filepath, first.content_hash, f"[Task ID: {task_id}] Resume IDs {resume_ids}")
+        resume_features = _resume_features(first, resume_text)
+
+        # 3. JD features per job, computed (and cached on the job) only where missing or stale
+        jd_features_by_job = {}
+        for row in claimed:
+            if row.job_id in jd_features_by_job:
+                continue
+            jd_features = row.jd_features
+            if not jd_features_are_current(jd_features):
+                logger.info(f"[Task ID: {task_id}] Job ID {row.job_id}: JD features not cached, computing once for the job.")
+                jd_features = compute_jd_features(row.description)
+                db.session.execute(update(Job).where(Job.id == row.job_id).values(jd_features=jd_features)
+                                   .execution_options(synchronize_session=False))
                 db.session.commit()
-                logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Status updated to FAILED in database.")
-            else:
-                 logger.error(f"[Task ID: {task_id}] Resume ID {resume_id} not found during FAILED status update.")
-        except Exception as db_err:
-             logger.error(f"[Task ID: {task_id}] Database error while updating resume status to FAILED: {db_err}", exc_info=True)
-             db.session.rollback() # Rollback the status update attempt itself
-
-        # --- MODIFIED Retry Logic ---
-        # Check if retries are exhausted BEFORE calling self.retry()
-        if self.request.retries >= self.max_retries:
-            logger.error(f"[Task ID: {task_id}] Resume ID {resume_id}: Max retries ({self.max_retries}) exceeded. Task failed permanently after error: {type(e).__name__}: {e}")
-            return {'status': 'FAILED', 'error': 'Max retries exceeded'}
-        else:
-            # If not exhausted, attempt to retry explicitly
+            jd_features_by_job[row.job_id] = jd_features
+
+        # 4. Score against every job: at most one encoder call (none if the document's encoding is cached, or no job
+        # can still reach its threshold), then one (chunks x jobs) multiply
+        idf_table = get_idf_table()
+        jobs = [(jd_features_by_job[row.job_id], row.required_years or 0, row.score_threshold) for row in claimed]
+        encoding = None
+        for jd_features, required_years, score_threshold in jobs:
+            if jd_features.get("embedding") is not None and (score_threshold is None or score_upper_bound(
+                    score_components(None, jd_features, required_years, idf_table, resume_features=resume_features)) >= score_threshold):
+                encoding = _resume_encoding(first, resume_text)
+                break
+        all_scores = calculate_relevance_for_jobs(None, jobs, idf_table=idf_table, resume_features=resume_features,
+                                                  resume_encoding=encoding)
+
+        # 5. Write every result in one statement
+        content_hash = resume_text.content_hash
+        rows = []
+        for row, score_data in zip(claimed, all_scores):
+            stage1_score = calculate_stage1_relevance(None, jd_features_by_job[row.job_id], idf_table,
+                                                      resume_features=resume_features)["stage1_score"]
+            rows.append((row.id, {"score": score_data["final_score"], "score_stage": 2, "stage1_score": stage1_score,
+                                  "below_threshold": score_data["below_threshold"], "score_upper_bound": score_data["score_upper_bound"],
+                                  "embedding": embedding_to_bytes(score_data.get("resume_embedding")), "content_hash": content_hash,
+                                  "processed_key": dedupe_key(row.id, content_hash), "term_counts": resume_features["terms"],
+                                  "error_message": None, "lease_expires_at": None}))
+        written = set(_write_results(task_id, StatusEnum.COMPLETED, rows))
+        if len(written) < len(rows):
+            logger.warning(f"[Task ID: {task_id}] {len(rows) - len(written)} claim(s) were taken over before the results were written.")
+        scores = {resume_id: fields["score"] for resume_id, fields in rows if resume_id in written}
+        logger.info(f"[Task ID: {task_id}] COMPLETED {len(written)} resume(s). Final scores: {scores}")
+
+        # 6. Corpus vocabulary (non-fatal, as in process_resume; the ANN index picks the embeddings up from the DB)
+        try:
+            set_document_terms({row.document_id: resume_features["terms"] for row in claimed if row.id in written})
+        except Exception as lexical_err:
+            db.session.rollback()
+            logger.error(f"[Task ID: {task_id}] Failed to update lexical document frequencies: {lexical_err}", exc_info=True)
+        return {'status': 'COMPLETED', 'scores': scores}
+
+    except Exception as e:
+        db.session.rollback()
+        transient = is_transient_error(e)
+        if transient and self.request.retries < self.max_retries:
+            countdown = backoff()
+            logger.warning(f"[Task ID: {task_id}] Resume IDs {resume_ids}: Transient error ({_error_reason(e)}); "
+                           f"retry {self.request.retries + 1}/{self.max_retries} in {countdown:.1f}s.")
+            raise self.retry(exc=e, countdown=countdown)
+        reason = (f"Max retries exceeded. {_error_reason(e)}" if transient else _error_reason(e))[:ERROR_MESSAGE_MAX_LENGTH]
+        logger.error(f"[Task ID: {task_id}] Resume IDs {resume_ids}: Failed, not retrying. Error: {reason}",
+                     exc_info=not isinstance(e, (PermanentProcessingError, FileNotFoundError)))
+        for row in claimed:
             try:
-                logger.warning(f"[Task ID: {task_id}] Resume ID {resume_id}: Attempting task retry ({self.request.retries + 1}/{self.max_retries}). Current Error: {type(e).__name__}")
-                retry_delay = self.default_retry_delay if self.default_retry_delay is not None else 60
-                countdown = int(retry_delay * (2 ** self.request.retries)) # Exponential backoff
-
-                # Explicitly call retry() instead of raising it directly here.
-                # Pass the original exception 'e'. Celery's retry() method will raise
-                # a specific Retry exception internally if successful.
-                self.retry(exc=e, countdown=countdown)
-
-                # This part might not be reached if retry() successfully raises its internal exception
-                logger.info(f"[Task ID: {task_id}] Resume ID {resume_id}: Explicit retry called.")
-                return {'status': 'RETRYING', 'error': str(e)}
-
-            except Exception as retry_exc:
-                # Catch potential errors during the explicit self.retry() call itself
-                logger.error(f"[Task ID: {task_id}] Resume ID {resume_id}: CRITICAL - Error occurred during explicit retry call: {retry_exc}", exc_info=True)
-                # If the retry mechanism itself fails, mark as failed permanently
-                return {'status': 'FAILED', 'error': 'Retry mechanism failed during explicit call'}
-        # --- End of MODIFIED Retry Logic ---
\ No newline at end of file
+                _mark_failed(row.id, task_id, reason)
+            except Exception as db_err:
+                logger.error(f"[Task ID: {task_id}] Database error while updating Resume ID {row.id} to FAILED: {db_err}", exc_info=True)
+                db.session.rollback()
+        return {'status': 'FAILED', 'error': reason}
+
+
+@celery.task(name='app.tasks.reap_stale_resumes', ignore_result=True)
+def reap_stale_resumes_task():
+    """Periodic (Celery beat) sweep of resumes stuck PENDING/PROCESSING past their lease."""
+    return reap_stale_resumes()
+
+@celery.task(name='app.tasks.snapshot_ann_index', ignore_result=True)
+def snapshot_ann_index_task():
+    """Periodic (Celery beat) ANN index snapshot: the one process that writes ANN_INDEX_PATH."""
+    entries = build_resume_index_snapshot()
+    logger.info(f"ANN index snapshot written: {entries} resume(s).")
+    return entries
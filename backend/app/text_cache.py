@@ -0,0 +1,178 @@
+# backend/app/text_cache.py
+#
+# Extracted-text artifacts: the first successful extraction of a resume file is stored as a
+# compressed JSON sidecar ({text, engine, pages, truncated, ...}) in the storage backend, keyed by
+# the file's content hash. Retries, rescores and re-runs read it instead of fetching and re-parsing
+# the PDF/DOCX, and identical files uploaded to several jobs share one artifact.
+#
+#   <storage root>/text-artifacts/v1/ab/abcdef...0123.json.zst   (or .json.gz without zstandard)
+
+import io
+import gzip
+import json
+import logging
+from datetime import datetime
+from contextlib import closing
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import multiprocessing
+
+from .utils.parsers import extract_document, compute_file_hash
+
+logger = logging.getLogger(__name__)
+
+# Optional: smaller and faster than gzip; artifacts fall back to gzip without it
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+# Bump when extraction output changes in a way old artifacts should not be reused for
+ARTIFACT_VERSION = 1
+ARTIFACT_ROOT = 'text-artifacts'
+CODEC_EXTENSIONS = {'zstd': '.json.zst', 'gzip': '.json.gz'}
+# A damaged artifact is treated as missing (and rebuilt); these are what decoding one can raise
+_DECODE_ERRORS = (OSError, EOFError, ValueError) + ((zstandard.ZstdError,) if ZSTD_AVAILABLE else ())
+
+
+def artifact_codec(settings):
+    codec = (settings.get('TEXT_ARTIFACT_CODEC') or 'auto').lower()
+    if codec == 'auto':
+        return 'zstd' if ZSTD_AVAILABLE else 'gzip'
+    if codec == 'zstd' and not ZSTD_AVAILABLE:
+        logger.warning("TEXT_ARTIFACT_CODEC=zstd but zstandard is not installed; writing gzip artifacts.")
+        return 'gzip'
+    if codec not in CODEC_EXTENSIONS:
+        raise ValueError(f"Unknown TEXT_ARTIFACT_CODEC '{codec}'. Valid options: auto, {', '.join(CODEC_EXTENSIONS)}")
+    return codec
+
+def artifact_key(content_hash, codec):
+    return f"{ARTIFACT_ROOT}/v{ARTIFACT_VERSION}/{content_hash[:2]}/{content_hash}{CODEC_EXTENSIONS[codec]}"
+
+def _encode(artifact, codec):
+    raw = json.dumps(artifact, ensure_ascii=False).encode('utf-8')
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=6).compress(raw)
+    return gzip.compress(raw, compresslevel=6)
+
+def _decode(blob, codec):
+    raw = zstandard.ZstdDecompressor().decompress(blob) if codec == 'zstd' else gzip.decompress(blob)
+    return json.loads(raw.decode('utf-8'))
+
+
+def load_text_artifact(storage, content_hash):
+    """The stored artifact for `content_hash`, or None (missing, unreadable or an old version)."""
+    if not content_hash:
+        return None
+    # Either codec may have written it (the setting can change); zstd is only readable with zstandard
+    for codec in (('zstd', 'gzip') if ZSTD_AVAILABLE else ('gzip',)):
+        key = artifact_key(content_hash, codec)
+        try:
+            with closing(storage.open(key)) as f:
+                artifact = _decode(f.read(), codec)
+        except FileNotFoundError:
+            continue
+        except ConnectionError:
+            raise # Store unreachable: the caller's retry policy decides
+        except _DECODE_ERRORS as e:
+            logger.warning(f"Ignoring unreadable text artifact {key}: {e}")
+            continue
+        if artifact.get("version") == ARTIFACT_VERSION and artifact.get("content_hash") == content_hash:
+            return artifact
+    return None
+
+def save_text_artifact(storage, content_hash, extraction, settings):
+    """Stores a successful extraction (see parsers.extract_document) and returns the artifact."""
+    max_chars = settings.get('TEXT_ARTIFACT_MAX_CHARS') or 0
+    text = extraction["text"]
+    truncated = bool(max_chars) and len(text) > max_chars
+    artifact = {"version": ARTIFACT_VERSION, "content_hash": content_hash,
+                "text": text[:max_chars] if truncated else text, "engine": extraction.get("engine"),
+                "pages": extraction.get("pages"), "truncated": truncated, "chars": len(text),
+                "created_at": datetime.utcnow().isoformat(timespec='seconds') + 'Z'}
+    codec = artifact_codec(settings)
+    storage.put_stream(artifact_key(content_hash, codec), io.BytesIO(_encode(artifact, codec)))
+    if truncated:
+        logger.warning(f"Extracted text for {content_hash[:12]} truncated from {len(text)} to {max_chars} chars.")
+    return artifact
+
+
+def _uncached(extraction):
+    return {"text": extraction["text"], "engine": extraction["engine"], "pages": extraction["pages"], "truncated": False}
+
+def get_or_extract_text(storage, filepath, content_hash, settings, rebuild=False):
+    """
+    Extracted text for a stored resume file: the cached artifact when there is one (the file itself
+    is not fetched), otherwise the file is fetched and parsed and a successful result is saved.
+    Returns (content_hash, artifact, cache_hit); artifact is None when no text could be extracted.
+    A missing file raises FileNotFoundError, an unreachable store ConnectionError.
+    """
+    enabled = settings.get('TEXT_ARTIFACTS_ENABLED', True)
+    if enabled and not rebuild:
+        artifact = load_text_artifact(storage, content_hash)
+        if artifact is not None:
+            return content_hash, artifact, True
+
+    with storage.local_path(filepath) as local_path:
+        # Content hash is normally computed at upload; rows from before it existed get it here
+        if not content_hash:
+            content_hash = compute_file_hash(local_path)
+            artifact = load_text_artifact(storage, content_hash) if enabled and not rebuild else None
+            if artifact is not None:
+                return content_hash, artifact, True
+        extraction = extract_document(local_path)
+
+    if not extraction["text"]:
+        return content_hash, None, False
+    if not enabled:
+        return content_hash, _uncached(extraction), False
+    try:
+        return content_hash, save_text_artifact(storage, content_hash, extraction, settings), False
+    except Exception as e:
+        # The cache is an optimisation: a failed write must not fail the extraction
+        logger.warning(f"Could not store text artifact for {filepath}: {e}")
+        return content_hash, _uncached(extraction), False
+
+
+# --- Pre-warming (flask warm-text-cache) ---
+_child_storage = None
+
+def _warm_one(item, settings, rebuild):
+    """Process-pool worker: (filepath, content_hash) -> (filepath, content_hash, outcome, error)."""
+    global _child_storage
+    filepath, content_hash = item
+    try:
+        if _child_storage is None:
+            from .storage import create_storage
+            _child_storage = create_storage(settings)
+        content_hash, artifact, hit = get_or_extract_text(_child_storage, filepath, content_hash, settings, rebuild=rebuild)
+        return filepath, content_hash, ("cached" if hit else "built" if artifact else "empty"), None
+    except Exception as e:
+        return filepath, content_hash, "error", f"{type(e).__name__}: {e}"
+
+def warm_text_artifacts(items, settings, workers=None, rebuild=False, on_result=None):
+    """
+    Builds missing artifacts (all of them with `rebuild`) for (filepath, content_hash) items in a
+    spawn-based process pool. `on_result` is called with each _warm_one result as it completes (in
+    completion order, not input order). At most a few items per worker are in flight, so memory
+    stays bounded for any corpus size.
+    Returns counts: {"cached", "built", "empty", "error"}.
+    """
+    counts = {"cached": 0, "built": 0, "empty": 0, "error": 0}
+    workers = max(1, workers or multiprocessing.cpu_count())
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        items = iter(items)
+        pending = {pool.submit(_warm_one, item, settings, rebuild) for item in islice(items, workers * 4)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                counts[result[2]] += 1
+                if on_result:
+                    on_result(result)
+                next_item = next(items, None)
+                if next_item is not None:
+                    pending.add(pool.submit(_warm_one, next_item, settings, rebuild))
+    return counts
@@ -0,0 +1,250 @@
+# backend/app/utils/ann_index.py
+
+import os
+import threading
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- Index Tuning Defaults ---
+MIN_TRAIN_SIZE = 1024      # Below this many live vectors a flat (exact) scan is cheaper than IVF
+RETRAIN_GROWTH = 2.0       # Re-cluster once the live set has grown by this factor since last training
+KMEANS_ITERATIONS = 12
+KMEANS_SAMPLE_SIZE = 20000 # Max vectors used to fit centroids
+DEFAULT_NPROBE = 8
+
+
+class ResumeAnnIndex:
+    """
+    IVF-flat approximate nearest-neighbour index over L2-normalized embeddings (pure NumPy).
+
+    Vectors live in one contiguous float32 buffer. Once enough vectors are present a small
+    spherical k-means codebook partitions them into inverted lists, and a query only scans
+    the `nprobe` lists whose centroids are closest to it. Deletes are tombstones: the row is
+    flagged dead, skipped at query time and physically dropped on the next compaction.
+    """
+
+    def __init__(self, dim, nprobe=DEFAULT_NPROBE):
+        self.dim = int(dim)
+        self.nprobe = max(1, int(nprobe))
+        self._lock = threading.RLock()
+        self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._assign = np.zeros(0, dtype=np.int32)  # Inverted-list id per row (-1 = unassigned)
+        self._size = 0                               # Rows in use (buffer may be larger)
+        self._row_by_id = {}                         # External id -> live row
+        self._centroids = None
+        self._lists = {}                             # Inverted-list id -> list of rows
+        self._trained_on = 0
+
+    # --- Introspection ---
+    def __len__(self):
+        return len(self._row_by_id)
+
+    def __contains__(self, item_id):
+        return int(item_id) in self._row_by_id
+
+    @property
+    def is_trained(self):
+        return self._centroids is not None
+
+    def ids(self):
+        with self._lock:
+            return set(self._row_by_id)
+
+    # --- Mutation ---
+    def _normalize(self, vector):
+        vec = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if vec.shape[0] != self.dim:
+            raise ValueError(f"Embedding has dimension {vec.shape[0]}, index expects {self.dim}.")
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else vec
+
+    def _grow(self, needed):
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 64)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32); vectors[:self._size] = self._vectors[:self._size]
+        ids = np.zeros(new_capacity, dtype=np.int64); ids[:self._size] = self._ids[:self._size]
+        alive = np.zeros(new_capacity, dtype=bool); alive[:self._size] = self._alive[:self._size]
+        assign = np.full(new_capacity, -1, dtype=np.int32); assign[:self._size] = self._assign[:self._size]
+        self._vectors, self._ids, self._alive, self._assign = vectors, ids, alive, assign
+
+    def add(self, item_id, vector):
+        """Inserts (or replaces) a single vector. Cheap: one row append plus one centroid lookup."""
+        item_id = int(item_id)
+        vec = self._normalize(vector)
+        with self._lock:
+            if item_id in self._row_by_id:
+                self._tombstone_row(self._row_by_id.pop(item_id))
+            self._grow(self._size + 1)
+            row = self._size
+            self._vectors[row] = vec
+            self._ids[row] = item_id
+            self._alive[row] = True
+            self._assign[row] = -1
+            self._size += 1
+            self._row_by_id[item_id] = row
+            if self.is_trained:
+                list_id = int(np.argmax(self._centroids @ vec))
+                self._assign[row] = list_id
+                self._lists.setdefault(list_id, []).append(row)
+            self._maybe_train()
+
+    def remove(self, item_id):
+        """Tombstones a vector. Returns True if the id was present."""
+        with self._lock:
+            row = self._row_by_id.pop(int(item_id), None)
+            if row is None:
+                return False
+            self._tombstone_row(row)
+            return True
+
+    def _tombstone_row(self, row):
+        self._alive[row] = False
+
+    def _maybe_train(self):
+        live = len(self._row_by_id)
+        if live < MIN_TRAIN_SIZE:
+            return
+        if self.is_trained and live < self._trained_on * RETRAIN_GROWTH:
+            return
+        self.rebuild()
+
+    def rebuild(self):
+        """Compacts tombstones away and (re)fits the IVF codebook if the index is large enough."""
+        with self._lock:
+            live_rows = np.nonzero(self._alive[:self._size])[0]
+            self._vectors = self._vectors[live_rows].copy()
+            self._ids = self._ids[live_rows].copy()
+            self._alive = np.ones(len(live_rows), dtype=bool)
+            self._assign = np.full(len(live_rows), -1, dtype=np.int32)
+            self._size = len(live_rows)
+            self._row_by_id = {int(item_id): row for row, item_id in enumerate(self._ids)}
+            self._centroids = None
+            self._lists = {}
+            self._trained_on = 0
+            if self._size < MIN_TRAIN_SIZE:
+                return
+            nlist = int(np.clip(np.sqrt(self._size), 8, 4096))
+            self._centroids = _spherical_kmeans(self._vectors[:self._size], nlist)
+            self._assign[:self._size] = _nearest_centroids(self._vectors[:self._size], self._centroids)
+            for row, list_id in enumerate(self._assign[:self._size]):
+                self._lists.setdefault(int(list_id), []).append(row)
+            self._trained_on = self._size
+            logger.info(f"ANN index trained: {self._size} vectors in {nlist} inverted lists.")
+
+    # --- Query ---
+    def search(self, query_vector, k=10, exclude_ids=None):
+        """Returns up to k (id, cosine_similarity) pairs, best first."""
+        if k <= 0:
+            return []
+        query = self._normalize(query_vector)
+        exclude_ids = set(exclude_ids or ())
+        with self._lock:
+            if not self._row_by_id:
+                return []
+            if self.is_trained:
+                nprobe = min(self.nprobe, self._centroids.shape[0])
+                probe_lists = np.argsort(-(self._centroids @ query))[:nprobe]
+                rows = [row for list_id in probe_lists for row in self._lists.get(int(list_id), ())]
+                candidate_rows = np.asarray(rows, dtype=np.int64)
+            else:
+                candidate_rows = np.arange(self._size, dtype=np.int64)
+            if candidate_rows.size == 0:
+                return []
+            candidate_rows = candidate_rows[self._alive[candidate_rows]]
+            if exclude_ids:
+                keep = ~np.isin(self._ids[candidate_rows], np.fromiter(exclude_ids, dtype=np.int64))
+                candidate_rows = candidate_rows[keep]
+            if candidate_rows.size == 0:
+                return []
+            scores = self._vectors[candidate_rows] @ query
+            top = min(k, scores.shape[0])
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best])]
+            return [(int(self._ids[candidate_rows[i]]), float(scores[i])) for i in best]
+
+    # --- Persistence ---
+    def save(self, path):
+        """Writes a compacted snapshot atomically (temp file + rename)."""
+        with self._lock:
+            live_rows = np.nonzero(self._alive[:self._size])[0]
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp-{os.getpid()}"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f,
+                         dim=np.int64(self.dim),
+                         nprobe=np.int64(self.nprobe),
+                         ids=self._ids[live_rows],
+                         vectors=self._vectors[live_rows],
+                         centroids=self._centroids if self.is_trained else np.zeros((0, self.dim), dtype=np.float32),
+                         trained_on=np.int64(self._trained_on))
+            os.replace(tmp_path, path)
+        logger.info(f"ANN index snapshot written to {path} ({len(live_rows)} vectors).")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            index = cls(int(data['dim']), nprobe=int(data['nprobe']))
+            ids = data['ids'].astype(np.int64)
+            vectors = data['vectors'].astype(np.float32)
+            centroids = data['centroids'].astype(np.float32)
+            trained_on = int(data['trained_on'])
+        index._vectors = vectors
+        index._ids = ids
+        index._alive = np.ones(len(ids), dtype=bool)
+        index._assign = np.full(len(ids), -1, dtype=np.int32)
+        index._size = len(ids)
+        index._row_by_id = {int(item_id): row for row, item_id in enumerate(ids)}
+        if centroids.shape[0] and len(ids):
+            index._centroids = centroids
+            index._assign[:] = _nearest_centroids(vectors, centroids)
+            for row, list_id in enumerate(index._assign):
+                index._lists.setdefault(int(list_id), []).append(row)
+            index._trained_on = trained_on
+        logger.info(f"ANN index loaded from {path} ({len(ids)} vectors, trained={index.is_trained}).")
+        return index
+
+
+# --- K-Means Helpers ---
+def _nearest_centroids(vectors, centroids, block=8192):
+    assign = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], block):
+        assign[start:start + block] = np.argmax(vectors[start:start + block] @ centroids.T, axis=1)
+    return assign
+
+def _spherical_kmeans(vectors, nlist, iterations=KMEANS_ITERATIONS, seed=0):
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if vectors.shape[0] > KMEANS_SAMPLE_SIZE:
+        sample = vectors[rng.choice(vectors.shape[0], KMEANS_SAMPLE_SIZE, replace=False)]
+    centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest_centroids(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        if empty.any(): # Re-seed empty clusters from random points
+            sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+# --- Serialization Helpers (for the DB column) ---
+def embedding_to_bytes(vector):
+    if vector is None:
+        return None
+    return np.asarray(vector, dtype=np.float32).reshape(-1).tobytes()
+
+def embedding_from_bytes(blob):
+    if not blob:
+        return None
+    return np.frombuffer(blob, dtype=np.float32)
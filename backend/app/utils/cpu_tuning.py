@@ -0,0 +1,219 @@
+# backend/app/utils/cpu_tuning.py
+#
+# Worker CPU budgeting. Everything here is derived from ONE knob, WORKER_CPUS
+# ('auto' = cgroup quota / CPU affinity of the container), and must run before
+# numpy/torch are imported so the BLAS/OpenMP thread pools pick it up.
+
+import os
+import sys
+import math
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                   'NUMEXPR_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS', 'BLIS_NUM_THREADS')
+GEVENT_GREENLETS_PER_CPU = 8 # Greenlets mostly wait on DB/file I/O; the encoder itself is serialized
+IN_PROCESS_POOLS = ('gevent', 'eventlet', 'threads', 'solo') # Every task slot shares one process (and its DB pool)
+WORKER_DB_EXTRA_CONNECTIONS = 2 # Besides the task slots: result writer thread, worker signals/housekeeping
+
+
+def _read_first_line(path):
+    try:
+        with open(path, 'r') as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+def cgroup_cpu_quota():
+    """CPU limit from the cgroup (v2 cpu.max or v1 cfs quota/period), or None if unlimited/unknown."""
+    cpu_max = _read_first_line('/sys/fs/cgroup/cpu.max')
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max' and period:
+            try: return int(quota) / int(period)
+            except ValueError: pass
+        return None
+    quota = _read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+    period = _read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    try:
+        if quota and period and int(quota) > 0:
+            return int(quota) / int(period)
+    except ValueError:
+        pass
+    return None
+
+def detect_cpus():
+    """Usable CPUs: min(CPU affinity, ceil(cgroup quota)), at least 1."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_quota()
+    if quota:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return max(1, cpus)
+
+def worker_cpu_budget():
+    """The WORKER_CPUS knob: an integer, or 'auto' for detect_cpus()."""
+    value = os.environ.get('WORKER_CPUS', 'auto').strip().lower()
+    if value in ('', 'auto'):
+        return detect_cpus()
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning(f"Invalid WORKER_CPUS='{value}', falling back to auto-detection.")
+        return detect_cpus()
+
+def detect_pool(argv=None):
+    """Celery pool type from '-P/--pool' on the command line or CELERY_POOL, default 'prefork'."""
+    argv = list(sys.argv if argv is None else argv)
+    for i, arg in enumerate(argv):
+        if arg in ('-P', '--pool') and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith('--pool='):
+            return arg.split('=', 1)[1]
+        if arg.startswith('-P') and len(arg) > 2:
+            return arg[2:]
+    return os.environ.get('CELERY_POOL', 'prefork')
+
+def detect_concurrency(argv=None):
+    """Celery concurrency from '-c/--concurrency' on the command line, or None."""
+    argv = list(sys.argv if argv is None else argv)
+    for i, arg in enumerate(argv):
+        value = None
+        if arg in ('-c', '--concurrency') and i + 1 < len(argv):
+            value = argv[i + 1]
+        elif arg.startswith('--concurrency='):
+            value = arg.split('=', 1)[1]
+        elif arg.startswith('-c') and len(arg) > 2:
+            value = arg[2:]
+        if value is not None:
+            try:
+                return max(1, int(value))
+            except ValueError:
+                return None
+    return None
+
+def db_connections_per_process(plan):
+    """DB connections one worker process needs: one per task slot running in it, plus the extras."""
+    slots = plan["concurrency"] if plan["pool"] in IN_PROCESS_POOLS else 1
+    return slots + WORKER_DB_EXTRA_CONNECTIONS
+
+def cap_concurrency_to_db(plan, max_connections):
+    """
+    Lowers a gevent/eventlet/threads plan's concurrency so its process stays within `max_connections`
+    DB connections (WORKER_MAX_DB_CONNECTIONS): more greenlets than connections would only queue on
+    the pool and time out. Prefork children each hold their own small pool and are not capped.
+    """
+    if plan["pool"] not in IN_PROCESS_POOLS or db_connections_per_process(plan) <= max_connections:
+        return plan
+    concurrency = max(1, max_connections - WORKER_DB_EXTRA_CONNECTIONS)
+    logger.warning(f"Capping worker concurrency {plan['concurrency']} -> {concurrency} to stay within "
+                   f"{max_connections} DB connections (WORKER_MAX_DB_CONNECTIONS).")
+    return dict(plan, concurrency=concurrency)
+
+def plan_worker_threads(cpus, pool, threads_per_process=None):
+    """
+    Splits a CPU budget between Celery concurrency and per-process math threads so the total
+    never exceeds `cpus`:
+      - prefork/processes: cpus // T children with T torch/BLAS threads each (T defaults to 1,
+        or WORKER_THREADS_PER_PROCESS as recommended by `flask tune-worker`).
+      - gevent/eventlet/threads/solo: one process; torch/BLAS get all CPUs; one encoder call at a time.
+    """
+    pool = (pool or 'prefork').lower()
+    if pool in ('prefork', 'processes'):
+        if threads_per_process is None:
+            threads_per_process = int(os.environ.get('WORKER_THREADS_PER_PROCESS', 1) or 1)
+        threads = max(1, min(cpus, threads_per_process))
+        return {"pool": pool, "cpus": cpus, "concurrency": max(1, cpus // threads), "torch_threads": threads,
+                "interop_threads": 1, "blas_threads": threads, "encoder_slots": 1}
+    concurrency = cpus * GEVENT_GREENLETS_PER_CPU if pool in ('gevent', 'eventlet') else (1 if pool == 'solo' else cpus)
+    return {"pool": pool, "cpus": cpus, "concurrency": concurrency, "torch_threads": cpus,
+            "interop_threads": 1, "blas_threads": cpus, "encoder_slots": 1}
+
+def apply_thread_env(plan):
+    """Sets BLAS/OpenMP env vars. Only effective before numpy/torch are first imported."""
+    if 'torch' in sys.modules or 'numpy' in sys.modules:
+        logger.warning("apply_thread_env called after numpy/torch import; BLAS pools may ignore the new limits.")
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(plan["blas_threads"])
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false') # HF tokenizers spawn their own pool otherwise
+    os.environ['ENCODER_MAX_CONCURRENCY'] = str(plan["encoder_slots"])
+
+def apply_torch_threads(plan):
+    """Sets torch intra/inter-op thread counts (safe to call repeatedly, e.g. in each forked child)."""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(plan["torch_threads"])
+    try:
+        torch.set_num_interop_threads(plan["interop_threads"])
+    except RuntimeError:
+        pass # Can only be set once, before any inter-op parallel work has started
+
+def configure_worker_runtime(argv=None):
+    """
+    Computes the plan from WORKER_CPUS + pool type (concurrency: an explicit -c, else the plan capped
+    by WORKER_MAX_DB_CONNECTIONS) and applies the env-level settings, including WORKER_POOL and
+    WORKER_DB_CONNECTIONS, the DB pool size config.py gives the worker role.
+    """
+    plan = plan_worker_threads(worker_cpu_budget(), detect_pool(argv))
+    explicit = detect_concurrency(argv)
+    if explicit is not None:
+        plan = dict(plan, concurrency=explicit)
+    else:
+        plan = cap_concurrency_to_db(plan, int(os.environ.get('WORKER_MAX_DB_CONNECTIONS', 50)))
+    os.environ['WORKER_POOL'] = plan["pool"] # Read by result_writer.py (batching needs an in-process pool)
+    os.environ['WORKER_DB_CONNECTIONS'] = str(db_connections_per_process(plan))
+    apply_thread_env(plan)
+    logger.info(f"Worker CPU plan: {plan}")
+    return plan
+
+
+# --- Benchmark-Driven Auto-Tune ---
+def candidate_plans(cpus):
+    """(processes, threads_per_process) combinations that exactly use the CPU budget."""
+    threads = 1
+    while threads <= cpus:
+        if cpus % threads == 0:
+            yield cpus // threads, threads
+        threads *= 2
+    if cpus & (cpus - 1): # Not a power of two: also try a single process with every CPU
+        yield 1, cpus
+
+def _bench_process(args):
+    threads, texts, batch_size, repeats = args
+    plan = {"blas_threads": threads, "torch_threads": threads, "interop_threads": 1, "encoder_slots": 1}
+    apply_thread_env(plan)
+    from . import nlp # Loads the configured encoder in this (spawned) process
+    apply_torch_threads(plan)
+    if nlp.sentence_model is None:
+        return 0.0
+    nlp.sentence_model.encode(texts[:batch_size], batch_size=batch_size) # Warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        nlp.sentence_model.encode(texts, batch_size=batch_size)
+    return time.perf_counter() - start
+
+def autotune(texts, cpus=None, batch_size=16, repeats=2):
+    """
+    Runs the encoder for every (processes x threads) split of the CPU budget in fresh processes and
+    returns (results, best) where results are dicts with texts/sec. Uses the 'spawn' start method so
+    each candidate gets clean thread pools. A 0.0 timing (encoder unavailable) yields 0 throughput.
+    """
+    import multiprocessing
+    cpus = cpus or worker_cpu_budget()
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for processes, threads in candidate_plans(cpus):
+        with ctx.Pool(processes) as pool:
+            timings = pool.map(_bench_process, [(threads, texts, batch_size, repeats)] * processes)
+        elapsed = max(timings) # Processes encode concurrently; model load time is excluded
+        throughput = processes * len(texts) * repeats / elapsed if elapsed > 0 else 0.0
+        results.append({"processes": processes, "threads": threads, "texts_per_sec": throughput})
+        logger.info(f"Autotune: {processes} process(es) x {threads} thread(s) -> {throughput:.1f} texts/s")
+    best = max(results, key=lambda r: r["texts_per_sec"]) if results else None
+    return results, best
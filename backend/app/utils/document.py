@@ -0,0 +1,106 @@
+# backend/app/utils/document.py
+
+import re
+import logging
+import unicodedata
+from collections import Counter
+from functools import cached_property
+from .sections import segment_sections
+
+logger = logging.getLogger(__name__)
+
+# Dash variants (en/em dash, minus, hyphen, non-breaking hyphen, figure dash) -> ASCII '-';
+# soft hyphens and zero-width characters are dropped
+_DASH_RE = re.compile(r'[\u2010\u2011\u2012\u2013\u2014\u2015\u2212]')
+_INVISIBLE_RE = re.compile(r'[\u00ad\u200b\u200c\u200d\u2060\ufeff]')
+# Lexical terms: lowercase words that may carry '+', '#' or inner dots ("c++", "c#", "node.js")
+_TERM_RE = re.compile(r'[a-z][a-z0-9+#]*(?:\.[a-z0-9]+)*')
+TERM_MAX_LENGTH = 64 # = lexical_terms.term column size
+
+
+class Document:
+    """
+    One resume/JD text with lazily computed, cached views. Build it once and hand it to every
+    scorer (skills, experience, semantic, TF-IDF) so each transform - normalisation, line split,
+    section scan, the spaCy parse, encoder chunking - runs at most once per document.
+    """
+
+    def __init__(self, text):
+        self.raw = text or ""
+
+    def __bool__(self):
+        return bool(self.raw.strip())
+
+    def __len__(self):
+        return len(self.raw)
+
+    @cached_property
+    def normalized(self):
+        """NFKC text with unified dashes and newlines and without soft hyphens/zero-width characters."""
+        text = unicodedata.normalize('NFKC', self.raw)
+        text = _INVISIBLE_RE.sub('', _DASH_RE.sub('-', text))
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+
+    @cached_property
+    def lower(self):
+        return self.normalized.lower()
+
+    @cached_property
+    def lines(self):
+        return self.normalized.splitlines()
+
+    @cached_property
+    def sections(self):
+        """Typed section spans (sections.Section) in document order, from one pass over the lines."""
+        return segment_sections(self.lines)
+
+    def section_text(self, *kinds):
+        """Body lines (stripped, blanks dropped) of every section of the given types, one block per section."""
+        blocks = []
+        for span in self.sections:
+            if span.kind in kinds:
+                body = [line.strip() for line in self.lines[span.start:span.end] if line.strip()]
+                if body:
+                    blocks.append("\n".join(body))
+        return "\n\n".join(blocks)
+
+    @cached_property
+    def spacy_doc(self):
+        """spaCy parse of the normalized text (None without a model); NER and lemmas both come from it."""
+        from .nlp import nlp_model # Local import: nlp.py imports this module
+        if nlp_model is None or not self:
+            return None
+        try:
+            return nlp_model(self.normalized)
+        except Exception as e:
+            logger.error(f"spaCy parse failed: {e}", exc_info=False)
+            return None
+
+    @cached_property
+    def tokens(self):
+        """Lowercase lemmas of the alphabetic, non-stopword tokens (the TF-IDF vocabulary view)."""
+        from .nlp import stop_words
+        if self.spacy_doc is None:
+            return []
+        lemmas = (token.lemma_.lower() for token in self.spacy_doc if token.is_alpha and not token.is_stop)
+        return [lemma for lemma in lemmas if lemma not in stop_words and len(lemma) > 1]
+
+    @cached_property
+    def terms(self):
+        """{term: count} over lowercase words minus stopwords (the corpus TF-IDF view; no spaCy needed)."""
+        from .nlp import stop_words
+        return dict(Counter(term for term in _TERM_RE.findall(self.lower)
+                            if 1 < len(term) <= TERM_MAX_LENGTH and term not in stop_words))
+
+    @cached_property
+    def chunks(self):
+        """Encoder-sized chunks of the normalized text (see nlp.chunk_text_for_encoding)."""
+        from .nlp import chunk_text_for_encoding
+        return chunk_text_for_encoding(self.normalized)
+
+
+def as_document(text_or_document):
+    """Scorers accept either raw text or a Document; raw text is wrapped (and then cached) once."""
+    if isinstance(text_or_document, Document):
+        return text_or_document
+    return Document(text_or_document)
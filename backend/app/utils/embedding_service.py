@@ -0,0 +1,116 @@
+# backend/app/utils/embedding_service.py
+
+import time
+import queue
+import threading
+import logging
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def threads_are_green():
+    """True when gevent has monkey-patched threading (Celery '-P gevent')."""
+    try:
+        from gevent import monkey
+        return monkey.is_module_patched('threading')
+    except ImportError:
+        return False
+
+
+class EmbeddingBatcher:
+    """
+    Per-process micro-batcher for the sentence encoder.
+
+    Callers submit a list of texts and get a Future back. A background thread drains the queue,
+    coalescing pending requests until `max_batch_size` texts are collected or `max_wait_ms` has
+    passed since the first one arrived, runs a single encoder call and splits the rows back out.
+    Under gevent the encoder call itself is pushed to gevent's native threadpool so the hub (and
+    every other greenlet parsing files or talking to the DB) keeps running during the forward pass.
+    """
+
+    def __init__(self, encode_fn, max_batch_size=64, max_wait_ms=10):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms) / 1000.0)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.batches_run = 0
+        self.texts_encoded = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, texts):
+        """Queues texts for encoding; the Future resolves to an (len(texts), dim) float32 matrix."""
+        future = Future()
+        texts = list(texts)
+        if not texts:
+            future.set_result(None)
+            return future
+        self._ensure_started()
+        self._queue.put((texts, future))
+        return future
+
+    def encode(self, texts, timeout=None):
+        return self.submit(texts).result(timeout=timeout)
+
+    def shutdown(self, timeout=5.0):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _collect_batch(self, first):
+        batch = [first]
+        n_texts = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while n_texts < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP) # Finish this batch, stop on the next loop
+                break
+            batch.append(item)
+            n_texts += len(item[0])
+        return batch
+
+    def _call_encoder(self, texts):
+        if threads_are_green():
+            import gevent
+            return gevent.get_hub().threadpool.apply(self.encode_fn, (texts,))
+        return self.encode_fn(texts)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect_batch(first)
+            all_texts = [text for texts, _ in batch for text in texts]
+            try:
+                embeddings = self._call_encoder(all_texts)
+                offset = 0
+                for texts, future in batch:
+                    future.set_result(embeddings[offset:offset + len(texts)])
+                    offset += len(texts)
+                self.batches_run += 1
+                self.texts_encoded += len(all_texts)
+                logger.debug(f"Embedding batch #{self.batches_run}: {len(batch)} request(s), {len(all_texts)} text(s).")
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(all_texts)} text(s) failed: {e}", exc_info=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
@@ -0,0 +1,192 @@
+# backend/app/utils/encoders.py
+
+import os
+import json
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Optional backends: each one is only required when selected via ENCODER_BACKEND
+try:
+    import torch
+    from sentence_transformers import SentenceTransformer
+    TORCH_AVAILABLE = True
+except ImportError:
+    torch = None
+    SentenceTransformer = None
+    TORCH_AVAILABLE = False
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ort = None
+    ONNXRUNTIME_AVAILABLE = False
+
+ENCODER_BACKENDS = ('torch', 'torch-int8', 'onnx')
+ONNX_SUBDIR = 'onnx'
+ONNX_FILENAME = 'model.onnx'
+DEFAULT_MAX_SEQ_LENGTH = 256
+
+
+def _l2_normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class TorchEncoder:
+    """fp32 PyTorch sentence-transformers model (the original scoring path)."""
+    name = 'torch'
+
+    def __init__(self, model_path):
+        if not TORCH_AVAILABLE:
+            raise ImportError("sentence-transformers/torch not installed. Install with: pip install sentence-transformers torch")
+        self.model = SentenceTransformer(model_path, device='cpu')
+        self.tokenizer = self.model.tokenizer
+        self.max_seq_length = self.model.max_seq_length or DEFAULT_MAX_SEQ_LENGTH
+
+    def encode(self, texts, batch_size=16):
+        embeddings = self.model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+
+
+class QuantizedTorchEncoder(TorchEncoder):
+    """PyTorch model with dynamic int8 quantization of all Linear layers (CPU only)."""
+    name = 'torch-int8'
+
+    def __init__(self, model_path):
+        super().__init__(model_path)
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info("Applied dynamic int8 quantization to sentence encoder Linear layers.")
+
+
+class OnnxEncoder:
+    """ONNX Runtime export of the transformer with mean pooling done in NumPy."""
+    name = 'onnx'
+
+    def __init__(self, model_path):
+        if not ONNXRUNTIME_AVAILABLE:
+            raise ImportError("onnxruntime not installed. Install with: pip install onnxruntime")
+        from transformers import AutoTokenizer
+        onnx_path = os.path.join(model_path, ONNX_SUBDIR, ONNX_FILENAME)
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(f"ONNX model not found at {onnx_path}. Export it first with: "
+                                    f"python -m app.utils.encoders export --model-dir {model_path}")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.max_seq_length = _read_max_seq_length(model_path)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts, batch_size=16):
+        outputs = []
+        texts = list(texts)
+        for start in range(0, len(texts), batch_size):
+            batch = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                   max_length=self.max_seq_length, return_tensors='np')
+            feeds = {name: batch[name].astype(np.int64) for name in ('input_ids', 'attention_mask', 'token_type_ids')
+                     if name in self._input_names and name in batch}
+            token_embeddings = self.session.run(None, feeds)[0]
+            mask = batch['attention_mask'][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            outputs.append(pooled)
+        if not outputs:
+            return np.zeros((0, 0), dtype=np.float32)
+        return _l2_normalize(np.concatenate(outputs, axis=0))
+
+
+_BACKEND_CLASSES = {'torch': TorchEncoder, 'torch-int8': QuantizedTorchEncoder, 'onnx': OnnxEncoder}
+
+
+def _read_max_seq_length(model_path):
+    config_path = os.path.join(model_path, 'sentence_bert_config.json')
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return int(json.load(f).get('max_seq_length') or DEFAULT_MAX_SEQ_LENGTH)
+    except (OSError, ValueError):
+        return DEFAULT_MAX_SEQ_LENGTH
+
+
+def load_sentence_encoder(backend, model_path):
+    """Loads the configured encoder backend. Returns None (and logs) if it cannot be loaded."""
+    backend = (backend or 'torch').lower()
+    if backend not in _BACKEND_CLASSES:
+        logger.error(f"Unknown ENCODER_BACKEND '{backend}'. Valid options: {ENCODER_BACKENDS}. Falling back to 'torch'.")
+        backend = 'torch'
+    try:
+        logger.info(f"Loading sentence encoder: backend='{backend}', model='{model_path}'...")
+        encoder = _BACKEND_CLASSES[backend](model_path)
+        logger.info(f"Sentence encoder loaded (backend='{backend}', max_seq_length={encoder.max_seq_length}).")
+        return encoder
+    except Exception as e:
+        logger.error(f"Failed to load sentence encoder backend '{backend}' from '{model_path}': {e}", exc_info=True)
+        return None
+
+
+def export_onnx(model_path, opset=17):
+    """Exports the transformer of a local sentence-transformers model directory to <model_path>/onnx/model.onnx."""
+    if not TORCH_AVAILABLE:
+        raise ImportError("torch and sentence-transformers are required to export the ONNX model.")
+    model = SentenceTransformer(model_path, device='cpu')
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    sample = tokenizer(["export sample sentence"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    output_dir = os.path.join(model_path, ONNX_SUBDIR)
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, ONNX_FILENAME)
+
+    class _LastHiddenState(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__(); self.inner = inner
+        def forward(self, *args):
+            return self.inner(**dict(zip(input_names, args))).last_hidden_state
+
+    with torch.no_grad():
+        torch.onnx.export(_LastHiddenState(transformer), tuple(sample[name] for name in input_names), output_path,
+                          input_names=input_names, output_names=['last_hidden_state'],
+                          dynamic_axes=dynamic_axes, opset_version=opset)
+    logger.info(f"Exported ONNX encoder to {output_path}")
+    return output_path
+
+
+# --- Accuracy / Throughput Helpers (used by benchmarks/bench_encoders.py) ---
+def compare_encoders(reference, candidate, queries, documents, tolerance=0.02, batch_size=16):
+    """
+    Scores every (query, document) pair with both encoders and compares the cosine matrices.
+    Returns a dict with the max/mean absolute deviation and whether it stays within `tolerance`.
+    """
+    ref_scores = reference.encode(queries, batch_size) @ reference.encode(documents, batch_size).T
+    cand_scores = candidate.encode(queries, batch_size) @ candidate.encode(documents, batch_size).T
+    deviation = np.abs(ref_scores - cand_scores)
+    return {"max_abs_diff": float(deviation.max()), "mean_abs_diff": float(deviation.mean()),
+            "tolerance": tolerance, "within_tolerance": bool(deviation.max() <= tolerance)}
+
+def measure_throughput(encoder, texts, batch_size=16, repeats=3):
+    """Best-of-N texts/second for encoding `texts` (after one warm-up pass)."""
+    encoder.encode(texts[:batch_size], batch_size)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        encoder.encode(texts, batch_size)
+        best = min(best, time.perf_counter() - start)
+    return len(texts) / best if best > 0 else float('inf')
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Sentence encoder utilities.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help="Export a local sentence-transformers model to ONNX.")
+    export_parser.add_argument('--model-dir', required=True)
+    export_parser.add_argument('--opset', type=int, default=17)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'export':
+        print(export_onnx(args.model_dir, opset=args.opset))
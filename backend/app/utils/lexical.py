@@ -0,0 +1,89 @@
+# backend/app/utils/lexical.py
+
+import math
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from scipy.sparse import csr_matrix
+    SCIPY_AVAILABLE = True
+except ImportError:
+    csr_matrix = None
+    SCIPY_AVAILABLE = False
+
+
+class IdfTable:
+    """
+    Corpus document frequencies -> smoothed IDF weights: idf(t) = ln((1 + N) / (1 + df(t))) + 1
+    (scikit-learn's smooth_idf formula). Terms never seen in the corpus get the maximum IDF.
+    Resume vectors are stored as raw term counts, so the IDF can keep changing as the corpus grows
+    without rewriting them; weights are applied when scoring.
+    """
+
+    def __init__(self, doc_freqs, n_docs):
+        self.doc_freqs = doc_freqs
+        self.n_docs = max(0, int(n_docs))
+        self._unseen = math.log(1 + self.n_docs) + 1
+
+    def __len__(self):
+        return len(self.doc_freqs)
+
+    def idf(self, term):
+        df = self.doc_freqs.get(term)
+        if not df:
+            return self._unseen
+        return math.log((1 + self.n_docs) / (1 + min(df, self.n_docs))) + 1
+
+
+def tfidf_vector(term_counts, idf_table):
+    """Sparse TF-IDF vector of one document as {term: weight}, L2-normalized (sublinear tf = 1 + ln(count))."""
+    weights = {term: (1 + math.log(count)) * idf_table.idf(term) for term, count in (term_counts or {}).items() if count > 0}
+    norm = math.sqrt(sum(w * w for w in weights.values()))
+    return {term: w / norm for term, w in weights.items()} if norm else {}
+
+def lexical_similarity(term_counts, query_counts, idf_table):
+    """TF-IDF cosine similarity of two term-count dicts under the corpus IDF (0.0 if either is empty)."""
+    doc, query = tfidf_vector(term_counts, idf_table), tfidf_vector(query_counts, idf_table)
+    if len(doc) > len(query):
+        doc, query = query, doc
+    return max(0.0, min(1.0, sum(w * query.get(term, 0.0) for term, w in doc.items())))
+
+def lexical_scores(documents, query_counts, idf_table):
+    """
+    TF-IDF cosine of every document (a list of term-count dicts) against the query, as one sparse
+    matrix-vector product: rows are the documents' sublinear-tf * idf weights over the query's
+    terms, divided by each row's full L2 norm. Returns a float32 array aligned with `documents`.
+    """
+    scores = np.zeros(len(documents), dtype=np.float32)
+    query = tfidf_vector(query_counts, idf_table)
+    if not documents or not query:
+        return scores
+    if not SCIPY_AVAILABLE:
+        logger.warning("scipy not installed; scoring the lexical pool one document at a time.")
+        for i, counts in enumerate(documents):
+            scores[i] = lexical_similarity(counts, query_counts, idf_table)
+        return scores
+    # Only the query's terms contribute to a dot product, so they are the only matrix columns;
+    # each row's norm still covers all of its terms
+    columns = {term: i for i, term in enumerate(query)}
+    indptr, indices, data = [0], [], []
+    norms = np.ones(len(documents), dtype=np.float32)
+    for row, counts in enumerate(documents):
+        squared = 0.0
+        for term, count in (counts or {}).items():
+            if count <= 0:
+                continue
+            weight = (1 + math.log(count)) * idf_table.idf(term)
+            squared += weight * weight
+            column = columns.get(term)
+            if column is not None:
+                indices.append(column); data.append(weight)
+        indptr.append(len(indices))
+        norms[row] = math.sqrt(squared) or 1.0
+    matrix = csr_matrix((np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32),
+                         np.asarray(indptr, dtype=np.int64)), shape=(len(documents), len(columns)))
+    query_vector = np.fromiter(query.values(), dtype=np.float32, count=len(query))
+    scores = matrix.dot(query_vector) / norms
+    return np.clip(scores, 0.0, 1.0).astype(np.float32, copy=False)
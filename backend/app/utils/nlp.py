@@ -1,27 +1,22 @@
 # backend/app/utils/nlp.py
 
 import spacy
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import re
 import logging
 import nltk
 import os
+import threading
+import numpy as np
 import dateparser # For parsing various date string formats
 from datetime import datetime # For handling "Present" dates and duration calculation
 
-# Attempt to import sentence-transformers related libraries
-try:
-    from sentence_transformers import SentenceTransformer, util
-    import torch
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    logging.error("CRITICAL: sentence-transformers library or its dependencies (like torch) not found. "
-                  "Semantic similarity WILL NOT WORK. Install with: pip install sentence-transformers torch", exc_info=False)
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
-    SentenceTransformer = None # Define for graceful failure if calculate_semantic_similarity is called
-    util = None
-    torch = None
+# Sentence encoder backends (torch / torch-int8 / onnx) live in encoders.py
+from .encoders import load_sentence_encoder, TORCH_AVAILABLE, ONNXRUNTIME_AVAILABLE
+from .embedding_service import EmbeddingBatcher, threads_are_green
+# Shared per-document views (normalized text, lines, sections, spaCy parse, chunks)
+from .document import as_document
+# Corpus TF-IDF weighting (IDF tables are loaded from the DB by app/lexical.py)
+from .lexical import IdfTable, lexical_similarity
 
 # --- DEFINE LOGGER ---
 logger = logging.getLogger(__name__)
@@ -47,7 +42,32 @@ ensure_nltk_resource('corpora/stopwords', 'stopwords corpus')
 # --- Globals / Setup ---
 NLP_MODEL_NAME = "en_core_web_sm" # Using large model as per your last successful load
 SENTENCE_MODEL_NAME = 'all-MiniLM-L6-v2'
+# Local model directory (preferred on worker nodes) and inference backend: 'torch' | 'torch-int8' | 'onnx'
+SENTENCE_MODEL_PATH = os.environ.get('SENTENCE_MODEL_PATH') or SENTENCE_MODEL_NAME
+ENCODER_BACKEND = os.environ.get('ENCODER_BACKEND', 'torch').lower()
 W_SEMANTIC = 0.35; W_SKILL = 0.45; W_EXPERIENCE = 0.20
+# Share of the final score given to the corpus TF-IDF similarity (0 = computed and stored only, not blended)
+W_LEXICAL = float(os.environ.get('W_LEXICAL', 0.0))
+# Stage-1 (cascade prefilter) score: keyword skill match + corpus TF-IDF, no spaCy parse or encoder call
+W_STAGE1_SKILL = 0.6; W_STAGE1_LEXICAL = 0.4
+
+# --- Semantic Chunking Settings ---
+# Long documents are split into chunks that fit the encoder window instead of being silently truncated.
+SEMANTIC_POOLING = os.environ.get('SEMANTIC_POOLING', 'topk').lower() # 'max' | 'mean' | 'topk'
+SEMANTIC_TOP_K = int(os.environ.get('SEMANTIC_TOP_K', 3))              # Chunks averaged by 'topk' pooling
+SEMANTIC_MAX_CHUNKS = int(os.environ.get('SEMANTIC_MAX_CHUNKS', 24))   # Hard cap -> bounded encoder cost per resume
+SEMANTIC_CHUNK_TOKENS = int(os.environ.get('SEMANTIC_CHUNK_TOKENS', 0)) # 0 = model max_seq_length minus special tokens
+ENCODE_BATCH_SIZE = int(os.environ.get('ENCODE_BATCH_SIZE', 16))       # All chunks of one resume ~ 1-2 forward passes
+
+# --- Embedding Micro-Batcher Settings ---
+# 'auto' enables the shared batcher when threads are green (Celery gevent pool), where many
+# concurrent process_resume greenlets would otherwise each run tiny encoder batches.
+EMBEDDING_BATCHER = os.environ.get('EMBEDDING_BATCHER', 'auto').lower() # 'auto' | 'true' | 'false'
+EMBEDDING_BATCH_MAX = int(os.environ.get('EMBEDDING_BATCH_MAX', 64))    # Flush once this many texts are queued...
+EMBEDDING_BATCH_WAIT_MS = float(os.environ.get('EMBEDDING_BATCH_WAIT_MS', 10)) # ...or this long after the first arrived
+# Max simultaneous encoder calls per process (set by the worker CPU plan, see utils/cpu_tuning.py); 0 = unlimited
+ENCODER_MAX_CONCURRENCY = int(os.environ.get('ENCODER_MAX_CONCURRENCY', 0))
+_encoder_slots = threading.BoundedSemaphore(ENCODER_MAX_CONCURRENCY) if ENCODER_MAX_CONCURRENCY > 0 else None
 
 # --- Helper Function Definitions ---
 def load_spacy_model(model_name):
@@ -72,16 +92,25 @@ def load_spacy_model(model_name):
 # --- Load Resources ---
 nlp_model = load_spacy_model(NLP_MODEL_NAME)
 sentence_model = None
-if SENTENCE_TRANSFORMERS_AVAILABLE:
-   try:
-       logger.info(f"Attempting to load SentenceTransformer model: {SENTENCE_MODEL_NAME}...")
-       sentence_model = SentenceTransformer(SENTENCE_MODEL_NAME)
-       logger.info(f"SentenceTransformer model '{SENTENCE_MODEL_NAME}' loaded successfully.")
-   except Exception as e:
-       logger.error(f"Failed to load SentenceTransformer model '{SENTENCE_MODEL_NAME}': {e}", exc_info=True)
-       SENTENCE_TRANSFORMERS_AVAILABLE = False # Set flag if model loading fails
-       sentence_model = None # Ensure it's None
-else: logger.warning("SentenceTransformer library was not imported; semantic features will be disabled.")
+if TORCH_AVAILABLE or ONNXRUNTIME_AVAILABLE:
+    sentence_model = load_sentence_encoder(ENCODER_BACKEND, SENTENCE_MODEL_PATH)
+else:
+    logging.error("CRITICAL: neither sentence-transformers/torch nor onnxruntime found. "
+                  "Semantic similarity WILL NOT WORK. Install with: pip install sentence-transformers torch", exc_info=False)
+SENTENCE_TRANSFORMERS_AVAILABLE = sentence_model is not None # Kept for callers: "semantic encoder is usable"
+if not SENTENCE_TRANSFORMERS_AVAILABLE: logger.warning("Sentence encoder not loaded; semantic features will be disabled.")
+
+_embedding_batcher = None
+def get_embedding_batcher():
+    """Returns the process-wide EmbeddingBatcher, or None when batching is disabled."""
+    global _embedding_batcher
+    if _embedding_batcher is None and sentence_model is not None:
+        enabled = EMBEDDING_BATCHER == 'true' or (EMBEDDING_BATCHER == 'auto' and threads_are_green())
+        if enabled:
+            _embedding_batcher = EmbeddingBatcher(lambda texts: sentence_model.encode(texts, batch_size=ENCODE_BATCH_SIZE),
+                                                  max_batch_size=EMBEDDING_BATCH_MAX, max_wait_ms=EMBEDDING_BATCH_WAIT_MS)
+            logger.info(f"Embedding micro-batcher enabled (max_batch={EMBEDDING_BATCH_MAX}, max_wait={EMBEDDING_BATCH_WAIT_MS}ms).")
+    return _embedding_batcher
 
 stop_words = set()
 try:
@@ -206,48 +235,45 @@ SKILL_KEYWORDS = {
 }
 
 
+# Word-boundary pattern per curated skill, compiled once instead of per call
+_SKILL_PATTERNS = [(skill, re.compile(r'\b' + re.escape(skill.lower()) + r'\b')) for skill in SKILL_KEYWORDS]
+_SKILLS_BY_LOWER = {skill.lower(): skill for skill in SKILL_KEYWORDS}
+
 # --- Core NLP Function Definitions ---
+# Text arguments below may also be a Document (utils/document.py): its views are computed once and reused.
 def preprocess_text(text):
-    if not text: return ""
+    doc = as_document(text)
+    if not doc: return ""
     if not nlp_model: logger.warning("spaCy model not loaded for preprocess_text."); return ""
-    try:
-        doc = nlp_model(text.lower())
-        return " ".join([token.lemma_ for token in doc if token.is_alpha and not token.is_stop and token.lemma_ not in stop_words and len(token.lemma_) > 1])
-    except Exception as e: logger.error(f"Error in preprocess_text: {e}", exc_info=False); return ""
+    return " ".join(doc.tokens)
 
-def get_targeted_text_for_skills(full_text, section_keywords):
+def get_targeted_text_for_skills(full_text, section_types):
+    """Body text of the sections of the given types (sections.SECTION_HEADERS), or the full text if there are none."""
     if not full_text: return ""
-    # Corrected pattern to be more robust for section endings and capture content properly
-    pattern_str = r"(?i)^\s*(?:" + "|".join(r"\b" + re.escape(kw) + r"\b" for kw in section_keywords) + r")\s*[:\-]?\s*\n(.*?)(?=\n\s*^\s*(?:" + "|".join(r"\b" + re.escape(next_kw) + r"\b" for next_kw in SKILL_KEYWORDS | set(section_keywords) | {"education", "projects", "summary", "awards", "publications", "references"}) + r")\s*[:\-]?\s*\n|^\s*$|\Z)"
-    extracted_blocks = []
-    try:
-        for match in re.finditer(pattern_str, full_text, re.MULTILINE | re.DOTALL): # Added DOTALL
-            if match.group(1): extracted_blocks.append(match.group(1).strip())
-    except Exception as e: logger.error(f"Regex error in get_targeted_text_for_skills: {e}", exc_info=False)
-    if extracted_blocks:
-        combined_text = "\n\n".join(extracted_blocks)
-        logger.debug(f"Extracted targeted text for JD skills (len: {len(combined_text)}) using: {section_keywords}")
+    document = as_document(full_text)
+    combined_text = document.section_text(*section_types)
+    if combined_text:
+        logger.debug(f"Extracted targeted text for JD skills (len: {len(combined_text)}) using: {section_types}")
         return combined_text
-    else: logger.debug(f"No JD sections found for skill keywords {section_keywords}, using full text for JD skill extraction."); return full_text
-
-def extract_skills(text):
-    if not text: return []
-    found_skills = set(); lower_text = text.lower()
-    for skill in SKILL_KEYWORDS:
-        pattern = r'\b' + re.escape(skill.lower()) + r'\b'
-        if re.search(pattern, lower_text): found_skills.add(skill)
-    if nlp_model:
+    else: logger.debug(f"No JD sections found for {section_types}, using full text for JD skill extraction."); return document.normalized
+
+def extract_skills(text, use_ner=True):
+    """Skills from the keyword patterns, plus spaCy NER matches unless `use_ner` is off (stage-1 scoring skips the parse)."""
+    document = as_document(text)
+    if not document: return []
+    found_skills = set(); lower_text = document.lower
+    for skill, pattern in _SKILL_PATTERNS:
+        if pattern.search(lower_text): found_skills.add(skill)
+    if use_ner and document.spacy_doc is not None:
         try:
-            doc = nlp_model(text)
-            for ent in doc.ents:
+            for ent in document.spacy_doc.ents:
                 ent_text_lower = ent.text.lower()
                 if ent_text_lower in SKILL_KEYWORDS:
-                     matching_skill = next((s for s in SKILL_KEYWORDS if s.lower() == ent_text_lower), ent.text)
-                     found_skills.add(matching_skill)
+                     found_skills.add(_SKILLS_BY_LOWER.get(ent_text_lower, ent.text))
                 elif ent.label_ in ["ORG", "PRODUCT"] and ent.text in ["Microsoft", "Google", "Amazon Web Services", "AWS", "Azure", "React", "Angular", "Docker", "Kubernetes", "MySQL", "PostgreSQL", "MongoDB"]:
                      found_skills.add(ent.text); logger.debug(f"NER found relevant ORG/PRODUCT: {ent.text}")
         except Exception as e: logger.error(f"Error in NER skill extraction: {e}", exc_info=False)
-    logger.debug(f"Extracted skills (from text len {len(text if text else '')}): {len(found_skills)} - {sorted(list(found_skills))}")
+    logger.debug(f"Extracted skills (from text len {len(document)}): {len(found_skills)} - {sorted(list(found_skills))}")
     return list(found_skills)
 
 # --- Experience Extraction Functions ---
@@ -258,6 +284,7 @@ def extract_explicit_years_mention(text):
     """Extracts explicit 'X years of experience' mentions using regex. Returns max found."""
     if not text:
         return 0
+    text = as_document(text).normalized
     pattern = r'(\d{1,2}(?:\.\d{1,2})?)\s*\+?\s*(?:years?|yrs?|year)(?:\s*(?:of|in|with)?\s*exp(?:erience)?)?'
     years_found = []
     try: # Outer try for the whole findall operation
@@ -290,94 +317,27 @@ def extract_explicit_years_mention(text):
 
 
 def extract_experience_durations_from_sections(text_content):
-    if not text_content:
+    document = as_document(text_content)
+    if not document:
         logger.debug("extract_experience_durations_from_sections: Received empty text_content.")
         return 0
     
     total_experience_years = 0
-    
-    experience_section_keywords = [
-        "Work Experience", "Experience", "Employment History", "Relevant Experience",
-        "Career History", "Professional Experience", "Positions Held",
-        "Work Experience & Projects", "RELEVANT EXPERIENCE", "WORK EXPERIENCE",
-        "PROFESSIONAL EXPERIENCE", "EMPLOYMENT HISTORY", "EXPERIENCE"
-        # Added common variants including all caps versions
-    ]
-    
-    # Keywords that strongly indicate the end of work experience for date parsing
-    section_terminators = [
-        "Education", "Academic Background", "Degrees", "Certifications", "Skills",
-        "Technical Skills", "Projects", "OpenSource Contributions", "Achievements",
-        "Popular Blogs", "Awards", "Publications", "References", "Languages",
-        "Summary", "Objective", "Personal Details", "Contact", "CODING PROFILES",
-        "PROJECTS", "OPENSOURCE CONTRIBUTIONS", "SKILLS", "EDUCATION", "ACHIEVEMENTS",
-        "POPULAR BLOGS"  # Added uppercase versions
-    ]
-
-    lines = text_content.splitlines()
-    relevant_text_for_dates = ""
-    in_experience_section = False
-    current_block_lines = []
 
+    # Work-history blocks are the document's 'experience' section spans (utils/sections.py), computed once per document
     logger.info("--- STARTING EXPERIENCE SECTION SEARCH (Strict) ---")
-    logger.info(f"Total lines in document: {len(lines)}")
-
-    for i, line in enumerate(lines):
-        line_stripped = line.strip()
-        line_lower = line_stripped.lower()
-        
-        # More flexible header matching - check if line contains experience keywords
-        is_experience_header = False
-        for kw in experience_section_keywords:
-            if kw.lower() in line_lower:
-                # Additional check: the keyword should be prominent in the line (not just a small part)
-                if len(kw) / len(line_stripped) > 0.5 or line_lower == kw.lower():
-                    is_experience_header = True
-                    break
-        
-        # More flexible terminator matching
-        is_terminator_header = False
-        for kw in section_terminators:
-            if kw.lower() in line_lower:
-                if len(kw) / len(line_stripped) > 0.5 or line_lower == kw.lower():
-                    is_terminator_header = True
-                    break
-
-        if is_experience_header:
-            if in_experience_section and current_block_lines:
-                logger.info(f"  New experience header '{line_stripped}' found, processing previous block.")
-                relevant_text_for_dates += "\n".join(current_block_lines).strip() + "\n\n"
-            
-            logger.info(f"MATCHED Experience Header: '{line_stripped}' at line index {i}")
-            in_experience_section = True
-            current_block_lines = []
-            continue
-
-        if is_terminator_header:
-            if in_experience_section:
-                logger.info(f"ENDER Found: '{line_stripped}' at line index {i}. Finalizing current experience block.")
-                if current_block_lines:
-                    relevant_text_for_dates += "\n".join(current_block_lines).strip() + "\n\n"
-            in_experience_section = False
-            current_block_lines = []
-
-        if in_experience_section and line_stripped:
-            current_block_lines.append(line_stripped)
-            if len(current_block_lines) <= 10:  # Log first 10 lines
-                logger.debug(f"  Adding to current experience block (line {i}): '{line_stripped}'")
-
-    # Handle case where document ends while still in experience section
-    if in_experience_section and current_block_lines:
-        logger.info("End of document reached while in an experience section. Adding final block.")
-        relevant_text_for_dates += "\n".join(current_block_lines).strip() + "\n\n"
-
+    logger.info(f"Total lines in document: {len(document.lines)}")
+    for span in document.sections:
+        if span.kind == 'experience':
+            logger.info(f"MATCHED Experience Header: '{span.title}' at line index {span.start - 1}")
+    relevant_text_for_dates = document.section_text('experience')
     logger.info("--- FINISHED EXPERIENCE SECTION SEARCH ---")
     
     if not relevant_text_for_dates.strip():
         logger.warning("No text content extracted from identified experience sections for date parsing.")
         # Log first 20 lines of the document for debugging
         logger.info("First 20 lines of document for debugging:")
-        for i, line in enumerate(lines[:20]):
+        for i, line in enumerate(document.lines[:20]):
             logger.info(f"Line {i}: '{line.strip()}'")
         return 0
     else:
@@ -385,12 +345,7 @@ def extract_experience_durations_from_sections(text_content):
         logger.info(f"<<<<<<<<<<\n{relevant_text_for_dates.strip()}\n>>>>>>>>>>")
 
     # --- Enhanced Date Range Parsing ---
-    # Normalize various dash types and fix spacing
-    relevant_text_for_dates = relevant_text_for_dates.replace("–", " - ").replace("—", " - ")
-    relevant_text_for_dates = relevant_text_for_dates.replace("\u2013", " - ").replace("\u2014", " - ")
-    relevant_text_for_dates = relevant_text_for_dates.replace("−", " - ").replace("‐", " - ")
-    
-    # Fix month-year spacing issues
+    # Dash variants are already unified to '-' (Document.normalized); fix month-year spacing issues
     relevant_text_for_dates = re.sub(r'(?i)\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)(\d{4})', r'\1 \2', relevant_text_for_dates)
     relevant_text_for_dates = re.sub(r'\s+', ' ', relevant_text_for_dates).strip()
 
@@ -489,14 +444,15 @@ def extract_experience_durations_from_sections(text_content):
 
 
 def extract_years_experience(text):
-    if not text: 
+    document = as_document(text)
+    if not document: 
         logger.warning("extract_years_experience: Received empty text")
         return 0
         
     logger.info("=== STARTING EXPERIENCE EXTRACTION ===")
     
-    explicit_mention_years = extract_explicit_years_mention(text)
-    duration_from_dates = extract_experience_durations_from_sections(text)
+    explicit_mention_years = extract_explicit_years_mention(document)
+    duration_from_dates = extract_experience_durations_from_sections(document)
     
     final_experience_years = max(explicit_mention_years, duration_from_dates)
     
@@ -509,15 +465,135 @@ def extract_years_experience(text):
     return final_experience_years
 
 # --- Scoring Component Functions ---
-def calculate_semantic_similarity(text1, text2):
-    if not SENTENCE_TRANSFORMERS_AVAILABLE: logger.warning("ST lib not imported. Skip semantic similarity."); return 0.0
-    if not sentence_model: logger.warning("ST model not loaded. Skip semantic similarity."); return 0.0
-    if not text1 or not text2: logger.debug("Empty text for semantic similarity."); return 0.0
+def _chunk_token_budget():
+    if SEMANTIC_CHUNK_TOKENS > 0: return SEMANTIC_CHUNK_TOKENS
+    max_seq_length = getattr(sentence_model, 'max_seq_length', None) or 256
+    return max(32, max_seq_length - 2) # Leave room for [CLS]/[SEP]
+
+def _count_tokens(segments):
+    """Token counts per segment using the encoder's own tokenizer (falls back to a word-based estimate)."""
+    tokenizer = getattr(sentence_model, 'tokenizer', None)
+    if tokenizer is not None:
+        try: return [len(ids) for ids in tokenizer(segments, add_special_tokens=False)['input_ids']]
+        except Exception as e: logger.debug(f"Tokenizer count failed, estimating from words: {e}")
+    return [int(len(segment.split()) * 1.3) + 1 for segment in segments]
+
+def chunk_text_for_encoding(text, max_tokens=None, max_chunks=None):
+    """
+    Splits text into encoder-sized chunks along section/line/sentence boundaries.
+    Sentences are packed greedily up to `max_tokens`; over-long sentences are split on words.
+    At most `max_chunks` chunks are returned (the document head is kept, the tail is dropped).
+    """
+    if not text or not text.strip(): return []
+    max_tokens = max_tokens or _chunk_token_budget()
+    max_chunks = max_chunks or SEMANTIC_MAX_CHUNKS
+    segments = []
+    for block in re.split(r'\n\s*\n', text): # Sections / paragraphs
+        for line in block.splitlines():
+            line = line.strip()
+            if line: segments.extend(s for s in re.split(r'(?<=[.!?;])\s+', line) if s)
+    if not segments: return []
+    token_counts = _count_tokens(segments)
+    chunks = []; current = []; current_tokens = 0; truncated = False
+    for segment, n_tokens in zip(segments, token_counts):
+        if n_tokens > max_tokens: # Split an over-long sentence on words
+            words = segment.split(); step = max(1, int(len(words) * max_tokens / n_tokens))
+            pieces = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+            piece_tokens = [min(max_tokens, int(n_tokens * len(p.split()) / len(words)) + 1) for p in pieces]
+        else:
+            pieces = [segment]; piece_tokens = [n_tokens]
+        for piece, piece_n in zip(pieces, piece_tokens):
+            if current and current_tokens + piece_n > max_tokens:
+                chunks.append(" ".join(current)); current = []; current_tokens = 0
+                if len(chunks) >= max_chunks: truncated = True; break
+            current.append(piece); current_tokens += piece_n
+        if truncated: break
+    if current and not truncated: chunks.append(" ".join(current))
+    if truncated: logger.info(f"Document hit SEMANTIC_MAX_CHUNKS={max_chunks}; remaining text not encoded.")
+    return chunks
+
+def encode_texts(texts):
+    """Encodes a list of texts in batches of ENCODE_BATCH_SIZE; returns an (n, dim) float32 matrix of normalized rows."""
+    if not SENTENCE_TRANSFORMERS_AVAILABLE or not sentence_model or not texts: return None
     try:
-        embedding1 = sentence_model.encode(text1, convert_to_tensor=True, normalize_embeddings=True)
-        embedding2 = sentence_model.encode(text2, convert_to_tensor=True, normalize_embeddings=True)
-        cosine_score = util.pytorch_cos_sim(embedding1, embedding2).item(); return max(0.0, min(1.0, cosine_score))
-    except Exception as e: logger.error(f"Error in calculate_semantic_similarity: {e}", exc_info=True); return 0.0
+        batcher = get_embedding_batcher()
+        if batcher is not None: return batcher.encode(texts) # Coalesced with other concurrent callers
+        if _encoder_slots is None: return sentence_model.encode(list(texts), batch_size=ENCODE_BATCH_SIZE)
+        with _encoder_slots: # Greenlets/threads sharing the model take turns instead of oversubscribing CPUs
+            return sentence_model.encode(list(texts), batch_size=ENCODE_BATCH_SIZE)
+    except Exception as e: logger.error(f"Error in encode_texts: {e}", exc_info=True); return None
+
+def _normalize_vector(vector):
+    norm = float(np.linalg.norm(vector)); return (vector / norm).astype(np.float32) if norm > 0 else vector
+
+def encode_document(text):
+    """Encodes all chunks of a document in one batch. Returns (chunk_embeddings, document_embedding) or (None, None)."""
+    chunks = as_document(text).chunks
+    chunk_embeddings = encode_texts(chunks)
+    if chunk_embeddings is None or not len(chunk_embeddings): return None, None
+    logger.debug(f"Encoded document as {len(chunks)} chunk(s).")
+    return chunk_embeddings, _normalize_vector(chunk_embeddings.mean(axis=0))
+
+def encode_documents(texts):
+    """
+    encode_document for many texts with ONE encoder call over all their chunks (offline/bulk scoring).
+    Returns a list of (chunk_embeddings, document_embedding), (None, None) for empty texts.
+    """
+    chunk_lists = [as_document(text).chunks if text else [] for text in texts]
+    all_chunks = [chunk for chunks in chunk_lists for chunk in chunks]
+    embeddings = encode_texts(all_chunks) if all_chunks else None
+    if embeddings is None: return [(None, None)] * len(chunk_lists)
+    encodings = []; offset = 0
+    for chunks in chunk_lists:
+        if not chunks: encodings.append((None, None)); continue
+        chunk_embeddings = embeddings[offset:offset + len(chunks)]; offset += len(chunks)
+        encodings.append((chunk_embeddings, _normalize_vector(chunk_embeddings.mean(axis=0))))
+    return encodings
+
+def encode_text(text):
+    """Returns the L2-normalized (chunk mean-pooled) embedding of `text` as a float32 NumPy vector (None if unavailable)."""
+    return encode_document(text)[1]
+
+def pool_chunk_scores(chunk_scores, pooling=None, top_k=None):
+    """Aggregates per-chunk cosine scores with 'max', 'mean' or 'topk' (mean of the k best chunks) pooling."""
+    if chunk_scores is None or not len(chunk_scores): return 0.0
+    pooling = (pooling or SEMANTIC_POOLING).lower(); top_k = top_k or SEMANTIC_TOP_K
+    if pooling == 'max': pooled = float(np.max(chunk_scores))
+    elif pooling == 'mean': pooled = float(np.mean(chunk_scores))
+    else:
+        if pooling != 'topk': logger.warning(f"Unknown SEMANTIC_POOLING '{pooling}', using 'topk'.")
+        k = min(top_k, len(chunk_scores)); pooled = float(np.mean(np.sort(chunk_scores)[-k:]))
+    return max(0.0, min(1.0, pooled))
+
+def cosine_from_embeddings(embedding1, embedding2):
+    if embedding1 is None or embedding2 is None: return 0.0
+    cosine_score = float(np.dot(embedding1, embedding2)); return max(0.0, min(1.0, cosine_score))
+
+def semantic_similarity_to_embedding(text, target_embedding):
+    """Chunked similarity of `text` against a precomputed (JD) embedding. Returns (score, text_document_embedding)."""
+    if not SENTENCE_TRANSFORMERS_AVAILABLE or not sentence_model: logger.warning("Sentence encoder not loaded. Skip semantic similarity."); return 0.0, None
+    if not text or target_embedding is None: logger.debug("Empty text/embedding for semantic similarity."); return 0.0, None
+    return similarity_from_encoding(encode_document(text), target_embedding)
+
+def similarity_from_encoding(encoding, target_embedding):
+    """Pooled chunk similarity from an existing (chunk_embeddings, document_embedding) pair. Returns (score, document_embedding)."""
+    chunk_embeddings, document_embedding = encoding
+    if chunk_embeddings is None or target_embedding is None: return 0.0, None
+    return pool_chunk_scores(chunk_embeddings @ np.asarray(target_embedding, dtype=np.float32)), document_embedding
+
+def calculate_semantic_similarity(text1, text2, return_embedding=False):
+    """
+    Chunked semantic similarity of text1 (resume) against text2 (JD): every resume chunk is scored
+    against the JD embedding and the chunk scores are pooled (SEMANTIC_POOLING).
+    With return_embedding=True returns (score, text1_document_embedding).
+    """
+    embedding1 = None; score = 0.0
+    if not SENTENCE_TRANSFORMERS_AVAILABLE: logger.warning("ST lib not imported. Skip semantic similarity.")
+    elif not sentence_model: logger.warning("ST model not loaded. Skip semantic similarity.")
+    elif not text1 or not text2: logger.debug("Empty text for semantic similarity.")
+    else:
+        score, embedding1 = semantic_similarity_to_embedding(text1, encode_text(text2))
+    return (score, embedding1) if return_embedding else score
 
 def calculate_skill_match_score(resume_skills, jd_skills):
     if not resume_skills or not jd_skills: logger.debug("Empty skill lists for skill_match_score."); return 0.0
@@ -538,35 +614,188 @@ def calculate_experience_match_score(resume_years, required_years):
     logger.debug(f"Experience Match Score: {score:.4f} (Resume: {resume_years:.2f} vs Required: {required_years})")
     return score
 
+# --- JD Feature Cache ---
+JD_FEATURES_VERSION = 3 # Bump when JD feature extraction changes so cached features are recomputed
+JD_SKILL_SECTION_TYPES = ("requirements", "qualifications", "skills", "experience", "responsibilities")
+
+def compute_jd_features(jd_text):
+    """JD-side features that are identical for every resume of a job (cached on Job.jd_features)."""
+    jd_document = as_document(jd_text)
+    jd_skill_focus_text = get_targeted_text_for_skills(jd_document, JD_SKILL_SECTION_TYPES)
+    # Without skill sections the focus text is the whole JD: reuse its parse instead of a second one
+    skill_source = jd_document if jd_skill_focus_text == jd_document.normalized else jd_skill_focus_text
+    jd_embedding = encode_text(jd_document)
+    return {"version": JD_FEATURES_VERSION,
+            "skills": sorted(extract_skills(skill_source)),
+            "terms": jd_document.terms,
+            "embedding": jd_embedding.tolist() if jd_embedding is not None else None}
+
+def jd_features_are_current(jd_features):
+    return bool(jd_features) and jd_features.get("version") == JD_FEATURES_VERSION and \
+        (jd_features.get("embedding") is not None or not SENTENCE_TRANSFORMERS_AVAILABLE)
+
+RESUME_FEATURES_VERSION = 1 # Bump when resume feature extraction changes so cached document features are recomputed
+
+def compute_resume_features(resume_text):
+    """Resume-side features that are identical for every job the resume is scored against (cached on its CandidateDocument)."""
+    resume_document = as_document(resume_text)
+    return {"version": RESUME_FEATURES_VERSION,
+            "skills": sorted(extract_skills(resume_document)),
+            "keyword_skills": sorted(extract_skills(resume_document, use_ner=False)),
+            "years": float(extract_years_experience(resume_document) or 0),
+            "terms": resume_document.terms}
+
+def resume_features_are_current(resume_features):
+    return bool(resume_features) and resume_features.get("version") == RESUME_FEATURES_VERSION
+
+def encoder_signature():
+    """Identifies the encoder output cached on a document: a different model, backend or chunking means re-encoding."""
+    return f"{SENTENCE_MODEL_PATH}|{ENCODER_BACKEND}|{SEMANTIC_CHUNK_TOKENS}|{SEMANTIC_MAX_CHUNKS}"
+
+# --- Stage-1 (Cascade Prefilter) Score ---
+def calculate_stage1_relevance(resume_text, jd_features, idf_table=None, resume_features=None):
+    """
+    Cheap relevance used to decide which resumes get the full scoring: keyword skill match (no NER) and, with a
+    corpus `idf_table`, TF-IDF similarity. With cached `resume_features` (compute_resume_features) the text is not needed.
+    Returns {"stage1_score", "skill_score", "lexical_score"}.
+    """
+    if resume_features is not None:
+        resume_skills, resume_terms = resume_features["keyword_skills"], resume_features["terms"]
+    else:
+        resume_document = as_document(resume_text)
+        resume_skills, resume_terms = extract_skills(resume_document, use_ner=False), resume_document.terms
+    skill_score = calculate_skill_match_score(resume_skills, jd_features.get("skills") or [])
+    if idf_table is None:
+        return {"stage1_score": skill_score, "skill_score": skill_score, "lexical_score": None}
+    lexical_score = lexical_similarity(resume_terms, jd_features.get("terms"), idf_table)
+    stage1_score = W_STAGE1_SKILL * skill_score + W_STAGE1_LEXICAL * lexical_score
+    return {"stage1_score": max(0.0, min(1.0, stage1_score)), "skill_score": skill_score, "lexical_score": lexical_score}
+
 # --- Main Enhanced Scoring Function ---
-def calculate_enhanced_relevance(resume_text, jd_text, required_experience_years=0):
-    results = {"final_score": 0.0, "semantic_score": 0.0, "skill_score": 0.0, "experience_score": 0.0, "error": None}
-    if not resume_text or not jd_text:
+def combine_scores(semantic_score, skill_score, experience_score, lexical_score=None):
+    """The weighted final score, clamped to [0, 1] (the lexical score is blended in with W_LEXICAL when present)."""
+    final_score = W_SEMANTIC * semantic_score + W_SKILL * skill_score + W_EXPERIENCE * experience_score
+    if lexical_score is not None and W_LEXICAL > 0: final_score = (1 - W_LEXICAL) * final_score + W_LEXICAL * lexical_score
+    return max(0.0, min(1.0, final_score))
+
+def score_components(resume_text, jd_features, required_experience_years=0, idf_table=None, resume_features=None):
+    """
+    The non-semantic components (skills, experience, corpus TF-IDF): everything but the encoder call.
+    With cached `resume_features` (compute_resume_features) they are read from those instead of the text.
+    """
+    if resume_features is not None:
+        return _components_from_features(resume_features, jd_features, required_experience_years, idf_table)
+    resume_document = as_document(resume_text)
+    logger.debug("Extracting Skills from Resume..."); resume_skills = extract_skills(resume_document)
+    logger.info(f"RESUME SKILLS Extracted ({len(resume_skills)}): {sorted(list(set(s.lower() for s in resume_skills)))}")
+    jd_skills = jd_features.get("skills") or []
+    logger.info(f"JD SKILLS ({len(jd_skills)} from focused text): {sorted(list(set(s.lower() for s in jd_skills)))}")
+    components = {"skill_score": calculate_skill_match_score(resume_skills, jd_skills), "lexical_score": None}
+    logger.debug("Extracting Experience from Resume..."); resume_years = extract_years_experience(resume_document)
+    components["experience_score"] = calculate_experience_match_score(resume_years, required_experience_years)
+    if idf_table is not None:
+        components["lexical_score"] = lexical_similarity(resume_document.terms, jd_features.get("terms"), idf_table)
+    return components
+
+def _components_from_features(resume_features, jd_features, required_experience_years=0, idf_table=None):
+    components = {"skill_score": calculate_skill_match_score(resume_features["skills"], jd_features.get("skills") or []),
+                  "experience_score": calculate_experience_match_score(resume_features["years"], required_experience_years),
+                  "lexical_score": None}
+    if idf_table is not None:
+        components["lexical_score"] = lexical_similarity(resume_features["terms"], jd_features.get("terms"), idf_table)
+    return components
+
+def score_upper_bound(components):
+    """The best final score still reachable from `components` (score_components): the one with a perfect semantic score."""
+    return combine_scores(1.0, components["skill_score"], components["experience_score"], components.get("lexical_score"))
+
+def calculate_enhanced_relevance(resume_text, jd_text, required_experience_years=0, jd_features=None, resume_encoding=None,
+                                 idf_table=None, score_threshold=None, components=None):
+    """
+    Weighted relevance of a resume to a JD. Pass cached `jd_features` (compute_jd_features) to skip all JD-side work,
+    and a precomputed `resume_encoding` (encode_documents) to skip the encoder call. `resume_text` may be a Document;
+    either way every scorer below shares one, so each text transform runs once.
+    With a corpus `idf_table` (lexical.get_idf_table) the TF-IDF similarity is computed too, and blended in with W_LEXICAL.
+    With a `score_threshold` the cheap components (or precomputed `components`) come first, and the semantic step is
+    skipped when even a perfect semantic score could not reach the threshold: the result is then flagged
+    below_threshold, with final_score counting the semantic score as 0 and score_upper_bound the best reachable score.
+    With both `components` and `resume_encoding` (e.g. cached on the resume's document) `resume_text` may be None.
+    """
+    results = {"final_score": 0.0, "semantic_score": 0.0, "skill_score": 0.0, "experience_score": 0.0, "lexical_score": None,
+               "below_threshold": False, "score_upper_bound": None, "resume_embedding": None, "error": None}
+    resume_document = as_document(resume_text) if resume_text is not None else None
+    if (not resume_document and components is None) or not jd_text:
         results["error"] = "Missing resume_text or jd_text"; logger.warning(results["error"]); return results
     try:
-        logger.debug("Calculating Semantic Score..."); results["semantic_score"] = calculate_semantic_similarity(resume_text, jd_text)
-        logger.debug("Extracting Skills from Resume..."); resume_skills = extract_skills(resume_text)
-        logger.info(f"RESUME SKILLS Extracted ({len(resume_skills)}): {sorted(list(set(s.lower() for s in resume_skills)))}")
-        logger.debug("Focusing JD text for skills..."); jd_skill_focus_text = get_targeted_text_for_skills(jd_text, ["requirements", "qualifications", "skills", "experience", "responsibilities", "must have", "needed", "proficient in"])
-        logger.debug("Extracting Skills from Focused JD Text..."); jd_skills = extract_skills(jd_skill_focus_text)
-        logger.info(f"JD SKILLS Extracted ({len(jd_skills)} from focused text): {sorted(list(set(s.lower() for s in jd_skills)))}")
-        results["skill_score"] = calculate_skill_match_score(resume_skills, jd_skills)
-        logger.debug("Extracting Experience from Resume..."); resume_years = extract_years_experience(resume_text)
-        results["experience_score"] = calculate_experience_match_score(resume_years, required_experience_years)
-        final_score = (W_SEMANTIC * results["semantic_score"] + W_SKILL * results["skill_score"] + W_EXPERIENCE * results["experience_score"])
-        results["final_score"] = max(0.0, min(1.0, final_score))
+        if not jd_features_are_current(jd_features):
+            logger.debug("Computing JD features (not cached)..."); jd_features = compute_jd_features(jd_text)
+        results.update(components or score_components(resume_document, jd_features, required_experience_years, idf_table))
+        if score_threshold is not None:
+            results["score_upper_bound"] = score_upper_bound(results)
+            if results["score_upper_bound"] < score_threshold:
+                results["below_threshold"] = True
+                results["final_score"] = combine_scores(0.0, results["skill_score"], results["experience_score"], results["lexical_score"])
+                logger.info(f"Enhanced Relevance: below threshold {score_threshold:.3f} (upper bound {results['score_upper_bound']:.4f}); semantic step skipped.")
+                return results
+        logger.debug("Calculating Semantic Score...")
+        if resume_encoding is not None: results["semantic_score"], results["resume_embedding"] = similarity_from_encoding(resume_encoding, jd_features.get("embedding"))
+        else: results["semantic_score"], results["resume_embedding"] = semantic_similarity_to_embedding(resume_document, jd_features.get("embedding"))
+        results["final_score"] = combine_scores(results["semantic_score"], results["skill_score"], results["experience_score"], results["lexical_score"])
     except Exception as calculation_error:
          logger.error(f"Error during score calculation: {calculation_error}", exc_info=True)
          results["error"] = f"Calculation Error: {type(calculation_error).__name__}: {calculation_error}"; results["final_score"] = 0.0
     logger.info(f"Enhanced Relevance: Final={results['final_score']:.4f} (Sem={results['semantic_score']:.3f}, Skill={results['skill_score']:.3f}, Exp={results['experience_score']:.3f})")
     return results
 
+def calculate_relevance_for_jobs(resume_text, jobs, idf_table=None, resume_features=None, resume_encoding=None):
+    """
+    calculate_enhanced_relevance of one resume against several JDs. The resume side (skills, experience, the encoder
+    call) runs once, and the semantic scores for all JDs come from one (chunks x JDs) matrix multiply.
+    `jobs` is a list of (jd_features, required_years, score_threshold) with current jd_features (compute_jd_features).
+    Cached `resume_features` / `resume_encoding` (encode_document) skip the parse / the encoder call; `resume_text` is
+    only needed for what is not cached. Returns one results dict per job, with the same keys and threshold behaviour
+    as calculate_enhanced_relevance.
+    """
+    resume_document = as_document(resume_text) if resume_text is not None else None
+    resume_features = resume_features or compute_resume_features(resume_document)
+    all_results = []
+    for jd_features, required_years, score_threshold in jobs:
+        results = {"final_score": 0.0, "semantic_score": 0.0, "skill_score": 0.0, "experience_score": 0.0, "lexical_score": None,
+                   "below_threshold": False, "score_upper_bound": None, "resume_embedding": None, "error": None}
+        results.update(_components_from_features(resume_features, jd_features, required_years or 0, idf_table))
+        if score_threshold is not None:
+            results["score_upper_bound"] = score_upper_bound(results)
+            results["below_threshold"] = results["score_upper_bound"] < score_threshold
+        all_results.append(results)
+
+    semantic = [i for i, results in enumerate(all_results) if not results["below_threshold"]]
+    with_embedding = [i for i in semantic if jobs[i][0].get("embedding") is not None]
+    if with_embedding and (resume_encoding is not None or (SENTENCE_TRANSFORMERS_AVAILABLE and sentence_model)):
+        chunk_embeddings, document_embedding = resume_encoding if resume_encoding is not None else encode_document(resume_document)
+        if chunk_embeddings is not None:
+            jd_matrix = np.asarray([jobs[i][0]["embedding"] for i in with_embedding], dtype=np.float32)
+            chunk_scores = chunk_embeddings @ jd_matrix.T # One multiply for every JD
+            for column, i in enumerate(with_embedding):
+                all_results[i]["semantic_score"] = pool_chunk_scores(chunk_scores[:, column])
+                all_results[i]["resume_embedding"] = document_embedding
+    for results in all_results:
+        results["final_score"] = combine_scores(results["semantic_score"], results["skill_score"], results["experience_score"],
+                                                results["lexical_score"])
+    logger.info(f"Relevance against {len(jobs)} job(s): {[round(results['final_score'], 4) for results in all_results]} "
+                f"({len(semantic)} semantic, {len(jobs) - len(semantic)} below threshold)")
+    return all_results
+
 # TF-IDF function
-def calculate_tfidf_cosine_similarity(resume_text, jd_text):
-    logger.debug("Calculating TF-IDF..."); processed_resume = preprocess_text(resume_text); processed_jd = preprocess_text(jd_text)
-    if not processed_resume or not processed_jd: return 0.0
-    try:
-        vectorizer = TfidfVectorizer(); texts = [processed_resume, processed_jd]; tfidf_matrix = vectorizer.fit_transform(texts)
-        if tfidf_matrix.shape[1] == 0: return 0.0
-        cosine_sim = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2]); return max(0.0, min(1.0, float(cosine_sim[0][0])))
-    except Exception as e: logger.error(f"Error in TF-IDF: {e}", exc_info=False); return 0.0
\ No newline at end of file
+def calculate_tfidf_cosine_similarity(resume_text, jd_text, idf_table=None):
+    """
+    TF-IDF cosine of two texts. Pass the corpus `idf_table` (lexical.get_idf_table) for meaningful IDF weights;
+    without one the IDF comes from just these two documents. No vectorizer is fitted either way.
+    """
+    logger.debug("Calculating TF-IDF...")
+    resume_terms = as_document(resume_text).terms; jd_terms = as_document(jd_text).terms
+    if not resume_terms or not jd_terms: return 0.0
+    if idf_table is None:
+        doc_freqs = dict.fromkeys(resume_terms, 1)
+        for term in jd_terms: doc_freqs[term] = doc_freqs.get(term, 0) + 1
+        idf_table = IdfTable(doc_freqs, 2)
+    return lexical_similarity(resume_terms, jd_terms, idf_table)
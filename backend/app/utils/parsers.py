@@ -2,52 +2,332 @@ import PyPDF2
 import docx
 import textract # Needs OS dependencies like antiword, pdftotext
 import os
+import re
+import time
+import hashlib
+import zipfile
+import threading
 import logging
+from xml.etree import ElementTree
 
 # Configure basic logging for this script
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def extract_text_from_pdf(file_path):
-    """Extracts text from a PDF file using PyPDF2."""
-    text = ""
+# Optional native PDF engines (pure CPU, no subprocess). pdfium (C++) runs before PyPDF2; pdfminer is
+# slower than PyPDF2 but copes with more font encodings, so it is the in-process step before textract.
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    pdfium = None
+    PDFIUM_AVAILABLE = False
+
+try:
+    from pdfminer.high_level import extract_text as pdfminer_extract_text
+    PDFMINER_AVAILABLE = True
+except ImportError:
+    pdfminer_extract_text = None
+    PDFMINER_AVAILABLE = False
+
+# Output outside these thresholds is treated as a failed extraction and the next engine is tried:
+# image-only/scanned pages give almost no characters, broken font maps give replacement/control
+# characters or pdfminer "(cid:NN)" placeholders, and lost word breaks ("knowledgein") show up as
+# an excess of very long words (normally 1-3% of words have LONG_WORD_LENGTH+ letters)
+MIN_CHARS_PER_PAGE = 100
+MAX_GARBAGE_RATIO = 0.15
+LONG_WORD_LENGTH = 13
+MAX_LONG_WORD_RATIO = 0.07
+# pdfium: a horizontal gap wider than this fraction of the glyph height is a word break
+PDFIUM_WORD_GAP = 0.15
+_GARBAGE_RE = re.compile(r'[\x00-\x08\x0b\x0e-\x1f\ufffd\ue000-\uf8ff]|\(cid:\d+\)')
+_WORD_RE = re.compile(r'[A-Za-z]+')
+
+
+class ParserStats:
+    """Per-engine call/accept/reject/error counters and latency for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines = {}
+
+    def record(self, engine, outcome, seconds):
+        with self._lock:
+            stats = self._engines.setdefault(engine, {"calls": 0, "accepted": 0, "rejected": 0, "errors": 0, "seconds": 0.0})
+            stats["calls"] += 1
+            stats[outcome] += 1
+            stats["seconds"] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            data = {engine: dict(stats) for engine, stats in self._engines.items()}
+        for stats in data.values():
+            stats["avg_ms"] = round(1000 * stats["seconds"] / stats["calls"], 2) if stats["calls"] else 0.0
+            stats["seconds"] = round(stats["seconds"], 3)
+        return data
+
+    def reset(self):
+        with self._lock:
+            self._engines.clear()
+
+
+parser_stats = ParserStats()
+
+
+def long_word_ratio(text):
+    words = _WORD_RE.findall(text or "")
+    return sum(1 for word in words if len(word) >= LONG_WORD_LENGTH) / len(words) if words else 0.0
+
+def assess_text_quality(text, pages=None):
+    """(chars_per_page, garbage_ratio, long_word_ratio) of extracted text; `pages` defaults to 1."""
+    text = text or ""
+    stripped = len(text.strip())
+    if not stripped:
+        return 0.0, 1.0, 0.0
+    garbage = sum(len(m) for m in _GARBAGE_RE.findall(text))
+    return stripped / max(pages or 1, 1), garbage / len(text), long_word_ratio(text)
+
+def is_acceptable_quality(chars_per_page, garbage_ratio, long_words):
+    return (chars_per_page >= MIN_CHARS_PER_PAGE and garbage_ratio <= MAX_GARBAGE_RATIO
+            and long_words <= MAX_LONG_WORD_RATIO)
+
+
+# --- PDF engines: file_path -> (text, page_count); raise on failure ---
+def _respace_from_charboxes(textpage, text):
+    """
+    Re-inserts the word breaks pdfium drops for PDFs that position words without space glyphs:
+    a gap between neighbouring glyphs on the same line wider than PDFIUM_WORD_GAP x glyph height.
+    """
+    out, prev = [], None
+    for i, ch in enumerate(text):
+        if ch.isspace():
+            out.append(ch)
+            prev = None
+            continue
+        left, bottom, right, top = box = textpage.get_charbox(i)
+        if prev is not None:
+            height = max(top - bottom, prev[3] - prev[1], 1e-6)
+            if left - prev[2] > PDFIUM_WORD_GAP * height and abs(bottom - prev[1]) < height:
+                out.append(' ')
+        out.append(ch)
+        prev = box
+    return "".join(out)
+
+def _pdfium_page_text(textpage):
+    text = textpage.get_text_range()
+    # Glyph boxes are only consulted when the native text has lost its word breaks
+    if long_word_ratio(text) > MAX_LONG_WORD_RATIO and len(text) == textpage.count_chars():
+        text = _respace_from_charboxes(textpage, text)
+    return text.replace('\r\n', '\n')
+
+def _pdf_text_pdfium(file_path):
+    pdf = pdfium.PdfDocument(file_path)
     try:
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            # logger.info(f"Reading PDF: {os.path.basename(file_path)}, Pages: {len(reader.pages)}")
-            for i, page in enumerate(reader.pages):
-                try:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                except Exception as page_err:
-                    logger.debug(f"Debug: Error extracting text from page {i+1} of {os.path.basename(file_path)}: {page_err}") # Use debug for less noise
-            # logger.info(f"Finished reading PDF: {os.path.basename(file_path)}. Text length: {len(text)}")
-        return text.strip() if text else None
-    except FileNotFoundError:
+        parts = []
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                parts.append(_pdfium_page_text(textpage))
+            finally:
+                textpage.close()
+                page.close()
+        return "\n".join(parts), len(pdf)
+    finally:
+        pdf.close()
+
+def _pdf_text_pdfminer(file_path):
+    text = pdfminer_extract_text(file_path)
+    # pdfminer ends every page with a form feed
+    return text, max(text.count('\x0c'), 1)
+
+def _pdf_text_pypdf2(file_path):
+    text = ""
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        for i, page in enumerate(reader.pages):
+            try:
+                page_text = page.extract_text()
+                if page_text:
+                    text += page_text + "\n"
+            except Exception as page_err:
+                logger.debug(f"Debug: Error extracting text from page {i+1} of {os.path.basename(file_path)}: {page_err}") # Use debug for less noise
+        return text, len(reader.pages)
+
+def _pdf_text_textract(file_path):
+    # Shells out to pdftotext; last resort. Page count unknown, so quality is judged per document.
+    return extract_text_using_textract(file_path) or "", None
+
+
+PDF_ENGINE_REGISTRY = {
+    'pdfium': _pdf_text_pdfium,
+    'pypdf2': _pdf_text_pypdf2,
+    'pdfminer': _pdf_text_pdfminer,
+    'textract': _pdf_text_textract,
+}
+# Default fallback order (cheapest first, subprocess last); unavailable optional engines are left out
+PDF_ENGINES = tuple(name for name, available in (('pdfium', PDFIUM_AVAILABLE), ('pypdf2', True),
+                                                 ('pdfminer', PDFMINER_AVAILABLE), ('textract', True)) if available)
+
+
+def _extract_pdf(file_path, engines=None):
+    """
+    Tries `engines` (default PDF_ENGINES) in order until one returns text that passes the quality
+    checks (is_acceptable_quality). If none does, the best non-empty result is returned rather
+    than nothing. Each attempt is counted in parser_stats. Returns (text, engine, pages); text is
+    None if nothing was extracted.
+    """
+    if not os.path.exists(file_path):
         logger.error(f"PDF file not found: {file_path}")
-        return None
-    except PyPDF2.errors.PdfReadError as e:
-         logger.warning(f"PyPDF2 could not read PDF {os.path.basename(file_path)} (possibly encrypted or corrupted): {e}")
-         return None # Indicate failure to read
-    except Exception as e:
-        logger.error(f"Unexpected error reading PDF {file_path}: {e}", exc_info=False) # Keep log clean unless debugging
-        return None
+        return None, None, None
+    best = None # (chars_per_page, text, engine, pages) of the best rejected attempt
+    for engine in engines or PDF_ENGINES:
+        start = time.perf_counter()
+        try:
+            text, pages = PDF_ENGINE_REGISTRY[engine](file_path)
+        except Exception as e:
+            parser_stats.record(engine, "errors", time.perf_counter() - start)
+            logger.warning(f"PDF engine '{engine}' failed on {os.path.basename(file_path)} (possibly encrypted or corrupted): {e}")
+            continue
+        chars_per_page, garbage_ratio, long_words = assess_text_quality(text, pages)
+        if is_acceptable_quality(chars_per_page, garbage_ratio, long_words):
+            parser_stats.record(engine, "accepted", time.perf_counter() - start)
+            return text.strip(), engine, pages
+        parser_stats.record(engine, "rejected", time.perf_counter() - start)
+        logger.debug(f"PDF engine '{engine}' output rejected for {os.path.basename(file_path)}: {chars_per_page:.0f} "
+                     f"chars/page, garbage ratio {garbage_ratio:.2f}, long-word ratio {long_words:.2f}")
+        if text and text.strip() and garbage_ratio <= MAX_GARBAGE_RATIO and (best is None or chars_per_page > best[0]):
+            best = (chars_per_page, text.strip(), engine, pages)
+    return best[1:] if best else (None, None, None)
 
-def extract_text_from_docx(file_path):
-    """Extracts text from a DOCX file using python-docx."""
-    try:
-        doc = docx.Document(file_path)
-        full_text = [para.text for para in doc.paragraphs]
-        # logger.info(f"Reading DOCX: {os.path.basename(file_path)}. Paragraphs: {len(full_text)}")
-        text = "\n".join(full_text)
-        return text.strip() if text else None
-    except FileNotFoundError:
+def extract_text_from_pdf(file_path, engines=None):
+    """Extracts text from a PDF through the engine fallback chain (see _extract_pdf)."""
+    return _extract_pdf(file_path, engines)[0]
+
+# --- DOCX: stream WordprocessingML straight out of the zip ---
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+_DOCX_HEADER_RE = re.compile(r'word/header\d*\.xml$')
+_DOCX_FOOTER_RE = re.compile(r'word/footer\d*\.xml$')
+DOCX_CELL_SEPARATOR = " | "
+
+
+def _docx_part_lines(stream):
+    """
+    Yields the text lines of one WordprocessingML part (document, header or footer) from an
+    iterparse stream: a line per paragraph and a line per table row (cells joined by
+    DOCX_CELL_SEPARATOR). Text-box paragraphs come out as their own lines. Finished top-level
+    elements are cleared as the parse goes, so memory stays flat however long the document is.
+    """
+    paragraphs = [] # Open paragraphs' run text; text boxes nest paragraphs inside paragraphs
+    rows = [] # Open table rows' cells (tables can nest)
+    cells = [] # Open cells' lines
+    fallback_depth = 0 # Inside mc:Fallback, a legacy duplicate of the mc:Choice content
+    depth, container = 0, None
+    for event, elem in ElementTree.iterparse(stream, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            depth += 1
+            if depth == 2:
+                container = elem # w:body / w:hdr / w:ftr
+            if tag == _MC_FALLBACK:
+                fallback_depth += 1
+            elif not fallback_depth:
+                if tag == _W + 'p':
+                    paragraphs.append([])
+                elif tag == _W + 'tr':
+                    rows.append([])
+                elif tag == _W + 'tc':
+                    cells.append([])
+            continue
+
+        depth -= 1
+        if tag == _MC_FALLBACK:
+            fallback_depth -= 1
+        elif fallback_depth:
+            pass
+        elif tag == _W + 't':
+            if paragraphs and elem.text:
+                paragraphs[-1].append(elem.text)
+        elif tag in (_W + 'tab', _W + 'ptab'):
+            if paragraphs:
+                paragraphs[-1].append("\t")
+        elif tag in (_W + 'br', _W + 'cr'):
+            if paragraphs:
+                paragraphs[-1].append("\n")
+        elif tag == _W + 'p':
+            line = "".join(paragraphs.pop()).strip()
+            if line:
+                if cells:
+                    cells[-1].append(line)
+                else:
+                    yield line
+        elif tag == _W + 'tc':
+            cell = " ".join(cells.pop())
+            if rows:
+                rows[-1].append(cell)
+        elif tag == _W + 'tr':
+            line = DOCX_CELL_SEPARATOR.join(cell for cell in rows.pop() if cell)
+            if line:
+                if cells:
+                    cells[-1].append(line) # Row of a nested table: part of the outer cell
+                else:
+                    yield line
+        if depth == 2 and container is not None:
+            container.clear() # Drop the finished top-level paragraph/table
+
+def _docx_text_stream(file_path):
+    """Headers, body, then footers of a DOCX, read part by part from the zip without python-docx."""
+    with zipfile.ZipFile(file_path) as archive:
+        names = archive.namelist()
+        parts = ([n for n in sorted(names) if _DOCX_HEADER_RE.match(n)] + ['word/document.xml']
+                 + [n for n in sorted(names) if _DOCX_FOOTER_RE.match(n)])
+        lines = []
+        seen_edge_lines = set() # Headers/footers repeat per section; keep each line once
+        for name in parts:
+            is_edge = name != 'word/document.xml'
+            with archive.open(name) as stream:
+                for line in _docx_part_lines(stream):
+                    if is_edge:
+                        if line in seen_edge_lines:
+                            continue
+                        seen_edge_lines.add(line)
+                    lines.append(line)
+    return "\n".join(lines)
+
+def _docx_text_python_docx(file_path):
+    doc = docx.Document(file_path)
+    full_text = [para.text for para in doc.paragraphs]
+    for table in doc.tables:
+        for row in table.rows:
+            full_text.append(DOCX_CELL_SEPARATOR.join(cell.text for cell in row.cells if cell.text))
+    return "\n".join(full_text)
+
+def _extract_docx(file_path):
+    """(text, engine) of a DOCX; see extract_text_from_docx. text is None if nothing was extracted."""
+    if not os.path.exists(file_path):
         logger.error(f"DOCX file not found: {file_path}")
-        return None
-    except Exception as e:
-        logger.error(f"Error reading DOCX {file_path}: {e}", exc_info=False)
-        return None
+        return None, None
+    for engine, extract in (('docx-stream', _docx_text_stream), ('python-docx', _docx_text_python_docx)):
+        start = time.perf_counter()
+        try:
+            text = extract(file_path)
+        except Exception as e:
+            parser_stats.record(engine, "errors", time.perf_counter() - start)
+            logger.warning(f"DOCX engine '{engine}' failed on {os.path.basename(file_path)}: {e}")
+            continue
+        text = text.strip() if text else ""
+        parser_stats.record(engine, "accepted" if text else "rejected", time.perf_counter() - start)
+        if text:
+            return text, engine
+    return None, None
+
+def extract_text_from_docx(file_path):
+    """
+    Extracts text from a DOCX file (paragraphs, tables, text boxes, headers and footers) by
+    streaming its XML parts; python-docx is the fallback for files the streaming reader rejects.
+    """
+    return _extract_docx(file_path)[0]
 
 def extract_text_using_textract(file_path):
     """Extracts text using the textract library as a fallback."""
@@ -69,14 +349,17 @@ def extract_text_using_textract(file_path):
         return None
 
 
-def extract_text_from_file(file_path):
+def extract_document(file_path):
     """
     Extracts text from PDF or DOCX using specific libraries,
-    with textract as an optional fallback.
+    with textract as an optional fallback (PDFs already end their engine chain with it).
+    Returns {"text", "engine", "pages"}; text is None when nothing could be extracted and pages
+    is only known for PDFs.
     """
+    result = {"text": None, "engine": None, "pages": None}
     if not os.path.exists(file_path):
         logger.error(f"File does not exist at path: {file_path}")
-        return None
+        return result
 
     _, extension = os.path.splitext(file_path.lower())
     text = None
@@ -84,13 +367,14 @@ def extract_text_from_file(file_path):
     # logger.debug(f"Attempting to extract text from: {os.path.basename(file_path)} (type: {extension})")
 
     if extension == '.pdf':
-        text = extract_text_from_pdf(file_path)
+        text, result["engine"], result["pages"] = _extract_pdf(file_path)
     elif extension == '.docx':
-        text = extract_text_from_docx(file_path)
+        text, result["engine"] = _extract_docx(file_path)
     elif extension == '.txt': # Handle plain text files
          try:
              with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                  text = f.read()
+             result["engine"] = 'txt'
              # logger.info(f"Read TXT file: {os.path.basename(file_path)}")
          except Exception as e:
              logger.error(f"Error reading TXT file {file_path}: {e}", exc_info=False)
@@ -100,9 +384,12 @@ def extract_text_from_file(file_path):
         text = None # Ensure textract is tried below
 
     # Optional: Use textract as a primary method or fallback
-    if text is None:
+    if text is None and extension != '.pdf':
         # logger.info(f"Specific parser failed or unsupported type for {os.path.basename(file_path)}. Falling back to textract.")
+        start = time.perf_counter()
         text = extract_text_using_textract(file_path)
+        parser_stats.record('textract', "accepted" if text else "errors", time.perf_counter() - start)
+        result["engine"] = 'textract' if text else None
 
     if text:
         # logger.info(f"Successfully extracted text (length: {len(text)}) from {os.path.basename(file_path)}")
@@ -110,7 +397,12 @@ def extract_text_from_file(file_path):
     else:
          logger.warning(f"Could not extract text from {os.path.basename(file_path)} using available methods.")
 
-    return text
+    result["text"] = text or None
+    return result
+
+def extract_text_from_file(file_path):
+    """Extracted text of a PDF/DOCX/TXT file, or None (see extract_document)."""
+    return extract_document(file_path)["text"]
 
 def read_job_description(file_path):
     """Reads job description from a text file."""
@@ -124,6 +416,14 @@ def read_job_description(file_path):
         logger.error(f"Error reading job description {file_path}: {e}")
         return None
 
+def compute_file_hash(file_path, chunk_size=1024 * 1024):
+    """SHA-256 hex digest of a file's bytes (the resume dedupe/content key)."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 # Example function if JDs are in a CSV
 # import pandas as pd
 # def read_jd_from_csv(csv_path, row_index, column_name='description'):
@@ -0,0 +1,113 @@
+# backend/app/utils/sections.py
+
+import re
+from collections import namedtuple
+
+# One section of a resume or JD: `kind` is a section type below or 'preamble' (text before the
+# first header); `title` is the header line and lines[start:end] the body (header excluded)
+Section = namedtuple('Section', ['kind', 'title', 'start', 'end'])
+
+# Header phrase (lowercase) -> section type. Resume and JD headers share one table.
+SECTION_HEADERS = {
+    'experience': ["experience", "experiences", "work experience", "relevant experience", "professional experience",
+                   "employment", "employment history", "work history", "career history", "positions held",
+                   "work experience & projects", "work experience and projects", "internships"],
+    'education': ["education", "academic background", "academics", "degrees", "academic qualifications"],
+    'skills': ["skills", "technical skills", "key skills", "core skills", "core competencies", "technologies",
+               "tech stack", "tools", "required skills", "skills and abilities"],
+    'certifications': ["certifications", "certificates", "licenses", "licenses & certifications"],
+    'projects': ["projects", "personal projects", "academic projects", "opensource contributions",
+                 "open source contributions"],
+    'achievements': ["achievements", "awards", "honors", "accomplishments"],
+    'publications': ["publications", "popular blogs"],
+    'summary': ["summary", "objective", "profile", "professional summary", "career objective", "about me"],
+    'contact': ["contact", "personal details", "contact information", "coding profiles"],
+    'languages': ["languages"],
+    'references': ["references"],
+    'interests': ["interests", "hobbies", "volunteering"],
+    # JD sections
+    'requirements': ["requirements", "must have", "must haves", "needed", "proficient in", "what you bring",
+                     "what we are looking for", "what we're looking for"],
+    'qualifications': ["qualifications", "required qualifications", "preferred qualifications",
+                       "minimum qualifications", "basic qualifications", "nice to have", "bonus points"],
+    'responsibilities': ["responsibilities", "key responsibilities", "duties", "what you will do", "what you'll do",
+                         "the role"],
+    'benefits': ["benefits", "perks", "what we offer", "compensation"],
+}
+HEADER_TYPES = {phrase: kind for kind, phrases in SECTION_HEADERS.items() for phrase in phrases}
+_MAX_PHRASE_WORDS = max(len(phrase.split()) for phrase in HEADER_TYPES)
+
+# Lines longer than this are body text, never headers (keeps the per-line work constant)
+HEADER_MAX_CHARS = 60
+HEADER_MAX_WORDS = 6
+_EDGE_RE = re.compile(r"^[\s\-\u2022*#>\d.)]+|[\s:\-\u2022*#.]+$") # Bullets/numbering before, ':'/'-' after
+_DIGIT_RE = re.compile(r"\d")
+# Words a header line may add to a known phrase without a ':' ("Relevant Work Experience", "Technical Skills Summary")
+HEADER_QUALIFIERS = {"relevant", "professional", "technical", "additional", "other", "selected", "recent", "key",
+                     "core", "summary", "overview", "of", "and", "&", "my"}
+# Words that mark a line as body text even when it contains a header phrase ("Five years experience",
+# "Managed projects", "Must have strong skills")
+BODY_WORDS = {"years", "year", "yrs", "have", "has", "had", "with", "using", "used", "including", "strong", "excellent",
+              "good", "need", "needs", "require", "requires", "managed", "led", "developed", "built", "designed",
+              "implemented", "created", "worked", "gained", "is", "are", "was", "were", "will"}
+_MINOR_WORDS = {"of", "and", "&", "in", "for", "the", "a", "to"}
+
+
+def header_type(line):
+    """
+    Section type of a header line, or None for body text. A line is a header when it is a known
+    phrase (case-insensitive, ignoring bullets and a trailing ':'), or contains one as whole words
+    that make up more than half of the line AND is shaped like a header (_looks_like_header):
+    "Relevant Work Experience:", "Technical Skills Summary" are headers; "5 years experience" and
+    "Java Skills" are body text.
+    Constant work per line: only short lines are considered and only their word n-grams looked up.
+    """
+    stripped = line.strip()
+    if not stripped or len(stripped) > HEADER_MAX_CHARS:
+        return None
+    key = " ".join(_EDGE_RE.sub("", stripped.lower()).split())
+    if key in HEADER_TYPES:
+        return HEADER_TYPES[key]
+    words = key.split()
+    if not words or len(words) > HEADER_MAX_WORDS:
+        return None
+    # Longest phrase first, so "work experience & projects" beats "projects"
+    for size in range(min(len(words), _MAX_PHRASE_WORDS), 0, -1):
+        for i in range(len(words) - size + 1):
+            phrase = " ".join(words[i:i + size])
+            if phrase in HEADER_TYPES and len(phrase) / len(stripped) > 0.5:
+                extra = words[:i] + words[i + size:]
+                return HEADER_TYPES[phrase] if _looks_like_header(stripped, key, extra) else None
+    return None
+
+def _looks_like_header(stripped, key, extra_words):
+    """
+    Header shape for a line that only contains a header phrase: no digits or body-text words, and a
+    trailing ':', ALL CAPS, or Title Case with nothing but qualifiers added to the phrase.
+    """
+    if _DIGIT_RE.search(key) or any(word in BODY_WORDS for word in extra_words):
+        return False
+    if stripped.endswith(':'):
+        return True
+    letters = [c for c in stripped if c.isalpha()]
+    if letters and all(c.isupper() for c in letters):
+        return True
+    title_case = all(word[:1].isupper() for word in stripped.split() if word.lower() not in _MINOR_WORDS and word[:1].isalpha())
+    return title_case and all(word in HEADER_QUALIFIERS for word in extra_words)
+
+
+def segment_sections(lines):
+    """
+    Splits a document's lines into typed Section spans in one pass. Each header opens a section
+    that runs to the next header; text before the first header is the 'preamble' (omitted if empty).
+    """
+    spans = []
+    kind, title, start = 'preamble', None, 0
+    for i, line in enumerate(lines):
+        header = header_type(line)
+        if header is None:
+            continue
+        spans.append(Section(kind, title, start, i))
+        kind, title, start = header, line.strip(), i + 1
+    spans.append(Section(kind, title, start, len(lines)))
+    return [span for span in spans if span.kind != 'preamble' or span.end > span.start]
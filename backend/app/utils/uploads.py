@@ -0,0 +1,53 @@
+# backend/app/utils/uploads.py
+
+import os
+import hashlib
+import tempfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """An uploaded file exceeded the per-file size limit (MAX_RESUME_FILE_BYTES)."""
+    def __init__(self, limit, size=None):
+        self.limit = limit
+        self.size = size
+        readable = f"{limit / (1024 * 1024):g} MB" if limit >= 1024 * 1024 else f"{limit} bytes"
+        super().__init__(f"File exceeds the {readable} per-file limit.")
+
+
+def stream_to_file(stream, dest_path, max_bytes=None, chunk_size=UPLOAD_CHUNK_SIZE, declared_length=None):
+    """
+    Copies `stream` to `dest_path` in fixed-size chunks, hashing as it goes.
+    The data lands in a hidden temp file in the destination directory and is moved into place with
+    os.replace, so readers (the worker) never see a partial file. A file over `max_bytes` is
+    rejected as soon as its declared length or the bytes copied so far exceed the limit, and the
+    temp file is removed. Returns (size_in_bytes, sha256_hexdigest).
+    """
+    if max_bytes and declared_length and declared_length > max_bytes:
+        raise UploadTooLargeError(max_bytes, declared_length)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(prefix='.upload-', dir=os.path.dirname(dest_path))
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLargeError(max_bytes, size)
+                digest.update(chunk)
+                out.write(chunk)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return size, digest.hexdigest()
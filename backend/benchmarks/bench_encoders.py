@@ -0,0 +1,66 @@
+# backend/benchmarks/bench_encoders.py
+"""
+Sentence encoder backend benchmark: throughput and accuracy vs. the fp32 torch reference.
+
+Corpus: data/job_descriptions/sample_jd.txt + the chunked text of every file in data/resumes.
+Run from backend/:  python -m benchmarks.bench_encoders --model-dir /models/all-MiniLM-L6-v2
+"""
+
+import os
+import glob
+import argparse
+import logging
+
+from app.utils.encoders import ENCODER_BACKENDS, load_sentence_encoder, compare_encoders, measure_throughput
+from app.utils.parsers import extract_text_from_file, read_job_description
+from app.utils.nlp import chunk_text_for_encoding
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+
+def load_corpus(data_dir):
+    jd_text = read_job_description(os.path.join(data_dir, 'job_descriptions', 'sample_jd.txt')) or ""
+    chunks = []
+    for path in sorted(glob.glob(os.path.join(data_dir, 'resumes', '*'))):
+        text = extract_text_from_file(path)
+        if text:
+            chunks.extend(chunk_text_for_encoding(text, max_tokens=200))
+    return chunk_text_for_encoding(jd_text, max_tokens=200), chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-dir', default=os.environ.get('SENTENCE_MODEL_PATH', 'all-MiniLM-L6-v2'))
+    parser.add_argument('--backends', default=",".join(ENCODER_BACKENDS))
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--tolerance', type=float, default=0.02, help="Max allowed |cosine - reference cosine|.")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    queries, documents = load_corpus(args.data_dir)
+    print(f"Corpus: {len(queries)} JD chunk(s), {len(documents)} resume chunk(s)")
+    reference = load_sentence_encoder('torch', args.model_dir)
+    if reference is None:
+        raise SystemExit("Reference torch encoder could not be loaded.")
+
+    print(f"{'backend':<12}{'texts/s':>10}{'speedup':>10}{'max|Δcos|':>12}{'ok':>6}")
+    baseline = None
+    failed = False
+    for backend in [b.strip() for b in args.backends.split(',') if b.strip()]:
+        encoder = reference if backend == 'torch' else load_sentence_encoder(backend, args.model_dir)
+        if encoder is None:
+            print(f"{backend:<12}{'unavailable':>10}")
+            continue
+        throughput = measure_throughput(encoder, documents, batch_size=args.batch_size)
+        baseline = baseline or throughput
+        accuracy = compare_encoders(reference, encoder, queries, documents, tolerance=args.tolerance, batch_size=args.batch_size)
+        failed = failed or not accuracy["within_tolerance"]
+        print(f"{backend:<12}{throughput:>10.1f}{throughput / baseline:>9.2f}x{accuracy['max_abs_diff']:>12.4f}"
+              f"{'yes' if accuracy['within_tolerance'] else 'NO':>6}")
+    if failed:
+        raise SystemExit(f"At least one backend deviates from the torch reference by more than {args.tolerance}.")
+
+
+if __name__ == '__main__':
+    main()
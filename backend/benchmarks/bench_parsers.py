@@ -0,0 +1,130 @@
+# backend/benchmarks/bench_parsers.py
+"""
+Text extraction benchmark.
+PDF: per-engine throughput and output quality, plus the default fallback chain (what
+process_resume uses) against the old PyPDF2 -> textract path.
+DOCX: the streaming document.xml reader against python-docx.
+
+Corpus: every PDF/DOCX in data/resumes; without DOCX files a synthetic resume (--docx-paragraphs
+paragraphs plus a skills table) is generated. Run from backend/:  python -m benchmarks.bench_parsers
+"""
+
+import os
+import glob
+import time
+import tempfile
+import argparse
+import logging
+import docx
+
+from app.utils.parsers import (PDF_ENGINES, PDF_ENGINE_REGISTRY, MIN_CHARS_PER_PAGE, MAX_GARBAGE_RATIO, MAX_LONG_WORD_RATIO,
+                               assess_text_quality, is_acceptable_quality, extract_text_from_pdf, parser_stats,
+                               _docx_text_stream, _docx_text_python_docx)
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+
+def time_engine(engine, paths, repeat):
+    """Best-of-`repeat` wall time for one pass over `paths`, and the per-file outputs of the last pass."""
+    best, outputs = float('inf'), []
+    for _ in range(repeat):
+        outputs = []
+        start = time.perf_counter()
+        for path in paths:
+            try:
+                outputs.append(PDF_ENGINE_REGISTRY[engine](path))
+            except Exception:
+                outputs.append(("", None))
+        best = min(best, time.perf_counter() - start)
+    return best, outputs
+
+def time_chain(engines, paths, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            extract_text_from_pdf(path, engines=engines)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def time_docx(extract, paths, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            extract(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def synthetic_docx(directory, paragraphs):
+    document = docx.Document()
+    for i in range(paragraphs):
+        document.add_paragraph(f"Software Engineer at Company {i}: built Python/Flask services, SQL reporting and CI pipelines.")
+    table = document.add_table(rows=10, cols=2)
+    for i, row in enumerate(table.rows):
+        row.cells[0].text, row.cells[1].text = f"Skill group {i}", "Python, Docker, Kubernetes, AWS"
+    path = os.path.join(directory, 'synthetic_resume.docx')
+    document.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', default=",".join(PDF_ENGINES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--docx-paragraphs', type=int, default=60)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.CRITICAL) # textract failures are reported in the table
+
+    paths = sorted(glob.glob(os.path.join(args.data_dir, 'resumes', '*.pdf')))
+    if not paths:
+        raise SystemExit(f"No PDFs found under {os.path.join(args.data_dir, 'resumes')}")
+    docx_paths = sorted(glob.glob(os.path.join(args.data_dir, 'resumes', '*.docx')))
+    print(f"Corpus: {len(paths)} PDF(s); available engines: {', '.join(PDF_ENGINES)}")
+    print(f"Quality gate: >= {MIN_CHARS_PER_PAGE} chars/page, <= {MAX_GARBAGE_RATIO:.0%} garbage, "
+          f"<= {MAX_LONG_WORD_RATIO:.0%} long (merged) words\n")
+
+    rows = {}
+    for engine in [e.strip() for e in args.engines.split(',') if e.strip()]:
+        if engine in PDF_ENGINES:
+            seconds, outputs = time_engine(engine, paths, args.repeat)
+            rows[engine] = (len(paths) / seconds, [assess_text_quality(text, pages) for text, pages in outputs])
+        else:
+            rows[engine] = None
+    baseline = rows.get('pypdf2')[0] if rows.get('pypdf2') else None
+
+    print(f"{'engine':<12}{'files/s':>10}{'vs pypdf2':>10}{'chars/page':>12}{'garbage':>10}{'long':>8}{'accepted':>10}")
+    for engine, row in rows.items():
+        if row is None:
+            print(f"{engine:<12}{'unavailable':>10}")
+            continue
+        throughput, quality = row
+        accepted = sum(1 for q in quality if is_acceptable_quality(*q))
+        speedup = f"{throughput / baseline:>9.2f}x" if baseline else f"{'-':>10}"
+        print(f"{engine:<12}{throughput:>10.1f}{speedup}{sum(q[0] for q in quality) / len(quality):>12.0f}"
+              f"{max(q[1] for q in quality):>10.3f}{max(q[2] for q in quality):>8.3f}{accepted:>7}/{len(paths)}")
+
+    legacy = [e for e in ('pypdf2', 'textract') if e in PDF_ENGINES]
+    parser_stats.reset()
+    chain_seconds = time_chain(None, paths, args.repeat)
+    chain_stats = parser_stats.snapshot()
+    legacy_seconds = time_chain(legacy, paths, args.repeat)
+    print(f"\nFallback chain {' -> '.join(PDF_ENGINES)}: {len(paths) / chain_seconds:.1f} files/s "
+          f"({legacy_seconds / chain_seconds:.2f}x vs {' -> '.join(legacy)})")
+    for engine, stats in chain_stats.items():
+        print(f"  {engine:<10} calls={stats['calls']} accepted={stats['accepted']} rejected={stats['rejected']} "
+              f"errors={stats['errors']} avg={stats['avg_ms']}ms")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if not docx_paths:
+            docx_paths = [synthetic_docx(tmp_dir, args.docx_paragraphs)]
+        stream_seconds = time_docx(_docx_text_stream, docx_paths, args.repeat * 5)
+        python_docx_seconds = time_docx(_docx_text_python_docx, docx_paths, args.repeat * 5)
+    print(f"\nDOCX ({len(docx_paths)} file(s)): streaming {1000 * stream_seconds / len(docx_paths):.2f} ms/file, "
+          f"python-docx {1000 * python_docx_seconds / len(docx_paths):.2f} ms/file "
+          f"({python_docx_seconds / stream_seconds:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
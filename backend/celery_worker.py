@@ -1,7 +1,46 @@
 import os
+os.environ.setdefault('PROCESS_ROLE', 'worker') # Worker-sized DB pool (read by config.py)
+# Size torch/BLAS thread pools and Celery concurrency from WORKER_CPUS BEFORE numpy/torch get imported
+from app.utils.cpu_tuning import configure_worker_runtime, apply_torch_threads
+worker_plan = configure_worker_runtime()
+if worker_plan["pool"] in ('gevent', 'eventlet'):
+    from app.db_pool import patch_psycopg2_for_gevent
+    patch_psycopg2_for_gevent()
+
+from celery.signals import worker_process_init, worker_shutdown, celeryd_after_setup
 from app import create_app, celery # Import factory and celery instance
+from app.result_writer import shutdown_result_writer
+from app.scheduling import expand_worker_queues
+from app.utils.parsers import parser_stats
+import logging
 
 # Create a Flask app instance using the factory based on FLASK_ENV
 # This ensures Celery tasks have access to the app context and config
 config_name = os.getenv('FLASK_ENV') or 'default'
-app = create_app(config_name=config_name)
\ No newline at end of file
+app = create_app(config_name=config_name)
+
+# Explicit -c on the command line still wins over this default
+celery.conf.worker_concurrency = worker_plan["concurrency"]
+apply_torch_threads(worker_plan)
+
+@worker_process_init.connect
+def _apply_thread_limits_in_child(**kwargs):
+    """Prefork children re-apply the per-process torch thread limit after fork."""
+    apply_torch_threads(worker_plan)
+
+@celeryd_after_setup.connect
+def _select_worker_queues(sender, instance, **kwargs):
+    """WORKER_QUEUES (e.g. 'bulk' = every bulk.<n> shard) replaces -Q, derived from BULK_QUEUE_SHARDS."""
+    spec = os.environ.get('WORKER_QUEUES')
+    if spec:
+        names = expand_worker_queues(spec, app.config.get('BULK_QUEUE_SHARDS', 16))
+        instance.app.amqp.queues.select(names)
+        logging.getLogger(__name__).info(f"Consuming from queues: {', '.join(names)}")
+
+# Flush any buffered results before the worker exits (tasks waiting on them are acked only after this)
+worker_shutdown.connect(shutdown_result_writer, weak=False)
+
+@worker_shutdown.connect
+def _log_parser_stats(**kwargs):
+    """Per-engine extraction counters/latency for this worker's lifetime (see utils.parsers.ParserStats)."""
+    logging.getLogger(__name__).info(f"Parser engine stats: {parser_stats.snapshot()}")
@@ -5,6 +5,43 @@ from dotenv import load_dotenv
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, '.env'))
 
+# --- Database Engine Options per Process Role ---
+# PROCESS_ROLE is 'web' (gunicorn/flask run), 'worker' (celery_worker.py sets it) or
+# 'migrate' (run.py sets it for `flask db ...`). Every value can be overridden with DB_* env vars.
+ROLE_POOL_DEFAULTS = {
+    # role:     pool_size, max_overflow, pool_timeout(s), statement_timeout(ms)
+    'web':     (5, 10, 10, 15000),
+    # None: WORKER_DB_CONNECTIONS, derived from the worker's pool type and concurrency by celery_worker.py
+    # (one connection per task slot in the process, see utils/cpu_tuning.py), so no greenlet waits on the pool
+    'worker':  (None, 0, 30, 120000),
+    'migrate': (1, 0, 30, 0),         # 0 = no statement timeout for long DDL
+}
+
+def engine_options_for_role(role, database_uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for a process role (pool sizing, recycle, pre-ping, statement timeout)."""
+    pool_size, max_overflow, pool_timeout, statement_timeout = ROLE_POOL_DEFAULTS.get(role, ROLE_POOL_DEFAULTS['web'])
+    if pool_size is None:
+        pool_size = int(os.environ.get('WORKER_DB_CONNECTIONS', 10))
+    options = {
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)), # Seconds; below typical proxy/LB idle cutoffs
+    }
+    if not database_uri or database_uri.startswith('sqlite'):
+        return options
+    options.update({
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', pool_size)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', max_overflow)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', pool_timeout)),
+    })
+    if role == 'migrate':
+        from sqlalchemy.pool import NullPool # One short-lived process: no pool to keep warm
+        options = {'poolclass': NullPool}
+    if database_uri.startswith('postgres'):
+        statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', statement_timeout))
+        options['connect_args'] = {'application_name': f'resume-screener-{role}',
+                                   'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
 class Config:
     """Base configuration."""
     SECRET_KEY = os.environ.get('SECRET_KEY')
@@ -17,11 +54,68 @@ class Config:
     CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL')
     CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND_URL') # Corrected variable name
 
+    # Connection pool tuned per process type
+    PROCESS_ROLE = os.environ.get('PROCESS_ROLE', 'web')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options_for_role(PROCESS_ROLE, SQLALCHEMY_DATABASE_URI)
+
+    # Task scheduling: uploads of up to INTERACTIVE_MAX_BATCH files go to the 'interactive' queue,
+    # larger ones to 'bulk.<job_id % BULK_QUEUE_SHARDS>' (see app/scheduling.py). Jobs on the same shard share
+    # a FIFO queue, so keep the shard count well above the number of concurrent bulk imports
+    INTERACTIVE_MAX_BATCH = int(os.environ.get('INTERACTIVE_MAX_BATCH', 10))
+    BULK_QUEUE_SHARDS = int(os.environ.get('BULK_QUEUE_SHARDS', 16))
+
     # File Upload Configuration
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(basedir, 'uploads/resumes'))
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+    MAX_RESUME_FILE_BYTES = int(os.environ.get('MAX_RESUME_FILE_BYTES', 10 * 1024 * 1024)) # Per file, checked while streaming
     ALLOWED_EXTENSIONS = {'pdf', 'docx'}
 
+    # Resume file storage (see app/storage.py): 'local' = UPLOAD_FOLDER, 's3' = S3-compatible bucket (needs boto3)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local').lower()
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_PREFIX = os.environ.get('S3_PREFIX', 'resumes/')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL') # e.g. http://minio:9000 for a local MinIO
+    S3_REGION = os.environ.get('S3_REGION')
+    STORAGE_PRESIGN_EXPIRES = int(os.environ.get('STORAGE_PRESIGN_EXPIRES', 300)) # Seconds
+    STORAGE_REDIRECT_DOWNLOADS = os.environ.get('STORAGE_REDIRECT_DOWNLOADS', 'true').lower() in ('1', 'true', 'yes')
+    # Extracted-text artifacts (see app/text_cache.py), stored beside the files and keyed by content hash
+    TEXT_ARTIFACTS_ENABLED = os.environ.get('TEXT_ARTIFACTS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    TEXT_ARTIFACT_CODEC = os.environ.get('TEXT_ARTIFACT_CODEC', 'auto').lower() # 'auto' (zstd if installed), 'zstd' or 'gzip'
+    TEXT_ARTIFACT_MAX_CHARS = int(os.environ.get('TEXT_ARTIFACT_MAX_CHARS', 500_000)) # Longer text is truncated (and flagged)
+
+    # Approximate-nearest-neighbour index over resume embeddings (cross-job candidate search)
+    ANN_INDEX_PATH = os.environ.get('ANN_INDEX_PATH', os.path.join(basedir, 'ann_index/resumes.npz'))
+    ANN_NPROBE = int(os.environ.get('ANN_NPROBE', 8))
+    ANN_SNAPSHOT_SECONDS = int(os.environ.get('ANN_SNAPSHOT_SECONDS', 600)) # Celery beat period of the one snapshot writer (0 = disabled)
+    ANN_SYNC_SECONDS = int(os.environ.get('ANN_SYNC_SECONDS', 60)) # Max staleness vs other processes' inserts/deletes
+
+    # Corpus TF-IDF (see app/lexical.py): seconds a process reuses its loaded IDF table before re-reading lexical_terms
+    LEXICAL_IDF_TTL_SECONDS = int(os.environ.get('LEXICAL_IDF_TTL_SECONDS', 300))
+
+    # POST /api/resumes/<id>/score-jobs: most jobs one request (and one scoring task) may add a resume to
+    SCORE_JOBS_MAX = int(os.environ.get('SCORE_JOBS_MAX', 100))
+
+    # Write-behind buffer for worker results: one UPDATE ... FROM (VALUES ...) per batch instead of one commit per resume.
+    # Only with the gevent/eventlet/threads pools; prefork/solo workers write directly (one task per process)
+    RESULT_WRITER_ENABLED = os.environ.get('RESULT_WRITER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    RESULT_WRITER_MAX_BATCH = int(os.environ.get('RESULT_WRITER_MAX_BATCH', 50))
+    RESULT_WRITER_MAX_WAIT_MS = int(os.environ.get('RESULT_WRITER_MAX_WAIT_MS', 200))
+    RESULT_WRITER_TIMEOUT = int(os.environ.get('RESULT_WRITER_TIMEOUT', 60)) # Seconds a task waits for its flush
+
+    # Retries of process_resume (transient DB/broker errors only): full-jitter exponential backoff
+    TASK_RETRY_BACKOFF_BASE = float(os.environ.get('TASK_RETRY_BACKOFF_BASE', 10)) # Seconds
+    TASK_RETRY_BACKOFF_MAX = float(os.environ.get('TASK_RETRY_BACKOFF_MAX', 600))
+
+    # Leases on PENDING/PROCESSING resumes; the reaper requeues resumes whose lease expired
+    RESUME_PENDING_LEASE_SECONDS = int(os.environ.get('RESUME_PENDING_LEASE_SECONDS', 900))
+    RESUME_PROCESSING_LEASE_SECONDS = int(os.environ.get('RESUME_PROCESSING_LEASE_SECONDS', 900))
+    REAPER_INTERVAL_SECONDS = int(os.environ.get('REAPER_INTERVAL_SECONDS', 300)) # Celery beat period (0 = disabled)
+    REAPER_BATCH_SIZE = int(os.environ.get('REAPER_BATCH_SIZE', 500))
+    REAPER_MAX_BATCHES = int(os.environ.get('REAPER_MAX_BATCHES', 20)) # Per sweep
+    REAPER_MAX_REQUEUES = int(os.environ.get('REAPER_MAX_REQUEUES', 3)) # Then FAILED (poison input)
+    # Expired PENDING leases renewed behind a busy queue before the task is re-sent anyway (lost by the broker)
+    REAPER_MAX_PENDING_RENEWALS = int(os.environ.get('REAPER_MAX_PENDING_RENEWALS', 4))
+
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
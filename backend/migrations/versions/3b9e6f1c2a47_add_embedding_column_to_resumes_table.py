@@ -0,0 +1,26 @@
+"""Add embedding column to resumes table
+
+Revision ID: 3b9e6f1c2a47
+Revises: d0a74cedb9b2
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e6f1c2a47'
+down_revision = 'd0a74cedb9b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('embedding', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.drop_column('embedding')
@@ -0,0 +1,26 @@
+"""Add error_message column to resumes table
+
+Revision ID: 5d08b3f7a9c2
+Revises: e27a9c4b6d13
+Create Date: 2026-10-19 12:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d08b3f7a9c2'
+down_revision = 'e27a9c4b6d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('error_message', sa.String(length=500), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.drop_column('error_message')
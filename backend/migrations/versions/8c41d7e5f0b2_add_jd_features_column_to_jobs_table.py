@@ -0,0 +1,26 @@
+"""Add jd_features column to jobs table
+
+Revision ID: 8c41d7e5f0b2
+Revises: 3b9e6f1c2a47
+Create Date: 2026-10-19 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41d7e5f0b2'
+down_revision = '3b9e6f1c2a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('jd_features', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('jd_features')
@@ -0,0 +1,34 @@
+"""Add lease_expires_at and requeue_count columns to resumes table
+
+Revision ID: 9a6c2e41d8f5
+Revises: 5d08b3f7a9c2
+Create Date: 2026-10-19 12:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a6c2e41d8f5'
+down_revision = '5d08b3f7a9c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('requeue_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index('ix_resumes_status_lease_expires_at', ['status', 'lease_expires_at'], unique=False)
+
+    # Resumes in flight at upgrade time get an already-expired lease: the first sweep requeues them,
+    # and the ownership checks make any run that is still alive discard its result
+    op.execute("UPDATE resumes SET lease_expires_at = CURRENT_TIMESTAMP WHERE status IN ('PENDING', 'PROCESSING')")
+
+
+def downgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.drop_index('ix_resumes_status_lease_expires_at')
+        batch_op.drop_column('requeue_count')
+        batch_op.drop_column('lease_expires_at')
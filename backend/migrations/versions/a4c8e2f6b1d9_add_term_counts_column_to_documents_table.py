@@ -0,0 +1,61 @@
+"""Add term_counts column to documents table (document frequencies count each document once)
+
+Revision ID: a4c8e2f6b1d9
+Revises: f3a9c1d7b5e2
+Create Date: 2026-10-19 19:40:00.000000
+
+"""
+from collections import Counter
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e2f6b1d9'
+down_revision = 'f3a9c1d7b5e2'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+resumes = sa.table('resumes', sa.column('id', sa.Integer), sa.column('document_id', sa.Integer),
+                   sa.column('term_counts', sa.JSON))
+documents = sa.table('documents', sa.column('id', sa.Integer), sa.column('term_counts', sa.JSON))
+lexical_terms = sa.table('lexical_terms', sa.column('term', sa.String), sa.column('doc_freq', sa.Integer))
+
+
+def _rewrite_doc_freqs(bind, term_counts_query):
+    doc_freqs = Counter()
+    for (term_counts,) in bind.execute(term_counts_query):
+        doc_freqs.update(term_counts.keys())
+    bind.execute(lexical_terms.delete())
+    rows = [{"term": term, "doc_freq": n} for term, n in doc_freqs.items()]
+    for start in range(0, len(rows), BATCH_SIZE):
+        bind.execute(lexical_terms.insert(), rows[start:start + BATCH_SIZE])
+
+
+def upgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('term_counts', sa.JSON(none_as_null=True), nullable=True))
+
+    # Data: each document takes the term counts of its oldest application that has them, and the
+    # document frequencies (until now counted once per application) are recounted over documents
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(resumes.c.document_id, resumes.c.term_counts)
+                        .where(resumes.c.document_id.isnot(None), resumes.c.term_counts.isnot(None))
+                        .order_by(resumes.c.id)).all()
+    by_document = {}
+    for row in rows:
+        by_document.setdefault(row.document_id, row.term_counts)
+    updates = [{"b_id": document_id, "b_term_counts": term_counts} for document_id, term_counts in by_document.items()]
+    fill = documents.update().where(documents.c.id == sa.bindparam('b_id')).values(term_counts=sa.bindparam('b_term_counts'))
+    for start in range(0, len(updates), BATCH_SIZE):
+        bind.execute(fill, updates[start:start + BATCH_SIZE])
+    _rewrite_doc_freqs(bind, sa.select(documents.c.term_counts).where(documents.c.term_counts.isnot(None)))
+
+
+def downgrade():
+    # Back to one count per application
+    _rewrite_doc_freqs(op.get_bind(), sa.select(resumes.c.term_counts).where(resumes.c.term_counts.isnot(None)))
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('term_counts')
@@ -0,0 +1,26 @@
+"""Add pending_renewals column to resumes table
+
+Revision ID: b2d6f9a3c8e1
+Revises: a4c8e2f6b1d9
+Create Date: 2026-10-19 20:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d6f9a3c8e1'
+down_revision = 'a4c8e2f6b1d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pending_renewals', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.drop_column('pending_renewals')
@@ -0,0 +1,35 @@
+"""Add lexical_terms table and term_counts column to resumes table
+
+Revision ID: b7e3f5a1c9d4
+Revises: 9a6c2e41d8f5
+Create Date: 2026-10-19 15:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3f5a1c9d4'
+down_revision = '9a6c2e41d8f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('lexical_terms',
+    sa.Column('term', sa.String(length=64), nullable=False),
+    sa.Column('doc_freq', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('term')
+    )
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('term_counts', sa.JSON(none_as_null=True), nullable=True))
+
+    # Existing resumes get term counts from `flask rebuild-lexical-index --backfill`
+
+
+def downgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.drop_column('term_counts')
+
+    op.drop_table('lexical_terms')
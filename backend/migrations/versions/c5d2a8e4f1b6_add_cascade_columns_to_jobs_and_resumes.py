@@ -0,0 +1,41 @@
+"""Add cascade columns to jobs and resumes tables
+
+Revision ID: c5d2a8e4f1b6
+Revises: b7e3f5a1c9d4
+Create Date: 2026-10-19 16:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d2a8e4f1b6'
+down_revision = 'b7e3f5a1c9d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cascade_top_n', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('cascade_min_score', sa.Float(), nullable=True))
+
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('stage1_score', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('score_stage', sa.SmallInteger(), nullable=True))
+        batch_op.create_index('ix_resumes_job_id_stage1_score', ['job_id', 'stage1_score'], unique=False)
+
+    # Everything scored so far went through the full pipeline
+    op.execute("UPDATE resumes SET score_stage = 2 WHERE status = 'COMPLETED'")
+
+
+def downgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.drop_index('ix_resumes_job_id_stage1_score')
+        batch_op.drop_column('score_stage')
+        batch_op.drop_column('stage1_score')
+
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('cascade_min_score')
+        batch_op.drop_column('cascade_top_n')
@@ -0,0 +1,34 @@
+"""Add score_threshold to jobs table and below_threshold/score_upper_bound to resumes table
+
+Revision ID: d8b4e6f2a3c7
+Revises: c5d2a8e4f1b6
+Create Date: 2026-10-19 16:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8b4e6f2a3c7'
+down_revision = 'c5d2a8e4f1b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('score_threshold', sa.Float(), nullable=True))
+
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('below_threshold', sa.Boolean(), nullable=True))
+        batch_op.add_column(sa.Column('score_upper_bound', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.drop_column('score_upper_bound')
+        batch_op.drop_column('below_threshold')
+
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('score_threshold')
@@ -0,0 +1,32 @@
+"""Add content_hash, claimed_by and processed_key columns to resumes table
+
+Revision ID: e27a9c4b6d13
+Revises: 8c41d7e5f0b2
+Create Date: 2026-10-19 11:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e27a9c4b6d13'
+down_revision = '8c41d7e5f0b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('claimed_by', sa.String(length=155), nullable=True))
+        batch_op.add_column(sa.Column('processed_key', sa.String(length=80), nullable=True))
+        batch_op.create_index(batch_op.f('ix_resumes_content_hash'), ['content_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_resumes_content_hash'))
+        batch_op.drop_column('processed_key')
+        batch_op.drop_column('claimed_by')
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,85 @@
+"""Add documents table and document_id to resumes table (one document per distinct resume file)
+
+Revision ID: f3a9c1d7b5e2
+Revises: d8b4e6f2a3c7
+Create Date: 2026-10-19 18:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c1d7b5e2'
+down_revision = 'd8b4e6f2a3c7'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    op.create_table('documents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('storage_key', sa.String(length=512), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('features', sa.JSON(none_as_null=True), nullable=True),
+    sa.Column('chunk_embeddings', sa.LargeBinary(), nullable=True),
+    sa.Column('embedding', sa.LargeBinary(), nullable=True),
+    sa.Column('encoder', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash'),
+    sa.UniqueConstraint('storage_key')
+    )
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('document_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_resumes_document_id'), ['document_id'], unique=False)
+        batch_op.create_foreign_key('fk_resumes_document_id_documents', 'documents', ['document_id'], ['id'])
+
+    # Data: one document per distinct content hash (the oldest resume's stored copy), and one per
+    # distinct file path for resumes without a hash. Redundant copies of the same bytes stay in storage
+    # and on their rows (deleting the last row that uses one removes it); nothing is deleted here.
+    bind = op.get_bind()
+    resumes = sa.table('resumes', sa.column('id', sa.Integer), sa.column('filename', sa.String),
+                       sa.column('filepath', sa.String), sa.column('content_hash', sa.String),
+                       sa.column('uploaded_at', sa.DateTime), sa.column('document_id', sa.Integer))
+    documents = sa.table('documents', sa.column('id', sa.Integer), sa.column('content_hash', sa.String),
+                         sa.column('storage_key', sa.String), sa.column('filename', sa.String),
+                         sa.column('created_at', sa.DateTime))
+    rows = bind.execute(sa.select(resumes.c.id, resumes.c.filename, resumes.c.filepath, resumes.c.content_hash,
+                                  resumes.c.uploaded_at).order_by(resumes.c.id)).all()
+    by_hash, by_key, new_documents = {}, {}, []
+    for row in rows: # Hashed files first, so an unhashed row of an already-claimed path joins that document
+        if row.content_hash and row.content_hash not in by_hash and row.filepath not in by_key:
+            document = {"content_hash": row.content_hash, "storage_key": row.filepath, "filename": row.filename,
+                        "created_at": row.uploaded_at}
+            by_hash[row.content_hash] = by_key[row.filepath] = document
+            new_documents.append(document)
+    for row in rows:
+        if row.content_hash not in by_hash and row.filepath not in by_key:
+            document = {"content_hash": None, "storage_key": row.filepath, "filename": row.filename, "created_at": row.uploaded_at}
+            by_key[row.filepath] = document
+            new_documents.append(document)
+    for start in range(0, len(new_documents), BATCH_SIZE):
+        bind.execute(documents.insert(), new_documents[start:start + BATCH_SIZE])
+
+    ids = dict(bind.execute(sa.select(documents.c.storage_key, documents.c.id)).all())
+    links = []
+    for row in rows:
+        document = by_hash.get(row.content_hash) or by_key[row.filepath]
+        links.append({"b_id": row.id, "b_document_id": ids[document["storage_key"]]})
+    link = resumes.update().where(resumes.c.id == sa.bindparam('b_id')).values(document_id=sa.bindparam('b_document_id'))
+    for start in range(0, len(links), BATCH_SIZE):
+        bind.execute(link, links[start:start + BATCH_SIZE])
+
+
+def downgrade():
+    # Resumes keep their own filepath/content_hash, so dropping the documents loses only cached features
+    with op.batch_alter_table('resumes', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_resumes_document_id_documents', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_resumes_document_id'))
+        batch_op.drop_column('document_id')
+
+    op.drop_table('documents')
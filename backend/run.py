@@ -1,4 +1,7 @@
 import os
+import sys
+if len(sys.argv) > 1 and sys.argv[1] == 'db':
+    os.environ.setdefault('PROCESS_ROLE', 'migrate') # `flask db ...`: no pool, no statement timeout
 from app import create_app, db # Import factory and db instance
 from app.models import Job, Resume # Import models for shell context
 
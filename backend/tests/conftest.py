@@ -0,0 +1,65 @@
+# backend/tests/conftest.py
+#
+# Shared fixtures. Tests that need the database get a Flask app on a throwaway SQLite file with an
+# in-memory Celery broker; the environment is set here, before config.py is first imported.
+
+import os
+import tempfile
+import pytest
+
+_TMP_DIR = tempfile.mkdtemp(prefix='resume-screener-tests-')
+os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+os.environ['CELERY_BROKER_URL'] = 'memory://'
+os.environ['UPLOAD_FOLDER'] = os.path.join(_TMP_DIR, 'uploads')
+os.environ['ANN_INDEX_PATH'] = os.path.join(_TMP_DIR, 'ann', 'resumes.npz')
+os.environ.pop('WORKER_POOL', None)
+
+
+@pytest.fixture(scope='session')
+def flask_app():
+    from app import create_app
+    return create_app()
+
+@pytest.fixture
+def app(flask_app):
+    """The app inside an app context, with freshly created tables."""
+    from app.extensions import db
+    with flask_app.app_context():
+        db.create_all()
+        try:
+            yield flask_app
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+@pytest.fixture
+def make_job(app):
+    from app.extensions import db
+    from app.models import Job
+    def make(**fields):
+        job = Job(**{'title': 'Backend Engineer', 'description': 'Python, Flask and PostgreSQL.', **fields})
+        db.session.add(job)
+        db.session.commit()
+        return job
+    return make
+
+@pytest.fixture
+def make_resume(app, make_job):
+    """Adds a Resume (with its own CandidateDocument unless document_id is given) to a job."""
+    from app.extensions import db
+    from app.models import Resume, CandidateDocument, StatusEnum
+    def make(job=None, document_id=None, **fields):
+        job = job or make_job()
+        if document_id is None:
+            key = f"{job.id}/resume-{CandidateDocument.query.count() + 1}.pdf"
+            document = CandidateDocument(storage_key=key, filename=os.path.basename(key))
+            db.session.add(document)
+            db.session.flush()
+            document_id = document.id
+        document = db.session.get(CandidateDocument, document_id)
+        resume = Resume(**{'filename': document.filename, 'filepath': document.storage_key, 'document_id': document_id,
+                           'job_id': job.id, 'status': StatusEnum.PENDING, **fields})
+        db.session.add(resume)
+        db.session.commit()
+        return resume
+    return make
@@ -0,0 +1,118 @@
+# backend/tests/test_ann_index.py
+#
+# The NumPy IVF index behind cross-job candidate search (app/utils/ann_index.py): exact results
+# while untrained, recall once trained, tombstoned deletes and snapshot round trips.
+
+import numpy as np
+import pytest
+from app.utils import ann_index
+from app.utils.ann_index import ResumeAnnIndex, embedding_to_bytes, embedding_from_bytes
+
+DIM = 16
+
+
+def _vectors(n, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def _exact(vectors, ids, query, k):
+    scores = vectors @ (query / np.linalg.norm(query))
+    order = np.argsort(-scores)[:k]
+    return [int(ids[i]) for i in order]
+
+def _filled(n, seed=0, **kwargs):
+    index = ResumeAnnIndex(DIM, **kwargs)
+    vectors = _vectors(n, seed)
+    for item_id, vector in enumerate(vectors, start=100):
+        index.add(item_id, vector)
+    return index, vectors, np.arange(100, 100 + n)
+
+@pytest.fixture
+def small_train_size(monkeypatch):
+    monkeypatch.setattr(ann_index, 'MIN_TRAIN_SIZE', 200)
+
+
+def test_untrained_search_is_exact_and_sorted():
+    index, vectors, ids = _filled(50)
+    assert not index.is_trained
+    query = _vectors(1, seed=1)[0]
+    results = index.search(query, k=5)
+    assert [item_id for item_id, _ in results] == _exact(vectors, ids, query, 5)
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+    assert scores[0] == pytest.approx(float(vectors[ids.tolist().index(results[0][0])] @ query), abs=1e-5)
+
+def test_vectors_are_normalized_on_insert():
+    index = ResumeAnnIndex(DIM)
+    index.add(1, np.full(DIM, 3.0))
+    assert index.search(np.ones(DIM), k=1)[0][1] == pytest.approx(1.0)
+
+def test_readding_an_id_replaces_its_vector():
+    index, vectors, _ = _filled(20)
+    index.add(100, -vectors[0])
+    assert len(index) == 20
+    assert index.search(vectors[0], k=20)[-1][0] == 100
+
+def test_removed_and_excluded_ids_are_not_returned():
+    index, vectors, _ = _filled(30)
+    assert index.remove(100) is True and index.remove(100) is False
+    assert 100 not in index and len(index) == 29
+    found = {item_id for item_id, _ in index.search(vectors[0], k=30, exclude_ids={101, 102})}
+    assert found == set(range(103, 130))
+
+def test_rebuild_compacts_tombstones():
+    index, vectors, _ = _filled(30)
+    for item_id in range(100, 110):
+        index.remove(item_id)
+    index.rebuild()
+    assert len(index) == 20 and index._size == 20
+    assert {item_id for item_id, _ in index.search(vectors[15], k=100)} == set(range(110, 130))
+
+def test_dimension_mismatch_is_rejected():
+    with pytest.raises(ValueError):
+        ResumeAnnIndex(DIM).add(1, np.ones(DIM + 1))
+
+def test_empty_index_and_k_zero_return_nothing():
+    index = ResumeAnnIndex(DIM)
+    assert index.search(np.ones(DIM), k=5) == []
+    index.add(1, np.ones(DIM))
+    assert index.search(np.ones(DIM), k=0) == []
+
+
+def test_trained_index_keeps_recall(small_train_size):
+    index, vectors, ids = _filled(1000, nprobe=8)
+    assert index.is_trained
+    queries = _vectors(20, seed=2)
+    recall = np.mean([len({i for i, _ in index.search(q, k=10)} & set(_exact(vectors, ids, q, 10))) / 10 for q in queries])
+    assert recall >= 0.8
+
+def test_probing_every_list_is_exact(small_train_size):
+    index, vectors, ids = _filled(600, nprobe=4096)
+    assert index.is_trained
+    query = _vectors(1, seed=3)[0]
+    assert [item_id for item_id, _ in index.search(query, k=10)] == _exact(vectors, ids, query, 10)
+
+def test_vectors_added_after_training_are_searchable(small_train_size):
+    index, _, _ = _filled(300)
+    assert index.is_trained
+    new = _vectors(1, seed=4)[0]
+    index.add(5000, new)
+    assert index.search(new, k=1)[0][0] == 5000
+
+
+@pytest.mark.parametrize("n", [40, 400], ids=['flat', 'trained'])
+def test_snapshot_round_trip(tmp_path, small_train_size, n):
+    index, _, _ = _filled(n, nprobe=4)
+    index.remove(100)
+    path = str(tmp_path / 'ann' / 'resumes.npz')
+    index.save(path)
+    loaded = ResumeAnnIndex.load(path)
+    assert (len(loaded), loaded.dim, loaded.nprobe, loaded.is_trained) == (len(index), DIM, 4, index.is_trained)
+    assert loaded.ids() == index.ids()
+    for query in _vectors(5, seed=5):
+        assert [i for i, _ in loaded.search(query, k=10)] == [i for i, _ in index.search(query, k=10)]
+
+def test_embedding_bytes_round_trip():
+    vector = _vectors(1)[0]
+    assert np.array_equal(embedding_from_bytes(embedding_to_bytes(vector)), vector)
+    assert embedding_to_bytes(None) is None and embedding_from_bytes(b"") is None
@@ -0,0 +1,114 @@
+# backend/tests/test_claims.py
+#
+# Ownership of a resume run (app/tasks.py, app/result_writer.py): the compare-and-set claim, the
+# owner-guarded result write, and the batched result writer that groups those writes.
+
+import pytest
+from app.extensions import db
+from app.models import Resume, StatusEnum
+from app.tasks import _claim_resumes, _claim_resume, _write_result
+from app import result_writer
+from app.result_writer import ResultWriter, get_result_writer
+
+
+def _reload(resume_id):
+    db.session.expire_all()
+    return db.session.get(Resume, resume_id)
+
+
+def test_claim_moves_pending_to_processing_and_returns_the_job(app, make_job, make_resume):
+    job = make_job(description="Senior Python developer", required_years=4)
+    resume = make_resume(job)
+    row = _claim_resume(resume.id, 'task-a')
+    assert row is not None
+    assert (row.id, row.job_id, row.document_id) == (resume.id, job.id, resume.document_id)
+    assert (row.description, row.required_years) == ("Senior Python developer", 4)
+    claimed = _reload(resume.id)
+    assert claimed.status == StatusEnum.PROCESSING
+    assert claimed.claimed_by == 'task-a'
+    assert claimed.lease_expires_at is not None
+
+def test_claim_is_exclusive_but_redeliveries_of_the_owner_reclaim(app, make_resume):
+    resume = make_resume()
+    assert _claim_resume(resume.id, 'task-a') is not None
+    assert _claim_resume(resume.id, 'task-b') is None
+    assert _reload(resume.id).claimed_by == 'task-a'
+    assert _claim_resume(resume.id, 'task-a') is not None # Redelivery / retry of the same task
+
+@pytest.mark.parametrize("status, claimable", [
+    (StatusEnum.PENDING, True),
+    (StatusEnum.FAILED, True),
+    (StatusEnum.COMPLETED, False),
+])
+def test_claimable_statuses(app, make_resume, status, claimable):
+    resume = make_resume(status=status)
+    assert (_claim_resume(resume.id, 'task-a') is not None) == claimable
+
+def test_claim_many_skips_missing_and_unclaimable_rows(app, make_job, make_resume):
+    job = make_job()
+    pending = [make_resume(job) for _ in range(3)]
+    done = make_resume(job, status=StatusEnum.COMPLETED)
+    rows = _claim_resumes([r.id for r in pending] + [done.id, 9999], 'task-a')
+    assert sorted(row.id for row in rows) == sorted(r.id for r in pending)
+
+
+def test_write_result_only_applies_for_the_current_owner(app, make_resume):
+    resume = make_resume()
+    _claim_resume(resume.id, 'task-a')
+    assert _write_result(resume.id, 'task-b', StatusEnum.COMPLETED, {'score': 10.0}) is False
+    assert _write_result(resume.id, 'task-a', StatusEnum.COMPLETED, {'score': 80.0}) is True
+    row = _reload(resume.id)
+    assert (row.status, row.score) == (StatusEnum.COMPLETED, 80.0)
+    # Finished: a late duplicate of the same task cannot rewrite it either
+    assert _write_result(resume.id, 'task-a', StatusEnum.FAILED, {'score': None}) is False
+
+
+def test_result_writer_batches_writes_into_one_flush(app, make_job, make_resume):
+    job = make_job()
+    resumes = [make_resume(job) for _ in range(4)]
+    for i, resume in enumerate(resumes):
+        _claim_resume(resume.id, f'task-{i}')
+    writer = ResultWriter(app, max_batch=len(resumes), max_wait_ms=5000)
+    try:
+        futures = [writer.submit(resume.id, f'task-{i}', StatusEnum.COMPLETED, {'score': float(i), 'error_message': None})
+                   for i, resume in enumerate(resumes)]
+        assert [future.result(timeout=10) for future in futures] == [True] * len(resumes)
+    finally:
+        writer.shutdown()
+    assert (writer.flushes, writer.rows_written) == (1, len(resumes))
+    assert [_reload(resume.id).score for resume in resumes] == [0.0, 1.0, 2.0, 3.0]
+
+def test_result_writer_groups_mixed_columns_and_guards_owners(app, make_job, make_resume):
+    job = make_job()
+    ok, failed, stolen = make_resume(job), make_resume(job), make_resume(job)
+    _claim_resume(ok.id, 'task-ok'); _claim_resume(failed.id, 'task-failed'); _claim_resume(stolen.id, 'task-new')
+    writer = ResultWriter(app, max_batch=3, max_wait_ms=5000)
+    try:
+        futures = [writer.submit(ok.id, 'task-ok', StatusEnum.COMPLETED, {'score': 55.0}),
+                   writer.submit(failed.id, 'task-failed', StatusEnum.FAILED, {'error_message': "Unreadable file"}),
+                   writer.submit(stolen.id, 'task-old', StatusEnum.COMPLETED, {'score': 1.0})]
+        assert [future.result(timeout=10) for future in futures] == [True, True, False]
+    finally:
+        writer.shutdown()
+    assert writer.flushes == 1
+    assert _reload(ok.id).status == StatusEnum.COMPLETED
+    assert _reload(failed.id).error_message == "Unreadable file"
+    assert (_reload(stolen.id).status, _reload(stolen.id).claimed_by) == (StatusEnum.PROCESSING, 'task-new')
+
+def test_result_writer_flushes_a_partial_batch_after_max_wait(app, make_resume):
+    resume = make_resume()
+    _claim_resume(resume.id, 'task-a')
+    writer = ResultWriter(app, max_batch=50, max_wait_ms=20)
+    try:
+        assert writer.submit(resume.id, 'task-a', StatusEnum.COMPLETED, {'score': 12.5}).result(timeout=10) is True
+    finally:
+        writer.shutdown()
+    assert _reload(resume.id).score == 12.5
+
+@pytest.mark.parametrize("pool, batched", [('gevent', True), ('threads', True), ('prefork', False), ('solo', False)])
+def test_result_writer_is_only_used_by_batching_pools(app, monkeypatch, pool, batched):
+    monkeypatch.setitem(app.config, 'RESULT_WRITER_ENABLED', True)
+    monkeypatch.setenv('WORKER_POOL', pool)
+    monkeypatch.setattr(result_writer, '_writer', None)
+    monkeypatch.setattr(result_writer.atexit, 'register', lambda fn: None)
+    assert (get_result_writer(app) is not None) == batched
@@ -0,0 +1,75 @@
+# backend/tests/test_encoders.py
+#
+# Accuracy of the faster encoder backends (app/utils/encoders.py) against the fp32 torch reference:
+# every (JD, resume) cosine must stay within the benchmark's default tolerance. Needs a local
+# sentence-transformers model directory in SENTENCE_MODEL_PATH (and onnx/model.onnx inside it for
+# the ONNX backend); skipped otherwise, since a bare model name would be downloaded.
+
+import os
+import numpy as np
+import pytest
+from app.utils import encoders
+from app.utils.encoders import compare_encoders, load_sentence_encoder
+
+MODEL_PATH = os.environ.get('SENTENCE_MODEL_PATH', '')
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+TOLERANCE = 0.02
+
+QUERIES = [
+    "Senior backend engineer: Python, Flask, PostgreSQL, Celery and Redis; 5+ years building REST APIs.",
+    "Data scientist with experience in NLP, transformers, scikit-learn and model deployment on AWS.",
+]
+DOCUMENTS = [
+    "Software engineer, 6 years. Built Flask and Django REST services backed by PostgreSQL; Celery task queues.",
+    "Machine learning engineer: fine-tuned BERT models for text classification, deployed with Docker on AWS SageMaker.",
+    "Registered nurse with ICU experience, patient care planning and electronic health records.",
+    "Frontend developer skilled in React, TypeScript and CSS; some Node.js and GraphQL.",
+    "Python developer — pandas, NumPy, data pipelines, Airflow; exposure to Kubernetes. Résumé available on request.",
+]
+
+requires_model = pytest.mark.skipif(not encoders.TORCH_AVAILABLE or not os.path.isdir(MODEL_PATH),
+                                    reason="needs torch/sentence-transformers and a local model in SENTENCE_MODEL_PATH")
+
+
+def _queries():
+    jd_path = os.path.join(DATA_DIR, 'job_descriptions', 'sample_jd.txt')
+    if os.path.exists(jd_path):
+        with open(jd_path, 'r', encoding='utf-8', errors='ignore') as f:
+            return QUERIES + [f.read()]
+    return QUERIES
+
+
+@pytest.fixture(scope='module')
+def reference():
+    encoder = load_sentence_encoder('torch', MODEL_PATH)
+    assert encoder is not None, f"fp32 reference encoder failed to load from {MODEL_PATH}"
+    return encoder
+
+
+def _assert_agrees(reference, backend):
+    candidate = load_sentence_encoder(backend, MODEL_PATH)
+    assert candidate is not None, f"{backend} encoder failed to load from {MODEL_PATH}"
+    result = compare_encoders(reference, candidate, _queries(), DOCUMENTS, tolerance=TOLERANCE)
+    assert result["within_tolerance"], (f"{backend}: max |cosine - reference| = {result['max_abs_diff']:.4f} "
+                                        f"(mean {result['mean_abs_diff']:.4f}) exceeds {TOLERANCE}")
+
+
+@requires_model
+def test_int8_encoder_agrees_with_fp32_reference(reference):
+    _assert_agrees(reference, 'torch-int8')
+
+
+@requires_model
+@pytest.mark.skipif(not encoders.ONNXRUNTIME_AVAILABLE, reason="onnxruntime not installed")
+def test_onnx_encoder_agrees_with_fp32_reference(reference):
+    onnx_path = os.path.join(MODEL_PATH, encoders.ONNX_SUBDIR, encoders.ONNX_FILENAME)
+    if not os.path.exists(onnx_path):
+        pytest.skip(f"no exported ONNX model at {onnx_path} (python -m app.utils.encoders export)")
+    _assert_agrees(reference, 'onnx')
+
+
+@requires_model
+def test_reference_embeddings_are_unit_length(reference):
+    embeddings = reference.encode(DOCUMENTS)
+    assert embeddings.shape[0] == len(DOCUMENTS)
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-4)
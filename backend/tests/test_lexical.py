@@ -0,0 +1,112 @@
+# backend/tests/test_lexical.py
+#
+# Corpus TF-IDF: the IDF/TF-IDF math (app/utils/lexical.py) and the per-document frequency
+# bookkeeping behind it (app/lexical.py).
+
+import math
+import pytest
+from app.utils import lexical as lexical_math
+from app.utils.lexical import IdfTable, tfidf_vector, lexical_similarity, lexical_scores
+from app.extensions import db
+from app.models import LexicalTerm
+from app.lexical import set_document_terms, record_document_terms, remove_documents, load_idf_table, score_job_pool
+
+DOCUMENTS = [
+    {"python": 3, "flask": 1, "sql": 2},
+    {"java": 4, "spring": 2, "sql": 1},
+    {"python": 1, "pandas": 2, "numpy": 2},
+    {},
+    {"nurse": 2, "icu": 1},
+]
+QUERY = {"python": 2, "flask": 1, "postgresql": 1}
+
+
+def test_idf_matches_the_smoothed_formula():
+    table = IdfTable({"python": 2, "sql": 5}, n_docs=5)
+    assert table.idf("python") == pytest.approx(math.log(6 / 3) + 1)
+    assert table.idf("sql") == pytest.approx(1.0) # In every document
+    assert table.idf("rust") == pytest.approx(math.log(6) + 1) # Unseen: the maximum
+    assert table.idf("rust") > table.idf("python") > table.idf("sql")
+
+def test_idf_caps_document_frequency_at_the_corpus_size():
+    assert IdfTable({"python": 9}, n_docs=3).idf("python") == pytest.approx(1.0)
+
+def test_empty_corpus_weights_every_term_equally():
+    table = IdfTable({}, n_docs=0)
+    assert table.idf("python") == table.idf("java") == pytest.approx(1.0)
+
+def test_tfidf_vector_is_sublinear_and_unit_length():
+    table = IdfTable({"python": 1, "sql": 1}, n_docs=4)
+    vector = tfidf_vector({"python": 4, "sql": 1, "ignored": 0}, table)
+    assert set(vector) == {"python", "sql"}
+    assert vector["python"] / vector["sql"] == pytest.approx(1 + math.log(4))
+    assert math.sqrt(sum(w * w for w in vector.values())) == pytest.approx(1.0)
+    assert tfidf_vector({}, table) == {}
+
+def test_similarity_is_symmetric_and_bounded():
+    table = IdfTable({"python": 2, "flask": 1, "sql": 2}, n_docs=5)
+    assert lexical_similarity(DOCUMENTS[0], DOCUMENTS[0], table) == pytest.approx(1.0)
+    assert lexical_similarity(DOCUMENTS[0], QUERY, table) == pytest.approx(lexical_similarity(QUERY, DOCUMENTS[0], table))
+    assert lexical_similarity(DOCUMENTS[4], QUERY, table) == 0.0
+    assert lexical_similarity({}, QUERY, table) == 0.0
+
+@pytest.mark.parametrize("scipy_available", [True, False], ids=['sparse', 'per-document'])
+def test_pool_scores_match_pairwise_similarity(monkeypatch, scipy_available):
+    if scipy_available and not lexical_math.SCIPY_AVAILABLE:
+        pytest.skip("scipy not installed")
+    monkeypatch.setattr(lexical_math, 'SCIPY_AVAILABLE', scipy_available)
+    table = IdfTable({"python": 2, "flask": 1, "sql": 2, "java": 1, "pandas": 1}, n_docs=5)
+    scores = lexical_scores(DOCUMENTS, QUERY, table)
+    assert scores.shape == (len(DOCUMENTS),)
+    assert scores.tolist() == pytest.approx([lexical_similarity(d, QUERY, table) for d in DOCUMENTS], abs=1e-6)
+    assert scores[0] > scores[2] > scores[1] == 0.0
+
+def test_empty_query_scores_zero():
+    assert lexical_scores(DOCUMENTS, {}, IdfTable({}, 0)).tolist() == [0.0] * len(DOCUMENTS)
+
+
+def _doc_freqs():
+    db.session.expire_all()
+    return dict(db.session.query(LexicalTerm.term, LexicalTerm.doc_freq))
+
+def test_a_document_counts_once_however_many_jobs_score_it(app, make_job, make_resume):
+    first = make_resume(make_job())
+    second = make_resume(make_job(), document_id=first.document_id) # Same file, another job
+    other = make_resume(first.job)
+    record_document_terms(first.document_id, {"python": 3, "sql": 1})
+    record_document_terms(second.document_id, {"python": 3, "sql": 1}) # Rescored for the second job
+    record_document_terms(other.document_id, {"python": 1})
+    assert _doc_freqs() == {"python": 2, "sql": 1}
+    table = load_idf_table()
+    assert table.n_docs == 2
+    assert table.idf("sql") == pytest.approx(math.log(3 / 2) + 1)
+
+def test_changed_terms_move_the_document_frequencies(app, make_job, make_resume):
+    job = make_job()
+    a, b = make_resume(job), make_resume(job)
+    set_document_terms({a.document_id: {"python": 1, "sql": 2}, b.document_id: {"sql": 1}})
+    assert _doc_freqs() == {"python": 1, "sql": 2}
+    set_document_terms({a.document_id: {"python": 2, "flask": 1}}) # Re-parsed: lost "sql", gained "flask"
+    assert _doc_freqs() == {"python": 1, "sql": 1, "flask": 1}
+
+def test_removed_documents_drop_unused_terms(app, make_job, make_resume):
+    job = make_job()
+    a, b = make_resume(job), make_resume(job)
+    set_document_terms({a.document_id: {"python": 1, "rust": 1}, b.document_id: {"python": 1}})
+    remove_documents([{"python": 1, "rust": 1}])
+    assert _doc_freqs() == {"python": 1}
+
+def test_documents_without_terms_are_ignored(app, make_resume):
+    resume = make_resume()
+    set_document_terms({resume.document_id: {}, None: {"python": 1}, 9999: {"python": 1}})
+    assert _doc_freqs() == {}
+    assert load_idf_table().n_docs == 0
+
+def test_job_pool_is_ranked_by_similarity(app, make_job, make_resume):
+    job = make_job()
+    resumes = [make_resume(job, term_counts=counts or None) for counts in DOCUMENTS]
+    table = IdfTable({"python": 2, "flask": 1, "sql": 2}, n_docs=5)
+    ranked = score_job_pool(job.id, QUERY, idf_table=table)
+    assert [resume_id for resume_id, _ in ranked][:2] == [resumes[0].id, resumes[2].id]
+    assert len(ranked) == 4 # The resume without term counts is left out
+    assert len(score_job_pool(job.id, QUERY, idf_table=table, limit=2)) == 2
@@ -0,0 +1,90 @@
+# backend/tests/test_parsers.py
+#
+# The streaming DOCX reader (app/utils/parsers.py): paragraph, table, text-box, header and footer
+# text read straight from the WordprocessingML parts of small hand-built .docx files.
+
+import zipfile
+from app.utils.parsers import _docx_part_lines, _docx_text_stream, extract_document, DOCX_CELL_SEPARATOR
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+MC_NS = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+CONTENT_TYPES = ('<?xml version="1.0" encoding="UTF-8"?>'
+                 '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                 '<Default Extension="xml" ContentType="application/xml"/>'
+                 '<Override PartName="/word/document.xml" '
+                 'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+
+
+def p(*runs):
+    """A paragraph; each run is text, or one of the markers 'TAB' / 'BR'."""
+    body = "".join('<w:r><w:tab/></w:r>' if run == 'TAB' else '<w:r><w:br/></w:r>' if run == 'BR'
+                   else f'<w:r><w:t xml:space="preserve">{run}</w:t></w:r>' for run in runs)
+    return f'<w:p>{body}</w:p>'
+
+def table(*rows):
+    return '<w:tbl>' + "".join('<w:tr>' + "".join(f'<w:tc>{cell}</w:tc>' for cell in row) + '</w:tr>' for row in rows) + '</w:tbl>'
+
+def part(root, content):
+    return f'<?xml version="1.0" encoding="UTF-8"?><w:{root} xmlns:w="{W_NS}" xmlns:mc="{MC_NS}">{content}</w:{root}>'
+
+def write_docx(path, body, headers=(), footers=()):
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('word/document.xml', part('document', f'<w:body>{body}</w:body>'))
+        for i, header in enumerate(headers, 1):
+            archive.writestr(f'word/header{i}.xml', part('hdr', header))
+        for i, footer in enumerate(footers, 1):
+            archive.writestr(f'word/footer{i}.xml', part('ftr', footer))
+    return str(path)
+
+def part_lines(tmp_path, body):
+    path = tmp_path / 'part.xml'
+    path.write_text(part('document', f'<w:body>{body}</w:body>'), encoding='utf-8')
+    with open(path, 'rb') as stream:
+        return list(_docx_part_lines(stream))
+
+
+def test_paragraphs_are_lines_and_runs_are_joined(tmp_path):
+    assert part_lines(tmp_path, p("Jane ", "Doe") + p() + p("  ") + p("Python", "TAB", "Flask")) == ["Jane Doe", "Python\tFlask"]
+
+def test_breaks_stay_inside_the_paragraph_line(tmp_path):
+    assert part_lines(tmp_path, p("Line one", "BR", "line two")) == ["Line one\nline two"]
+
+def test_table_rows_join_cells(tmp_path):
+    body = table([p("Skills"), p("Python") + p("SQL")], [p("Years"), p("")], [p(""), p("")])
+    assert part_lines(tmp_path, body) == [f"Skills{DOCX_CELL_SEPARATOR}Python SQL", "Years"]
+
+def test_nested_table_rows_belong_to_the_outer_cell(tmp_path):
+    inner = table([p("Go"), p("3 yrs")])
+    body = table([p("Languages"), inner])
+    assert part_lines(tmp_path, body) == [f"Languages{DOCX_CELL_SEPARATOR}Go{DOCX_CELL_SEPARATOR}3 yrs"]
+
+def test_text_box_paragraphs_are_read_once(tmp_path):
+    text_box = ('<w:r><mc:AlternateContent>'
+                f'<mc:Choice Requires="wps"><w:drawing><w:txbxContent>{p("Contact: jane@example.com")}</w:txbxContent></w:drawing></mc:Choice>'
+                f'<mc:Fallback><w:pict><w:txbxContent>{p("Contact: jane@example.com")}</w:txbxContent></w:pict></mc:Fallback>'
+                '</mc:AlternateContent></w:r>')
+    body = f'<w:p><w:r><w:t>Summary</w:t></w:r>{text_box}</w:p>'
+    assert part_lines(tmp_path, body) == ["Contact: jane@example.com", "Summary"]
+
+def test_long_documents_are_read_in_order(tmp_path):
+    body = "".join(p(f"Bullet {i}") for i in range(5000))
+    lines = part_lines(tmp_path, body)
+    assert len(lines) == 5000 and lines[0] == "Bullet 0" and lines[-1] == "Bullet 4999"
+
+
+def test_headers_body_and_footers_in_order_with_repeated_edges_deduplicated(tmp_path):
+    path = write_docx(tmp_path / 'resume.docx', body=p("Experience") + p("Acme Corp"),
+                      headers=[p("Jane Doe") + p("jane@example.com"), p("Jane Doe")], footers=[p("Page footer")])
+    assert _docx_text_stream(path) == "Jane Doe\njane@example.com\nExperience\nAcme Corp\nPage footer"
+
+def test_extract_document_uses_the_streaming_reader(tmp_path):
+    path = write_docx(tmp_path / 'resume.docx', body=p("Senior Engineer") + table([p("Python"), p("8 years")]))
+    result = extract_document(path)
+    assert result["engine"] == 'docx-stream'
+    assert result["text"] == f"Senior Engineer\nPython{DOCX_CELL_SEPARATOR}8 years"
+    assert result["pages"] is None
+
+def test_empty_docx_extracts_nothing(tmp_path):
+    path = write_docx(tmp_path / 'empty.docx', body=p() + p("   "))
+    assert _docx_text_stream(path) == ""
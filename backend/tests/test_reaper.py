@@ -0,0 +1,116 @@
+# backend/tests/test_reaper.py
+#
+# Lease expiry handling (app/reaper.py): requeueing abandoned runs, failing poison inputs, and
+# renewing vs. re-sending expired PENDING leases. The broker is replaced by a recorded dispatch and
+# a fixed queue backlog.
+
+from datetime import datetime, timedelta
+import pytest
+from app import reaper
+from app.extensions import db
+from app.models import Resume, StatusEnum
+from app.reaper import reap_stale_resumes
+from app.tasks import process_resume
+
+
+@pytest.fixture
+def dispatched(app, monkeypatch):
+    """Resume ids the reaper re-sent a task for."""
+    sent = []
+    monkeypatch.setattr(process_resume, 'apply_async', lambda args, queue: sent.append(args[0]))
+    return sent
+
+@pytest.fixture
+def backlog(monkeypatch):
+    """Set .depth to the message count every broker queue reports."""
+    state = type('Backlog', (), {'depth': 0})()
+    monkeypatch.setattr(reaper, '_queue_backlog', lambda queue_name, cache: state.depth)
+    return state
+
+def _expired(**fields):
+    return {'lease_expires_at': datetime.utcnow() - timedelta(minutes=5), **fields}
+
+def _reload(resume_id):
+    db.session.expire_all()
+    return db.session.get(Resume, resume_id)
+
+
+def test_abandoned_processing_run_is_requeued(app, make_resume, dispatched, backlog):
+    resume = make_resume(**_expired(status=StatusEnum.PROCESSING, claimed_by='dead-task', score=3.0))
+    counts = reap_stale_resumes()
+    assert (counts["requeued"], counts["dispatched"], counts["failed"]) == (1, 1, 0)
+    assert dispatched == [resume.id]
+    row = _reload(resume.id)
+    assert (row.status, row.claimed_by, row.score, row.requeue_count) == (StatusEnum.PENDING, None, None, 1)
+    assert row.lease_expires_at > datetime.utcnow()
+
+def test_processing_run_past_max_requeues_fails(app, make_resume, dispatched, backlog):
+    max_requeues = app.config['REAPER_MAX_REQUEUES']
+    resume = make_resume(**_expired(status=StatusEnum.PROCESSING, claimed_by='dead-task', requeue_count=max_requeues))
+    counts = reap_stale_resumes()
+    assert (counts["failed"], counts["requeued"]) == (1, 0)
+    assert dispatched == []
+    row = _reload(resume.id)
+    assert (row.status, row.claimed_by, row.lease_expires_at) == (StatusEnum.FAILED, None, None)
+    assert row.error_message
+
+def test_unexpired_leases_are_left_alone(app, make_resume, dispatched, backlog):
+    future = datetime.utcnow() + timedelta(minutes=5)
+    processing = make_resume(status=StatusEnum.PROCESSING, claimed_by='live-task', lease_expires_at=future)
+    pending = make_resume(status=StatusEnum.PENDING, lease_expires_at=future)
+    assert reap_stale_resumes()["stale"] == 0
+    assert dispatched == []
+    assert _reload(processing.id).claimed_by == 'live-task'
+    assert _reload(pending.id).pending_renewals == 0
+
+def test_expired_pending_behind_a_backlog_only_renews_its_lease(app, make_resume, dispatched, backlog):
+    backlog.depth = 250
+    resume = make_resume(**_expired(status=StatusEnum.PENDING))
+    counts = reap_stale_resumes()
+    assert (counts["waiting"], counts["requeued"], counts["dispatched"]) == (1, 0, 0)
+    row = _reload(resume.id)
+    assert (row.status, row.pending_renewals, row.requeue_count) == (StatusEnum.PENDING, 1, 0)
+    assert row.lease_expires_at > datetime.utcnow()
+
+def test_expired_pending_with_empty_queues_is_resent(app, make_resume, dispatched, backlog):
+    resume = make_resume(**_expired(status=StatusEnum.PENDING))
+    counts = reap_stale_resumes()
+    assert (counts["requeued"], counts["dispatched"], counts["waiting"]) == (1, 1, 0)
+    assert dispatched == [resume.id]
+    row = _reload(resume.id)
+    assert (row.status, row.pending_renewals, row.requeue_count) == (StatusEnum.PENDING, 0, 0)
+
+def test_pending_lease_renewals_are_bounded(app, make_resume, dispatched, backlog):
+    backlog.depth = 250 # The queues never drain, so the task may have been lost behind them
+    max_renewals = app.config['REAPER_MAX_PENDING_RENEWALS']
+    resume = make_resume(**_expired(status=StatusEnum.PENDING))
+    for sweep in range(1, max_renewals):
+        assert reap_stale_resumes()["waiting"] == 1
+        assert _reload(resume.id).pending_renewals == sweep
+        db.session.query(Resume).filter_by(id=resume.id).update(_expired())
+        db.session.commit()
+    assert dispatched == []
+    counts = reap_stale_resumes()
+    assert (counts["overdue"], counts["dispatched"], counts["waiting"]) == (1, 1, 0)
+    assert dispatched == [resume.id]
+    assert _reload(resume.id).pending_renewals == 0
+
+def test_expired_pending_is_never_failed(app, make_resume, dispatched, backlog):
+    resume = make_resume(**_expired(status=StatusEnum.PENDING, requeue_count=99))
+    assert reap_stale_resumes()["failed"] == 0
+    assert _reload(resume.id).status == StatusEnum.PENDING
+
+def test_dry_run_only_counts(app, make_job, make_resume, dispatched, backlog):
+    job = make_job()
+    resumes = [make_resume(job, **_expired(status=status)) for status in (StatusEnum.PENDING, StatusEnum.PROCESSING)]
+    make_resume(job, **_expired(status=StatusEnum.COMPLETED))
+    assert reap_stale_resumes(dry_run=True)["stale"] == 2
+    assert dispatched == []
+    assert [_reload(r.id).status for r in resumes] == [StatusEnum.PENDING, StatusEnum.PROCESSING]
+
+def test_sweeps_run_in_bounded_batches(app, make_job, make_resume, dispatched, backlog):
+    job = make_job()
+    for _ in range(5):
+        make_resume(job, **_expired(status=StatusEnum.PROCESSING, claimed_by='dead-task'))
+    assert reap_stale_resumes(batch_size=2, max_batches=2)["requeued"] == 4
+    assert reap_stale_resumes(batch_size=2, max_batches=2)["requeued"] == 1
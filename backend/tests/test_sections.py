@@ -0,0 +1,73 @@
+# backend/tests/test_sections.py
+#
+# Regression tests for the section segmenter (app/utils/sections.py) and what depends on it:
+# JD skill targeting and experience extraction, on the sample JD and resumes in data/.
+
+import os
+import pytest
+from app.utils.sections import header_type, segment_sections
+from app.utils.document import Document
+from app.utils.nlp import get_targeted_text_for_skills, extract_skills, extract_years_experience, JD_SKILL_SECTION_TYPES
+from app.utils.parsers import extract_text_from_file
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+SAMPLE_JD = os.path.join(DATA_DIR, 'job_descriptions', 'sample_jd.txt')
+
+SAMPLE_JD_SKILLS = {'analytical skills', 'aws', 'azure', 'ci/cd', 'communication', 'containerization', 'django', 'docker',
+                    'flask', 'gcp', 'git', 'kafka', 'kubernetes', 'mongodb', 'nosql', 'postgresql', 'python', 'redis',
+                    'restful', 'sql', 'teamwork', 'testing', 'version control'}
+RESUME_YEARS = {'52618188.pdf': 18.76, '57002858.pdf': 19.0, '64017585.pdf': 0.0, '66832845.pdf': 18.0}
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("Experience", 'experience'),
+    ("  - Work History:", 'experience'),
+    ("2. Work Experience", 'experience'),
+    ("TECHNICAL SKILLS", 'skills'),
+    ("Relevant Work Experience", 'experience'),
+    ("Relevant Work Experience:", 'experience'),
+    ("Technical Skills Summary", 'skills'),
+    ("Role Summary:", 'summary'),
+    ("Required Qualifications:", 'qualifications'),
+])
+def test_header_lines(line, expected):
+    assert header_type(line) == expected
+
+@pytest.mark.parametrize("line", [
+    "5 years experience",
+    "Five years experience",
+    "Java Skills",
+    "Experience with Python and Django",
+    "I have experience leading teams",
+    "Managed Projects",
+    "Built a data platform used by 40 teams across the company, cutting costs by half",
+    "",
+])
+def test_body_lines_are_not_headers(line):
+    assert header_type(line) is None
+
+def test_segment_sections_spans():
+    lines = ["Jane Doe", "Summary", "Backend engineer.", "Requirements:", "5 years experience", "Python, SQL",
+             "Education", "B.Sc."]
+    sections = segment_sections(lines)
+    assert [(s.kind, s.start, s.end) for s in sections] == [
+        ('preamble', 0, 1), ('summary', 2, 3), ('requirements', 4, 6), ('education', 7, 8)]
+    # A body line that mentions a header phrase does not cut its section short
+    assert sections[2].title == "Requirements:"
+
+def test_segment_sections_without_headers():
+    assert [(s.kind, s.start, s.end) for s in segment_sections(["just", "text"])] == [('preamble', 0, 2)]
+    assert segment_sections([]) == []
+
+
+def test_sample_jd_targeted_skills():
+    with open(SAMPLE_JD, encoding='utf-8') as f:
+        jd_document = Document(f.read())
+    targeted = get_targeted_text_for_skills(jd_document, JD_SKILL_SECTION_TYPES)
+    assert {skill.lower() for skill in extract_skills(targeted, use_ner=False)} == SAMPLE_JD_SKILLS
+
+@pytest.mark.parametrize("filename, years", sorted(RESUME_YEARS.items()))
+def test_sample_resume_experience_years(filename, years):
+    text = extract_text_from_file(os.path.join(DATA_DIR, 'resumes', filename))
+    assert text
+    assert extract_years_experience(text) == pytest.approx(years, abs=0.05)
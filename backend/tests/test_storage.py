@@ -0,0 +1,70 @@
+# backend/tests/test_storage.py
+#
+# Storage drivers (app/storage.py). The S3 driver runs against moto's in-process S3 stand-in
+# (skipped when boto3/moto are not installed); the same contract is checked on local storage.
+
+import io
+import hashlib
+from urllib.parse import urlparse, parse_qs, quote
+import pytest
+from app.storage import LocalStorage, S3Storage, attachment_disposition, BOTO3_AVAILABLE
+from app.utils.uploads import UploadTooLargeError
+
+PAYLOAD = b"%PDF-1.4 resume bytes " * 1000
+
+
+@pytest.fixture
+def s3_storage():
+    moto = pytest.importorskip("moto")
+    if not BOTO3_AVAILABLE:
+        pytest.skip("boto3 not installed")
+    with moto.mock_aws():
+        storage = S3Storage('resumes-test', prefix='resumes/', region='us-east-1')
+        storage.client.create_bucket(Bucket='resumes-test')
+        yield storage
+
+@pytest.fixture(params=['local', 's3'])
+def storage(request, tmp_path):
+    if request.param == 'local':
+        return LocalStorage(str(tmp_path))
+    return request.getfixturevalue('s3_storage')
+
+
+def test_put_stream_round_trip(storage):
+    size, content_hash = storage.put_stream('cv_1234.pdf', io.BytesIO(PAYLOAD))
+    assert (size, content_hash) == (len(PAYLOAD), hashlib.sha256(PAYLOAD).hexdigest())
+    assert storage.size('cv_1234.pdf') == len(PAYLOAD)
+    assert b"".join(storage.iter_range('cv_1234.pdf', 4, 20)) == PAYLOAD[4:20]
+    with storage.local_path('cv_1234.pdf') as path, open(path, 'rb') as f:
+        assert f.read() == PAYLOAD
+
+def test_put_stream_enforces_limit(storage):
+    with pytest.raises(UploadTooLargeError):
+        storage.put_stream('big.pdf', io.BytesIO(PAYLOAD), max_bytes=1024)
+    with pytest.raises(FileNotFoundError): # Nothing partial is left behind
+        storage.size('big.pdf')
+
+def test_missing_objects_raise_file_not_found(storage):
+    storage.put_stream('gone.pdf', io.BytesIO(PAYLOAD))
+    storage.delete('gone.pdf')
+    with pytest.raises(FileNotFoundError):
+        storage.size('gone.pdf')
+    with pytest.raises(FileNotFoundError):
+        storage.open('gone.pdf')
+
+
+@pytest.mark.parametrize("name", ['cv.pdf', 'a"b; x=y.pdf', 'Résumé 李.pdf', 'a\\b\r\n.pdf'])
+def test_attachment_disposition_cannot_be_broken(name):
+    disposition = attachment_disposition(name)
+    fallback = disposition.split('filename="', 1)[1].split('"', 1)[0]
+    assert disposition.startswith('attachment; filename="')
+    assert disposition.count('"') == 2 and disposition.count(';') == 2
+    assert fallback.isascii() and '\r' not in fallback and '\n' not in fallback
+    assert disposition.endswith("filename*=UTF-8''" + quote(name, safe=''))
+
+def test_presigned_url_carries_escaped_disposition(s3_storage):
+    s3_storage.put_stream('cv_1234.pdf', io.BytesIO(PAYLOAD))
+    url = s3_storage.presigned_url('cv_1234.pdf', download_name='Résumé "final".pdf', expires=60)
+    query = parse_qs(urlparse(url).query)
+    assert query['response-content-disposition'] == [attachment_disposition('Résumé "final".pdf')]
+    assert urlparse(url).path.endswith('/resumes/cv_1234.pdf')
@@ -0,0 +1,89 @@
+# backend/tests/test_text_cache.py
+#
+# Extracted-text artifacts (app/text_cache.py): store/load round trips per codec, cache hits that
+# never touch the source file, truncation, and damaged or stale artifacts being rebuilt.
+
+import io
+import os
+import pytest
+from app.storage import LocalStorage
+from app.text_cache import (ZSTD_AVAILABLE, ARTIFACT_VERSION, artifact_codec, artifact_key, get_or_extract_text,
+                            load_text_artifact, save_text_artifact, _encode)
+from app.utils.parsers import compute_file_hash
+
+RESUME_KEY = '1/resume.txt'
+RESUME_TEXT = "Jane Doe\nSenior Python Engineer\nFlask, PostgreSQL, Celery — 8 years.\n"
+CODECS = ['gzip', pytest.param('zstd', marks=pytest.mark.skipif(not ZSTD_AVAILABLE, reason="zstandard not installed"))]
+
+
+def _settings(codec='gzip', **overrides):
+    return {'TEXT_ARTIFACTS_ENABLED': True, 'TEXT_ARTIFACT_CODEC': codec, 'TEXT_ARTIFACT_MAX_CHARS': 500_000, **overrides}
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage(str(tmp_path))
+
+@pytest.fixture
+def content_hash(storage):
+    """Stores a plain-text resume under RESUME_KEY and returns its content hash."""
+    storage.put_stream(RESUME_KEY, io.BytesIO(RESUME_TEXT.encode('utf-8')))
+    return compute_file_hash(storage._path(RESUME_KEY))
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_artifact_round_trip(storage, codec):
+    extraction = {"text": RESUME_TEXT, "engine": 'txt', "pages": None}
+    saved = save_text_artifact(storage, 'ab' * 32, extraction, _settings(codec))
+    assert storage.size(artifact_key('ab' * 32, codec)) > 0
+    loaded = load_text_artifact(storage, 'ab' * 32)
+    assert loaded == saved
+    assert (loaded["text"], loaded["engine"], loaded["truncated"], loaded["version"]) == (RESUME_TEXT, 'txt', False, ARTIFACT_VERSION)
+
+def test_missing_artifact_loads_as_none(storage):
+    assert load_text_artifact(storage, 'cd' * 32) is None
+    assert load_text_artifact(storage, None) is None
+
+def test_first_extraction_is_cached_and_reused_without_the_file(storage, content_hash):
+    _, built, hit = get_or_extract_text(storage, RESUME_KEY, content_hash, _settings())
+    assert hit is False and built["text"] == RESUME_TEXT
+    os.remove(storage._path(RESUME_KEY)) # A hit must not fetch the source file
+    _, artifact, hit = get_or_extract_text(storage, RESUME_KEY, content_hash, _settings())
+    assert hit is True and artifact == built
+
+def test_rebuild_reextracts_and_overwrites(storage, content_hash):
+    stale = {"version": ARTIFACT_VERSION, "content_hash": content_hash, "text": "stale text", "engine": 'old'}
+    storage.put_stream(artifact_key(content_hash, 'gzip'), io.BytesIO(_encode(stale, 'gzip')))
+    assert get_or_extract_text(storage, RESUME_KEY, content_hash, _settings())[1]["text"] == "stale text"
+    _, artifact, hit = get_or_extract_text(storage, RESUME_KEY, content_hash, _settings(), rebuild=True)
+    assert hit is False and artifact["engine"] == 'txt'
+    assert load_text_artifact(storage, content_hash)["engine"] == 'txt'
+
+def test_rows_without_a_content_hash_get_one(storage, content_hash):
+    returned_hash, artifact, hit = get_or_extract_text(storage, RESUME_KEY, None, _settings())
+    assert (returned_hash, hit) == (content_hash, False)
+    assert load_text_artifact(storage, content_hash) == artifact
+
+def test_long_text_is_truncated_and_flagged(storage, content_hash):
+    _, artifact, _ = get_or_extract_text(storage, RESUME_KEY, content_hash, _settings(TEXT_ARTIFACT_MAX_CHARS=10))
+    assert (len(artifact["text"]), artifact["truncated"], artifact["chars"]) == (10, True, len(RESUME_TEXT))
+
+def test_disabled_cache_extracts_without_storing(storage, content_hash):
+    _, artifact, hit = get_or_extract_text(storage, RESUME_KEY, content_hash, _settings(TEXT_ARTIFACTS_ENABLED=False))
+    assert hit is False and artifact["text"] == RESUME_TEXT
+    assert load_text_artifact(storage, content_hash) is None
+
+@pytest.mark.parametrize("damage", [
+    lambda content_hash: b"not a gzip stream",
+    lambda content_hash: _encode({"version": ARTIFACT_VERSION - 1, "content_hash": content_hash, "text": "old"}, 'gzip'),
+    lambda content_hash: _encode({"version": ARTIFACT_VERSION, "content_hash": 'ef' * 32, "text": "other file"}, 'gzip'),
+], ids=['corrupt', 'old-version', 'wrong-hash'])
+def test_unusable_artifacts_are_ignored_and_rebuilt(storage, content_hash, damage):
+    storage.put_stream(artifact_key(content_hash, 'gzip'), io.BytesIO(damage(content_hash)))
+    assert load_text_artifact(storage, content_hash) is None
+    _, artifact, hit = get_or_extract_text(storage, RESUME_KEY, content_hash, _settings())
+    assert hit is False and artifact["text"] == RESUME_TEXT
+    assert load_text_artifact(storage, content_hash)["text"] == RESUME_TEXT
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        artifact_codec({'TEXT_ARTIFACT_CODEC': 'brotli'})